@@ -0,0 +1,126 @@
+"""
+This benchmark measures the recall of the approximate nearest-neighbor
+search of fuzzy_join (RandomProjectionLSH) against the exact matcher used
+in bench_fuzzy_join_vs_others.py, and the time saved by the approximation.
+
+The recall is the proportion of rows of the left table that are joined
+to the same row of the right table as with the exact search. More tables
+(`n_tables`) increase the recall, more hyperplanes per table (`n_bits`)
+make the search faster.
+
+Date: October 2026
+"""
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+from autofj.datasets import load_data
+from utils import default_parser, find_result, monitor
+
+from skrub import RandomProjectionLSH, fuzzy_join
+
+#########################################################
+# Benchmarking recall and speed on actual datasets
+#########################################################
+
+benchmark_name = "bench_fuzzy_join_ann_recall"
+
+
+def _join(left_table, right_table, neighbors=None):
+    # Keep track of the matched row of the right table
+    right_table = right_table.assign(right_row=range(len(right_table)))
+    start_time = perf_counter()
+    joined = fuzzy_join(
+        left_table,
+        right_table,
+        how="left",
+        left_on="title",
+        right_on="title",
+        suffixes=("_l", "_r"),
+        neighbors=neighbors,
+    )
+    end_time = perf_counter()
+    return joined["right_row"].to_numpy(), end_time - start_time
+
+
+@monitor(
+    memory=True,
+    time=True,
+    parametrize={
+        "dataset_name": [
+            "Country",
+            "BasketballTeam",
+            "Drug",
+            "Device",
+            "ArtificialSatellite",
+            "Amphibian",
+            "Song",
+            "HistoricBuilding",
+            "Wrestler",
+            "EthnicGroup",
+        ],
+        "n_tables": [1, 4, 16, 64],
+        "n_bits": [4, 8, 16, 32],
+    },
+    save_as=benchmark_name,
+    repeat=5,
+)
+def benchmark(
+    dataset_name: str,
+    n_tables: int,
+    n_bits: int,
+):
+    left_table, right_table, _ = load_data(dataset_name)
+
+    exact_rows, exact_time = _join(left_table, right_table)
+    approximate_rows, approximate_time = _join(
+        left_table,
+        right_table,
+        neighbors=RandomProjectionLSH(n_tables=n_tables, n_bits=n_bits),
+    )
+
+    res_dic = {
+        "recall": (approximate_rows == exact_rows).mean(),
+        "time_exact": exact_time,
+        "time_approximate": approximate_time,
+        "speedup": exact_time / approximate_time,
+    }
+
+    return res_dic
+
+
+def plot(df: pd.DataFrame):
+    sns.set_theme(style="ticks", palette="pastel")
+
+    df = df.groupby(["n_tables", "n_bits"], as_index=False)[
+        ["recall", "speedup"]
+    ].mean()
+    sns.scatterplot(
+        x="speedup",
+        y="recall",
+        hue="n_tables",
+        size="n_bits",
+        data=df,
+    )
+    plt.xscale("log")
+    plt.title("Recall of RandomProjectionLSH against the exact search")
+    plt.show()
+
+
+if __name__ == "__main__":
+    _args = ArgumentParser(
+        description="Benchmark for the approximate search of fuzzy_join.",
+        parents=[default_parser],
+    ).parse_args()
+
+    if _args.run:
+        df = benchmark()
+    else:
+        result_file = find_result(benchmark_name)
+        df = pd.read_parquet(result_file)
+
+    if _args.plot:
+        plot(df)
@@ -7,10 +7,11 @@ from ._agg_joiner import AggJoiner, AggTarget
 from ._check_dependencies import check_dependencies
 from ._datetime_encoder import DatetimeEncoder
 from ._deduplicate import compute_ngram_distance, deduplicate
-from ._fuzzy_join import fuzzy_join
+from ._fuzzy_join import FuzzyJoinIndex, fuzzy_join, fuzzy_join_chunks
 from ._gap_encoder import GapEncoder
 from ._joiner import Joiner
 from ._minhash_encoder import MinHashEncoder
+from ._nearest_neighbors import RandomProjectionLSH
 from ._select_cols import DropCols, SelectCols
 from ._similarity_encoder import SimilarityEncoder
 from ._table_vectorizer import SuperVectorizer, TableVectorizer
@@ -26,6 +27,9 @@ __all__ = [
     "DatetimeEncoder",
     "Joiner",
     "fuzzy_join",
+    "fuzzy_join_chunks",
+    "FuzzyJoinIndex",
+    "RandomProjectionLSH",
     "GapEncoder",
     "MinHashEncoder",
     "SimilarityEncoder",
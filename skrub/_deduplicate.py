@@ -11,9 +11,10 @@ from joblib import Parallel, delayed
 from numpy.typing import NDArray
 from scipy.cluster.hierarchy import fcluster, linkage
 from scipy.spatial.distance import pdist, squareform
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics import silhouette_score
 
+from ._ngram_counts import CachedTfidfVectorizer
+
 
 def compute_ngram_distance(
     unique_words: Sequence[str] | NDArray,
@@ -45,9 +46,9 @@ def compute_ngram_distance(
     computes the pair-wise Euclidean distance between elements based on their
     n-gram TF-IDF representation.
     """
-    encoded = TfidfVectorizer(ngram_range=ngram_range, analyzer=analyzer).fit_transform(
-        unique_words
-    )
+    encoded = CachedTfidfVectorizer(
+        ngram_range=ngram_range, analyzer=analyzer
+    ).fit_transform(unique_words)
 
     distance_mat = pdist(encoded.todense(), metric="euclidean")
     return distance_mat
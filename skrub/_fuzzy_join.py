@@ -2,120 +2,228 @@
 Implements fuzzy_join, a function to perform fuzzy joining between two tables.
 """
 
+import copy
 import numbers
 import warnings
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
+from pathlib import Path
 from typing import Literal
 
+import joblib
 import numpy as np
 import pandas as pd
-from numpy.typing import ArrayLike, NDArray
-from scipy.sparse import csr_matrix, hstack, vstack
-from sklearn.feature_extraction.text import (
-    HashingVectorizer,
-    TfidfTransformer,
-    _VectorizerMixin,
+from joblib import Parallel, delayed, effective_n_jobs
+from numpy.typing import NDArray
+from scipy.sparse import csr_matrix, hstack, issparse
+from sklearn import config_context, get_config
+from sklearn.base import clone
+from sklearn.feature_extraction.text import _VectorizerMixin
+from sklearn.neighbors import KDTree
+from sklearn.preprocessing import StandardScaler, normalize
+from sklearn.utils.extmath import row_norms
+from sklearn.utils.validation import check_is_fitted
+
+from skrub._nearest_neighbors import (
+    _nearest_rows,
+    _nearest_sorted,
+    _tree_query,
 )
-from sklearn.neighbors import NearestNeighbors
-from sklearn.preprocessing import StandardScaler
+from skrub._ngram_counts import CachedHashingVectorizer
+from skrub.dataframe import DataFrameLike
+from skrub.dataframe._namespace import get_df_namespace
 
 
-def _numeric_encoding(
-    main: pd.DataFrame,
-    main_cols: str | list[str],
-    aux: pd.DataFrame,
-    aux_cols: str | list[str],
-) -> tuple[ArrayLike, ArrayLike]:
-    """Encoding numerical columns.
+def _select_keys(table: DataFrameLike, cols: list[str]) -> pd.DataFrame:
+    """Key columns of a pandas or polars table, as a pandas DataFrame.
 
-    Parameters
-    ----------
-    main : :obj:`~pandas.DataFrame`
-        A table with numerical columns.
-    main_cols : str or list
-        The columns of the main table.
-    aux : :obj:`~pandas.DataFrame`
-        Another table with numerical columns.
-    aux_cols : str or list
-        The columns of the aux table.
+    Only the key columns of polars tables are collected and converted, without
+    copying the numerical columns that have no nulls.
+    """
+    skrub_px, _ = get_df_namespace(table)
+    return skrub_px.to_pandas(skrub_px.select(table, list(cols)))
+
+
+def _key_groups(keys: pd.DataFrame) -> dict[str, list[int]]:
+    """Positions of the numerical, datetime and string key columns."""
+    groups = {
+        "numeric": keys.select_dtypes(include="number").columns,
+        "time": keys.select_dtypes(include="datetime").columns,
+        "string": keys.select_dtypes(include=["string", "category", "object"]).columns,
+    }
+    return {
+        kind: [i for i, col in enumerate(keys.columns) if col in group_cols]
+        for kind, group_cols in groups.items()
+    }
+
+
+def _unique_keys(
+    keys: pd.DataFrame, blocks: NDArray | None = None
+) -> tuple[NDArray, NDArray, NDArray]:
+    """Find the distinct rows of the key columns.
+
+    If `blocks` is given, the rows are only equal within the same block.
 
     Returns
     -------
-    array-like
-        An array of the encoded columns of the main table.
-    array-like
-        An array of the encoded columns of the aux table.
+    ndarray
+        Position of the first occurrence of each distinct row.
+    ndarray
+        For each row, the index of the corresponding distinct row.
+    ndarray
+        Number of occurrences of each distinct row.
     """
-    aux_array = aux[aux_cols].to_numpy()
-    main_array = main[main_cols].to_numpy()
-    # Re-weighting to avoid measure specificity
-    scaler = StandardScaler()
-    scaler.fit(np.vstack((aux_array, main_array)))
-    aux_array = scaler.transform(aux_array)
-    main_array = scaler.transform(main_array)
-    return csr_matrix(main_array), csr_matrix(aux_array)
-
-
-def _time_encoding(
-    main: pd.DataFrame,
-    main_cols: str | list[str],
-    aux: pd.DataFrame,
-    aux_cols: str | list[str],
-) -> tuple[ArrayLike, ArrayLike]:
-    """Encoding datetime columns.
+    groupers = [keys.iloc[:, i] for i in range(keys.shape[1])]
+    if blocks is not None:
+        groupers.append(blocks)
+    codes = (
+        keys.groupby(
+            groupers,
+            sort=False,
+            dropna=False,
+            observed=True,
+        )
+        .ngroup()
+        .to_numpy()
+    )
+    _, first, inverse, counts = np.unique(
+        codes, return_index=True, return_inverse=True, return_counts=True
+    )
+    return first, inverse, counts
 
-    Parameters
-    ----------
-    main : pd.DataFrame
-        A table with datetime columns.
-    main_cols : str or list
-        The datetime columns of the main table.
-    aux : pd.DataFrame
-        Another table with datetime columns.
-    aux_cols : str or list
-        The datetime columns of the aux table.
 
-    Returns
-    -------
-    main_array : array-like
-        An array of the encoded columns of the main table.
-    aux_array : array-like
-        An array of the encoded columns of the aux table.
+def _normalize_strings(column: pd.Series) -> pd.Series:
+    """Lowercase a column of strings and collapse its whitespace."""
+    return (
+        column.astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+    )
+
+
+def _concat_string_keys(keys: pd.DataFrame) -> pd.Series:
+    """Concatenate the string key columns into a single string column."""
+    # Make sure that the column types are string and categorical:
+    keys = keys.astype(str)
+    return keys.iloc[:, 0].str.cat(keys.iloc[:, 1:], sep="  ")
+
+
+def _find_hashes(
+    hashes: NDArray, sorted_hashes: NDArray, positions: NDArray
+) -> NDArray:
+    """Position of each hash among the sorted hashes, or -1 if it is absent.
+
+    The keys are compared by their 64-bit hashes only: the probability that
+    two distinct keys of a table collide is negligible.
     """
-    # datetime representation in seconds
-    aux_array = aux[aux_cols].to_numpy(dtype="datetime64[s]")
-    main_array = main[main_cols].to_numpy(dtype="datetime64[s]")
-    # Re-weighting to avoid measure specificity
-    scaler = StandardScaler()
-    X = np.vstack([aux_array, main_array])
-    scaler.fit(X)
-    aux_array = scaler.transform(aux_array)
-    main_array = scaler.transform(main_array)
-    return csr_matrix(main_array), csr_matrix(aux_array)
-
-
-def _string_encoding(
-    main: pd.DataFrame,
-    main_cols: str | list[str],
-    aux: pd.DataFrame,
-    aux_cols: str | list[str],
-    analyzer: Literal["word", "char", "char_wb"],
-    ngram_range: tuple[int, int],
-    encoder: _VectorizerMixin = None,
-) -> tuple[ArrayLike, ArrayLike]:
-    """Encoding string columns.
+    if not len(sorted_hashes):
+        return np.full(len(hashes), -1)
+    found = np.minimum(np.searchsorted(sorted_hashes, hashes), len(sorted_hashes) - 1)
+    return np.where(sorted_hashes[found] == hashes, positions[found], -1)
+
+
+def _diameter_bound(encoded, squared_norms: NDArray | None = None) -> float:
+    """Upper bound of the distance between two rows of an encoded table.
+
+    This is twice the largest distance between a row and the mean row.
+    """
+    if encoded.shape[0] == 0:
+        return 0.0
+    if squared_norms is None:
+        squared_norms = row_norms(encoded, squared=True)
+    if issparse(encoded):
+        # Sparse mean row, to avoid a dense vector of all the features
+        center = csr_matrix(
+            (
+                encoded.data / encoded.shape[0],
+                encoded.indices.copy(),
+                [0, encoded.nnz],
+            ),
+            shape=(1, encoded.shape[1]),
+        )
+        center.sum_duplicates()
+        center_products = (encoded @ center.T).toarray().ravel()
+        center_norm = center.data @ center.data
+    else:
+        center = encoded.mean(axis=0)
+        center_products, center_norm = encoded @ center, center @ center
+    squared_radius = squared_norms - 2 * center_products + center_norm
+    return 2 * float(np.sqrt(max(np.max(squared_radius), 0)))
+
+
+# Name of the file holding the parameters and the encoders of a saved index
+_INDEX_FILE = "index.pkl"
+
+
+def _dump_arrays(obj, path: Path, prefix: str, skip=()) -> dict:
+    """Write the arrays of an object as ``.npy`` files.
+
+    Returns the other attributes of the object, to be pickled, along with
+    the names of the saved arrays. The attributes named in `skip` are
+    neither saved nor returned, and the arrays of the fitted `neighbors_`
+    estimator are saved as well.
+    """
+    state, arrays, matrices, estimators = {}, [], {}, {}
+    for name, value in vars(obj).items():
+        file = f"{prefix}{name}"
+        if name in skip:
+            continue
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            np.save(path / f"{file}.npy", value)
+            arrays.append(name)
+        elif isinstance(value, csr_matrix):
+            for part in ("data", "indices", "indptr"):
+                np.save(path / f"{file}.{part}.npy", getattr(value, part))
+            matrices[name] = value.shape
+        elif name == "neighbors_" and hasattr(value, "__dict__"):
+            estimators[name] = (type(value), _dump_arrays(value, path, f"{file}."))
+        else:
+            state[name] = value
+    return {
+        "state": state,
+        "arrays": arrays,
+        "matrices": matrices,
+        "estimators": estimators,
+    }
+
+
+def _load_arrays(obj, saved: dict, path: Path, prefix: str, mmap_mode):
+    """Restore the attributes of an object saved with `_dump_arrays`."""
+    vars(obj).update(saved["state"])
+    for name in saved["arrays"]:
+        file = f"{prefix}{name}"
+        setattr(obj, name, np.load(path / f"{file}.npy", mmap_mode=mmap_mode))
+    for name, shape in saved["matrices"].items():
+        data, indices, indptr = (
+            np.load(path / f"{prefix}{name}.{part}.npy", mmap_mode=mmap_mode)
+            for part in ("data", "indices", "indptr")
+        )
+        setattr(obj, name, csr_matrix((data, indices, indptr), shape=shape))
+    for name, (cls, estimator_saved) in saved["estimators"].items():
+        estimator = cls.__new__(cls)
+        _load_arrays(estimator, estimator_saved, path, f"{prefix}{name}.", mmap_mode)
+        setattr(obj, name, estimator)
+    return obj
+
+
+class FuzzyJoinIndex:
+    """Index of the keys of an auxiliary table, to find their closest matches.
+
+    The keys are embedded as in :func:`fuzzy_join`: numerical and datetime
+    columns are standardized, and string columns are concatenated and encoded
+    with a vectorizer followed by a TF-IDF transformation. The encoded keys of
+    the auxiliary table are stored in a nearest-neighbor index, so that
+    several main tables can be matched against them without refitting.
+
+    The keys of the main table that are equal to a key of the auxiliary table
+    are matched to it directly, with a distance of 0, and only the remaining
+    keys are searched in the nearest-neighbor index.
+
+    Only the distinct keys of each table are encoded and searched, and the
+    matches are broadcast back to the rows sharing the same key. When a key
+    appears several times in the auxiliary table, its first occurrence is
+    matched.
 
     Parameters
     ----------
-    main : :obj:`~pandas.DataFrame`
-        A table with string columns.
-    main_cols : str or list
-        The columns of the main table.
-    aux : :obj:`~pandas.DataFrame`
-        Another table with string columns.
-    aux_cols : str or list
-        The columns of the aux table.
-    analyzer : {'word', 'char', 'char_wb'}
+    analyzer : {'word', 'char', 'char_wb'}, default='char_wb'
         Analyzer parameter for the HashingVectorizer passed to
         the encoder and used for the string similarities.
         See fuzzy_join's docstring for more information.
@@ -123,75 +231,424 @@ def _string_encoding(
         The lower and upper boundaries of the range of n-values for different
         n-grams used in the string similarity. All values of `n` such
         that ``min_n <= n <= max_n`` will be used.
-    encoder: vectorizer instance, optional
+    encoder : vectorizer instance, optional
         Encoder parameter for the Vectorizer.
         See fuzzy_join's docstring for more information.
+    normalize_keys : bool, default=False
+        Whether to lowercase the string keys and collapse their whitespace
+        before looking for exact matches.
+    neighbors : estimator, optional
+        Nearest-neighbor search used for the keys without exact match.
+        See fuzzy_join's docstring for more information.
 
-    Returns
-    -------
-    array-like
-        An array of the encoded columns of the main table.
-    array-like
-        An array of the encoded columns of the aux table.
-    """
-    # Make sure that the column types are string and categorical:
-    main = main[main_cols].astype(str)
-    aux = aux[aux_cols].astype(str)
-
-    first_col, other_cols = main_cols[0], main_cols[1:]
-    main = main[first_col].str.cat(main[other_cols], sep="  ")
-    first_col_aux, other_cols_aux = aux_cols[0], aux_cols[1:]
-    aux = aux[first_col_aux].str.cat(aux[other_cols_aux], sep="  ")
-    all_cats = pd.concat([main, aux], axis=0).unique()
-
-    if encoder is None:
-        encoder = HashingVectorizer(analyzer=analyzer, ngram_range=ngram_range)
-
-    encoder = encoder.fit(all_cats)
-    main_enc = encoder.transform(main)
-    aux_enc = encoder.transform(aux)
-
-    all_enc = vstack((main_enc, aux_enc))
-
-    tfidf = TfidfTransformer().fit(all_enc)
-    main_enc = tfidf.transform(main_enc)
-    aux_enc = tfidf.transform(aux_enc)
-    return main_enc, aux_enc
-
+    Attributes
+    ----------
+    n_samples_fit_ : int
+        Number of rows of the auxiliary table.
+    key_groups_ : dict of str to list of int
+        Positions of the numerical, datetime and string key columns.
+    aux_encoded_T_ : csr_matrix of shape (n_features, n_keys)
+        Transpose of the encoded distinct keys of the auxiliary table, in
+        which the matches are searched. Only set when there are string keys
+        and `neighbors` is not given.
+    max_distance_ : float
+        Upper bound of the distance between two encoded keys of the
+        auxiliary table, used to normalize the matching scores.
 
-def _nearest_matches(
-    main_array: ArrayLike, aux_array: ArrayLike
-) -> tuple[NDArray, NDArray]:
-    """Find the closest matches using the nearest neighbors method.
+    See Also
+    --------
+    fuzzy_join :
+        Join two tables based on approximate matching.
+    Joiner :
+        Transformer to enrich a given table via one or more fuzzy joins to
+        external resources.
 
-    Parameters
-    ----------
-    main_array : array-like
-        An array of the encoded columns of the main table.
-    aux_array : array-like
-        An array of the encoded columns of the aux table.
+    Notes
+    -----
+    A fitted index can be saved to a directory with :meth:`save`, and loaded
+    with :meth:`load`. The arrays of the index, such as the encoded keys of
+    the auxiliary table, are stored as flat ``.npy`` files and memory-mapped
+    when loaded, so that several processes loading the same index share its
+    memory and start without encoding the auxiliary table again.
 
-    Returns
-    -------
-    ndarray
-        Index of the closest matches of the main table in the aux table.
-    ndarray
-        Distance between the closest matches, on a scale between 0 and 1.
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from skrub import FuzzyJoinIndex, fuzzy_join
+    >>> df1 = pd.DataFrame({'a': ['ana', 'lala', 'nana'], 'b': [1, 2, 3]})
+    >>> df2 = pd.DataFrame({'a': ['anna', 'lala', 'ana', 'nnana'], 'c': [5, 6, 7, 8]})
+    >>> index = FuzzyJoinIndex().fit(df2, ['a'])
+    >>> fuzzy_join(df1, df2, on='a', index=index)
+        a_x  b    a_y  c
+    0   ana  1    ana  7
+    1  lala  2   lala  6
+    2  nana  3  nnana  8
     """
-    # Find nearest neighbor using KNN :
-    neigh = NearestNeighbors(n_neighbors=1)
-    neigh.fit(aux_array)
-    distance, neighbors = neigh.kneighbors(main_array, return_distance=True)
-    idx_closest = np.ravel(neighbors)
-    distance = distance / np.max(distance)
-    # Normalizing distance between 0 and 1:
-    matching_score = 1 - (distance / 2)
-    return idx_closest, matching_score
+
+    def __init__(
+        self,
+        analyzer: Literal["word", "char", "char_wb"] = "char_wb",
+        ngram_range: tuple[int, int] = (2, 4),
+        encoder: _VectorizerMixin = None,
+        normalize_keys: bool = False,
+        neighbors=None,
+    ):
+        self.analyzer = analyzer
+        self.ngram_range = ngram_range
+        self.encoder = encoder
+        self.normalize_keys = normalize_keys
+        self.neighbors = neighbors
+
+    def fit(
+        self,
+        aux_table: pd.DataFrame,
+        aux_cols: list[str],
+        main_table: pd.DataFrame | None = None,
+        main_cols: list[str] | None = None,
+    ) -> "FuzzyJoinIndex":
+        """Encode and index the keys of the auxiliary table.
+
+        Parameters
+        ----------
+        aux_table : :obj:`~pandas.DataFrame`
+            The table in which the matches are searched.
+        aux_cols : list of str
+            The key columns of the auxiliary table.
+        main_table : :obj:`~pandas.DataFrame`, optional
+            The table whose keys will be matched. If given, the scaling and
+            the TF-IDF weights are fitted on the keys of both tables, as done
+            by :func:`fuzzy_join`. Otherwise, they are fitted on the keys of
+            the auxiliary table only.
+        main_cols : list of str, optional
+            The key columns of the main table, in the same order as
+            `aux_cols`.
+
+        Returns
+        -------
+        FuzzyJoinIndex
+            The fitted index (self).
+        """
+        aux_keys = _select_keys(aux_table, aux_cols)
+        if main_table is None:
+            main_keys = aux_keys.iloc[:0]
+        else:
+            main_keys = _select_keys(main_table, main_cols)
+        aux_first = self._fit_encoders(aux_keys, main_keys)
+        return self._fit_search(aux_keys.iloc[aux_first], aux_first)
+
+    def _fit_encoders(self, aux_keys: pd.DataFrame, main_keys: pd.DataFrame) -> NDArray:
+        """Fit the encoders of the keys, and return the distinct aux keys."""
+        self.n_samples_fit_ = len(aux_keys)
+        # The types of the keys are those of the main table
+        self.key_groups_ = _key_groups(main_keys)
+
+        # Only the distinct keys are encoded. The statistics of the encoders
+        # are weighted by the number of occurrences of each key, so that they
+        # are the same as if all the rows were encoded.
+        aux_first, _, aux_counts = _unique_keys(aux_keys)
+        main_first, _, main_counts = _unique_keys(main_keys)
+        aux_keys, main_keys = aux_keys.iloc[aux_first], main_keys.iloc[main_first]
+        counts = np.concatenate([aux_counts, main_counts])
+
+        if self.key_groups_["numeric"]:
+            self.numeric_scaler_ = StandardScaler().fit(
+                np.vstack(
+                    [
+                        self._numeric_keys(aux_keys),
+                        self._numeric_keys(main_keys),
+                    ]
+                ),
+                sample_weight=counts,
+            )
+        if self.key_groups_["time"]:
+            self.time_scaler_ = StandardScaler().fit(
+                np.vstack([self._time_keys(aux_keys), self._time_keys(main_keys)]),
+                sample_weight=counts,
+            )
+        if self.key_groups_["string"]:
+            main_str = self._string_keys(main_keys)
+            aux_str = self._string_keys(aux_keys)
+            if self.encoder is None:
+                self.vectorizer_ = CachedHashingVectorizer(
+                    analyzer=self.analyzer, ngram_range=self.ngram_range
+                )
+            else:
+                self.vectorizer_ = clone(self.encoder)
+            all_cats = pd.concat([main_str, aux_str], axis=0).unique()
+            self.vectorizer_.fit(all_cats)
+            ngram_counts = self.vectorizer_.transform(all_cats)
+            # Document frequencies, counting each string as many times as it
+            # appears in the keys
+            string_counts = (
+                pd.Series(np.concatenate([main_counts, aux_counts]))
+                .groupby(pd.concat([main_str, aux_str], axis=0).to_numpy())
+                .sum()
+                .reindex(all_cats)
+                .to_numpy(dtype=np.float64)
+            )
+            ngram_counts = csr_matrix(ngram_counts)
+            document_frequency = np.bincount(
+                ngram_counts.indices,
+                weights=np.repeat(string_counts, np.diff(ngram_counts.indptr)),
+                minlength=ngram_counts.shape[1],
+            )
+            # Smoothed idf, as computed by the TfidfTransformer
+            self.idf_ = np.log((string_counts.sum() + 1) / (document_frequency + 1)) + 1
+
+        return aux_first
+
+    def _fit_search(
+        self, aux_keys: pd.DataFrame, positions: NDArray
+    ) -> "FuzzyJoinIndex":
+        """Index distinct aux keys, at the given positions in the aux table."""
+        # Each distinct aux key is matched to its first occurrence
+        self.aux_positions_ = positions
+        self.exact_hashes_, self.exact_positions_ = np.unique(
+            self._key_hashes(aux_keys), return_index=True
+        )
+        aux_encoded = self._encode_search(aux_keys)
+        self._fit_encoded(aux_encoded)
+        self.max_distance_ = _diameter_bound(
+            aux_encoded, getattr(self, "aux_squared_norms_", None)
+        )
+        return self
+
+    def _fit_encoded(self, aux_encoded) -> "FuzzyJoinIndex":
+        """Build the nearest-neighbor search of encoded aux keys."""
+        if self._dense_search:
+            # Low-dimensional dense keys: a sorted search, or a KD-tree, is
+            # much faster than the sparse brute-force search
+            if aux_encoded.shape[1] == 1:
+                self.sorted_order_ = np.argsort(aux_encoded[:, 0], kind="stable")
+                self.sorted_keys_ = aux_encoded[self.sorted_order_, 0]
+            else:
+                # Only the keys are saved, the tree is rebuilt when loaded
+                self.tree_keys_ = aux_encoded
+                self.tree_ = KDTree(self.tree_keys_)
+        else:
+            self.aux_squared_norms_ = row_norms(aux_encoded, squared=True)
+            if self.neighbors is None:
+                # Transposed once, rather than for each block of the search
+                self.aux_encoded_T_ = aux_encoded.T.tocsr()
+            else:
+                self.neighbors_ = clone(self.neighbors, safe=False).fit(aux_encoded)
+        return self
+
+    def save(self, path: str | Path) -> None:
+        """Save the fitted index to a directory.
+
+        The arrays of the index are written as ``.npy`` files, the sparse
+        matrices as the ``.npy`` files of their CSR components, and the rest
+        of the index (its parameters and the fitted encoders) is pickled.
+        The arrays of the fitted `neighbors` estimator are saved in the same
+        way. The KD-tree of dense keys is not saved, but rebuilt from its
+        keys when the index is loaded.
+
+        Parameters
+        ----------
+        path : str or Path
+            The directory in which the index is saved. It is created if it
+            does not exist, and the files of a previously saved index are
+            overwritten.
+        """
+        check_is_fitted(self, "key_groups_")
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        joblib.dump(_dump_arrays(self, path, "", skip=["tree_"]), path / _INDEX_FILE)
+
+    @classmethod
+    def load(
+        cls, path: str | Path, mmap_mode: Literal["r", "c", None] = "r"
+    ) -> "FuzzyJoinIndex":
+        """Load an index saved with :meth:`save`.
+
+        Parameters
+        ----------
+        path : str or Path
+            The directory in which the index was saved.
+        mmap_mode : {'r', 'c', None}, default='r'
+            How the arrays of the index are memory-mapped, as in
+            :func:`numpy.load`. With 'r', the processes loading the same
+            index share the memory of its arrays. None loads them in memory.
+
+        Returns
+        -------
+        FuzzyJoinIndex
+            The fitted index.
+        """
+        if mmap_mode not in ["r", "c", None]:
+            raise ValueError(
+                f"Parameter 'mmap_mode' should be 'r', 'c' or None, got {mmap_mode!r}. "
+            )
+        path = Path(path)
+        saved = joblib.load(path / _INDEX_FILE)
+        index = _load_arrays(cls.__new__(cls), saved, path, "", mmap_mode)
+        if hasattr(index, "tree_keys_"):
+            # The tree refers to the (possibly memory-mapped) keys
+            index.tree_ = KDTree(index.tree_keys_)
+        return index
+
+    def __deepcopy__(self, memo) -> "FuzzyJoinIndex":
+        # A fitted index is never modified, and refitting replaces its
+        # attributes: copies can share the (possibly memory-mapped) arrays.
+        return copy.copy(self)
+
+    @property
+    def _dense_search(self) -> bool:
+        """Whether the keys are only numerical or datetime columns."""
+        return self.neighbors is None and not self.key_groups_["string"]
+
+    def _numeric_keys(self, keys: pd.DataFrame) -> NDArray:
+        return keys.iloc[:, self.key_groups_["numeric"]].to_numpy()
+
+    def _time_keys(self, keys: pd.DataFrame) -> NDArray:
+        # datetime representation in seconds
+        return keys.iloc[:, self.key_groups_["time"]].to_numpy(dtype="datetime64[s]")
+
+    def _string_keys(self, keys: pd.DataFrame) -> pd.Series:
+        return _concat_string_keys(keys.iloc[:, self.key_groups_["string"]])
+
+    def _key_hashes(self, keys: pd.DataFrame, blocks: NDArray | None = None) -> NDArray:
+        """64-bit hashes of the keys, compared to find the exact matches."""
+        columns = {}
+        for i in range(keys.shape[1]):
+            column = keys.iloc[:, i]
+            # Equal values of different dtypes have the same hash
+            if i in self.key_groups_["numeric"]:
+                column = column.to_numpy(dtype=np.float64, na_value=np.nan)
+            elif i in self.key_groups_["time"]:
+                column = column.to_numpy(dtype="datetime64[ns]")
+            elif self.normalize_keys:
+                column = _normalize_strings(column)
+            columns[i] = column
+        if blocks is not None:
+            columns[len(columns)] = blocks
+        return pd.util.hash_pandas_object(
+            pd.DataFrame(columns, index=keys.index), index=False
+        ).to_numpy()
+
+    def _exact_matches(self, keys: pd.DataFrame) -> NDArray:
+        """Position of the equal key in the index, or -1 if there is none."""
+        matches = _find_hashes(
+            self._key_hashes(keys), self.exact_hashes_, self.exact_positions_
+        )
+        # Missing values go through the fuzzy matching
+        matches[keys.isna().any(axis=1).to_numpy()] = -1
+        return matches
+
+    def _encode_dense(self, keys: pd.DataFrame) -> NDArray:
+        """Encode the numerical and datetime key columns."""
+        encoded = []
+        # Re-weighting to avoid measure specificity
+        if self.key_groups_["numeric"]:
+            encoded.append(self.numeric_scaler_.transform(self._numeric_keys(keys)))
+        if self.key_groups_["time"]:
+            encoded.append(self.time_scaler_.transform(self._time_keys(keys)))
+        return np.hstack(encoded)
+
+    def _tfidf(self, ngram_counts) -> csr_matrix:
+        """TF-IDF transformation, as done by the TfidfTransformer."""
+        tfidf = csr_matrix(ngram_counts, dtype=np.float64, copy=True)
+        tfidf.data *= self.idf_[tfidf.indices]
+        return normalize(tfidf, copy=False)
+
+    def encode(self, keys: pd.DataFrame) -> csr_matrix:
+        """Encode key columns.
+
+        Parameters
+        ----------
+        keys : :obj:`~pandas.DataFrame`
+            The key columns, in the order of the columns used during fit.
+
+        Returns
+        -------
+        csr_matrix
+            The encoded keys.
+        """
+        encoded = []
+        if self.key_groups_["numeric"] or self.key_groups_["time"]:
+            encoded.append(csr_matrix(self._encode_dense(keys)))
+        if self.key_groups_["string"]:
+            encoded.append(
+                self._tfidf(self.vectorizer_.transform(self._string_keys(keys)))
+            )
+        return hstack(encoded, format="csr")
+
+    def _encode_search(self, keys: pd.DataFrame):
+        """Encode keys as searched: dense for numerical and datetime keys."""
+        if self._dense_search:
+            return self._encode_dense(keys)
+        return self.encode(keys)
+
+    def _search(self, encoded, n_jobs: int = None) -> tuple[NDArray, NDArray]:
+        """Closest aux key and its distance, for each encoded key.
+
+        The keys with missing numerical values have no match, with an
+        infinite distance.
+        """
+        missing = np.isnan(np.asarray(encoded.sum(axis=1))).ravel()
+        if missing.any():
+            neighbors = np.zeros(encoded.shape[0], dtype=np.intp)
+            distance = np.full((encoded.shape[0], 1), np.inf)
+            if not missing.all():
+                neighbors[~missing], distance[~missing] = self._search(
+                    encoded[~missing], n_jobs
+                )
+            return neighbors, distance
+        if self._dense_search:
+            if hasattr(self, "tree_"):
+                return _tree_query(self.tree_, encoded, n_jobs=n_jobs)
+            return _nearest_sorted(encoded[:, 0], self.sorted_keys_, self.sorted_order_)
+        if self.neighbors is None:
+            return _nearest_rows(
+                encoded, self.aux_encoded_T_, self.aux_squared_norms_, n_jobs=n_jobs
+            )
+        distance, neighbors = self.neighbors_.kneighbors(
+            encoded, n_neighbors=1, return_distance=True
+        )
+        return np.ravel(neighbors), distance
+
+    def kneighbors(
+        self, main_table: pd.DataFrame, main_cols: list[str], n_jobs: int = None
+    ) -> tuple[NDArray, NDArray]:
+        """Find the closest matches of the keys of a main table.
+
+        Parameters
+        ----------
+        main_table : :obj:`~pandas.DataFrame`
+            The table whose keys are matched.
+        main_cols : list of str
+            The key columns of the main table.
+        n_jobs : int, optional
+            The number of threads used to search the closest matches.
+            None means 1 unless in a :obj:`joblib.parallel_backend` context.
+            -1 means using all processors.
+
+        Returns
+        -------
+        ndarray
+            Index of the closest matches of the main table in the aux table.
+        ndarray
+            Euclidean distance between the encoded keys of the matches. It is
+            infinite for the keys with missing numerical values, which have
+            no match.
+        """
+        keys = _select_keys(main_table, main_cols)
+        first, inverse, _ = _unique_keys(keys)
+        keys = keys.iloc[first]
+        neighbors = self._exact_matches(keys)
+        distance = np.zeros((len(neighbors), 1))
+        fuzzy = neighbors < 0
+        if fuzzy.any():
+            neighbors[fuzzy], distance[fuzzy] = self._search(
+                self._encode_search(keys[fuzzy]), n_jobs
+            )
+        return self.aux_positions_[neighbors][inverse], distance[inverse]
 
 
 def fuzzy_join(
-    left: pd.DataFrame,
-    right: pd.DataFrame,
+    left: DataFrameLike,
+    right: DataFrameLike,
     how: Literal["left", "right"] = "left",
     left_on: str | list[str] | list[int] | None = None,
     right_on: str | list[str] | list[int] | None = None,
@@ -204,16 +661,22 @@ def fuzzy_join(
     drop_unmatched: bool = False,
     sort: bool = False,
     suffixes: tuple[str, str] = ("_x", "_y"),
-) -> pd.DataFrame:
+    normalize_keys: bool = False,
+    neighbors=None,
+    n_jobs: int = None,
+    index: FuzzyJoinIndex | None = None,
+    block_on: str | list[str] | None = None,
+) -> DataFrameLike:
     """Join two tables based on approximate matching using the appropriate similarity \
     metric.
 
     The principle is as follows:
 
-    1. We embed and transform the key string, numerical or datetime columns.
-    2. For each category, we use the nearest neighbor method to find its
-       closest neighbor and establish a match.
-    3. We match the tables using the previous information.
+    1. The keys that have an exact match in the other table are matched to it.
+    2. We embed and transform the key string, numerical or datetime columns.
+    3. For each remaining category, we use the nearest neighbor method to find
+       its closest neighbor and establish a match.
+    4. We match the tables using the previous information.
 
     For string columns, categories from the two tables that share many sub-strings
     (n-grams) have greater probability of being matched together. The join is based on
@@ -228,10 +691,11 @@ def fuzzy_join(
 
     Parameters
     ----------
-    left : :obj:`~pandas.DataFrame`
-        A table to merge.
-    right : :obj:`~pandas.DataFrame`
-        A table used to merge with.
+    left : DataFrameLike
+        A table to merge: a :obj:`~pandas.DataFrame`, a
+        :obj:`polars.DataFrame` or a :obj:`polars.LazyFrame`.
+    right : DataFrameLike
+        A table used to merge with, of the same type as `left`.
     how : {'left', 'right'}, default='left'
         Type of merge to be performed. Note that unlike pandas.merge,
         only "left" and "right" are supported so far, as the fuzzy-join comes
@@ -281,11 +745,43 @@ def fuzzy_join(
     suffixes : 2-tuple of str, default=('_x', '_y')
         A list of strings indicating the suffix to add when overlaping
         column names.
+    normalize_keys : bool, default=False
+        Whether the string keys are lowercased and their whitespace collapsed
+        before looking for exact matches. Keys matched this way are
+        considered as perfect matches.
+    neighbors : estimator, optional
+        Nearest-neighbor search used for the keys without exact match,
+        implementing `fit` and `kneighbors` like
+        :class:`~sklearn.neighbors.NearestNeighbors`. It is fitted on the
+        encoded keys of the auxiliary table. By default, an exact search is
+        performed. Use :class:`RandomProjectionLSH` for an approximate search
+        on very large tables.
+    n_jobs : int, optional
+        The number of threads used to search the closest matches.
+        None means 1 unless in a :obj:`joblib.parallel_backend` context.
+        -1 means using all processors.
+    index : FuzzyJoinIndex, optional
+        A prebuilt index of the keys of the auxiliary table (`right` if
+        `how='left'`, `left` otherwise), for instance loaded with
+        :meth:`FuzzyJoinIndex.load`. The auxiliary table is then not encoded
+        again, and `encoder`, `analyzer`, `ngram_range`, `normalize_keys`
+        and `neighbors` are those of the index. The matching scores are
+        normalized by the diameter of the indexed keys, so that they do not
+        depend on the other keys of the main table.
+    block_on : str or list of str, optional
+        Name of columns of both tables whose values must be equal for two rows
+        to be matched, such as a country when joining on city names. The
+        tables are partitioned into blocks of rows with equal values in these
+        columns, and the keys of each block of the main table are only matched
+        to the keys of the same block of the auxiliary table. The blocks are
+        searched in parallel, according to `n_jobs`. The rows of the main table
+        whose block is absent from the auxiliary table, or with missing values
+        in these columns, are not matched.
 
     Returns
     -------
-    df_joined : :obj:`~pandas.DataFrame`
-        The joined table returned as a :obj:`~pandas.DataFrame`.
+    df_joined : DataFrameLike
+        The joined table, of the same type as the input tables.
         If `return_score=True`, another column will be added
         to the DataFrame containing the matching scores.
 
@@ -302,10 +798,14 @@ def fuzzy_join(
 
     Joining on indexes and multiple columns is not supported.
 
+    With polars tables, only the key columns are collected and converted to
+    compute the matches, and the output is assembled with polars joins, so
+    that a :obj:`polars.LazyFrame` input gives a lazy output.
+
     When `return_score=True`, the returned :obj:`~pandas.DataFrame` gives
     the distances between the closest matches in a [0, 1] interval.
     0 corresponds to no matching n-grams, while 1 is a
-    perfect match.
+    perfect match. Exact matches always have a score of 1.
 
     When we use `match_score=0`, the function will be forced to impute the
     nearest match (of the left table category) across all possible matching
@@ -401,117 +901,525 @@ def fuzzy_join(
             "'on' or 'left_on' & 'right_on' should be specified."
         )
 
+    # Raises a TypeError if the tables are not of the same type
+    get_df_namespace(left, right)
+
     if how == "left":
-        main_table = left.reset_index(drop=True)
-        aux_table = right.reset_index(drop=True)
-        main_cols = left_col
-        aux_cols = right_col
+        main_table, aux_table = left, right
+        main_cols, aux_cols = left_col, right_col
     elif how == "right":
-        main_table = right.reset_index(drop=True)
-        aux_table = left.reset_index(drop=True)
-        main_cols = right_col
-        aux_cols = left_col
+        main_table, aux_table = right, left
+        main_cols, aux_cols = right_col, left_col
+
+    blocks = None
+    if block_on is not None:
+        block_cols = np.atleast_1d(block_on).tolist()
+        aux_keys = _select_keys(aux_table, aux_cols)
+        blocks = (
+            aux_keys,
+            *_block_codes(
+                _select_keys(main_table, block_cols),
+                _select_keys(aux_table, block_cols),
+            ),
+        )
 
-    # Warn if presence of missing values
-    if main_table[main_cols].isna().any().any():
-        warnings.warn(
-            "You are merging on missing values. "
-            "The output correspondence will be random or missing. "
-            "To avoid unexpected errors you can drop them. ",
-            UserWarning,
-            stacklevel=2,
+    if index is None:
+        index = FuzzyJoinIndex(
+            analyzer=analyzer,
+            ngram_range=ngram_range,
+            encoder=encoder,
+            normalize_keys=normalize_keys,
+            neighbors=neighbors,
         )
+        if blocks is None:
+            index.fit(aux_table, aux_cols, main_table, main_cols)
+        else:
+            # Each block is indexed separately, with the same encoders
+            index._fit_encoders(aux_keys, _select_keys(main_table, main_cols))
+        max_distance = None
+    else:
+        _check_index(index, aux_table)
+        max_distance = index.max_distance_
+    return _join_on_index(
+        main_table,
+        aux_table,
+        main_cols,
+        index,
+        how=how,
+        return_score=return_score,
+        match_score=match_score,
+        drop_unmatched=drop_unmatched,
+        sort=sort,
+        suffixes=suffixes,
+        n_jobs=n_jobs,
+        max_distance=max_distance,
+        blocks=blocks,
+    )
+
+
+def fuzzy_join_chunks(
+    main_chunks: Iterable[pd.DataFrame],
+    aux_table: pd.DataFrame,
+    main_on: str | list[str],
+    aux_on: str | list[str],
+    encoder: _VectorizerMixin = None,
+    analyzer: Literal["word", "char", "char_wb"] = "char_wb",
+    ngram_range: tuple[int, int] = (2, 4),
+    return_score: bool = False,
+    match_score: float = 0,
+    drop_unmatched: bool = False,
+    suffixes: tuple[str, str] = ("_x", "_y"),
+    normalize_keys: bool = False,
+    neighbors=None,
+    n_jobs: int = None,
+) -> Iterator[pd.DataFrame]:
+    """Fuzzy join a main table, read by chunks, to an auxiliary table.
+
+    The keys of the auxiliary table are encoded and indexed once, then each
+    chunk of the main table is left-joined to it as with :func:`fuzzy_join`,
+    so that main tables that do not fit in memory, such as the row groups of
+    a parquet file, can be joined.
+
+    Unlike in :func:`fuzzy_join`, the encoders are fitted on the auxiliary
+    table only, and the matching scores are normalized by an upper bound of
+    the distance between two keys of the auxiliary table, instead of the
+    largest distance of the matches. The scores thus do not depend on how the
+    main table is split into chunks.
 
-    main_num_cols = main_table[main_cols].select_dtypes(include="number").columns
-    aux_num_cols = aux_table[aux_cols].select_dtypes(include="number").columns
+    Parameters
+    ----------
+    main_chunks : iterable of :obj:`~pandas.DataFrame`
+        The chunks of the main table.
+    aux_table : :obj:`~pandas.DataFrame`
+        The table joined to each chunk.
+    main_on : str or list of str
+        Name of the key column(s) of the main table.
+    aux_on : str or list of str
+        Name of the key column(s) of the auxiliary table.
+    encoder : vectorizer instance, optional
+        Encoder parameter for the Vectorizer.
+        See fuzzy_join's docstring for more information.
+    analyzer : {'word', 'char', 'char_wb'}, default='char_wb'
+        Analyzer parameter for the HashingVectorizer.
+        See fuzzy_join's docstring for more information.
+    ngram_range : 2-tuple of int, default=(2, 4)
+        The lower and upper boundaries of the range of n-values for different
+        n-grams used in the string similarity.
+    return_score : bool, default=False
+        Whether to return matching score based on the distance between
+        the nearest matched categories.
+    match_score : float, default=0.0
+        Distance score between the closest matches that will be accepted.
+        See fuzzy_join's docstring for more information.
+    drop_unmatched : bool, default=False
+        Remove categories for which a match was not found in the two tables.
+    suffixes : 2-tuple of str, default=('_x', '_y')
+        A list of strings indicating the suffix to add when overlaping
+        column names.
+    normalize_keys : bool, default=False
+        Whether the string keys are lowercased and their whitespace collapsed
+        before looking for exact matches.
+    neighbors : estimator, optional
+        Nearest-neighbor search used for the keys without exact match.
+        See fuzzy_join's docstring for more information.
+    n_jobs : int, optional
+        The number of threads used to search the closest matches.
+        None means 1 unless in a :obj:`joblib.parallel_backend` context.
+        -1 means using all processors.
 
-    main_time_cols = main_table[main_cols].select_dtypes(include="datetime").columns
-    aux_time_cols = aux_table[aux_cols].select_dtypes(include="datetime").columns
+    Yields
+    ------
+    :obj:`~pandas.DataFrame`
+        Each chunk of the main table, joined to the auxiliary table.
 
-    main_str_cols = (
-        main_table[main_cols]
-        .select_dtypes(include=["string", "category", "object"])
-        .columns
-    )
-    aux_str_cols = (
-        aux_table[aux_cols]
-        .select_dtypes(include=["string", "category", "object"])
-        .columns
-    )
+    See Also
+    --------
+    fuzzy_join
+        Join two tables (dataframes) based on approximate column matching.
 
-    # Check if included columns are numeric:
-    any_numeric = len(main_num_cols) != 0
-    # Check if included columns are datetime:
-    any_time = len(main_time_cols) != 0
-    # Check if included columns are datetime:
-    any_str = len(main_str_cols) != 0
-
-    if len(main_cols) == 1 and len(aux_cols) == 1 and any_numeric is False:
-        main_cols = main_cols[0]
-        aux_cols = aux_cols[0]
-
-    main_enc, aux_enc = [], []
-    if any_numeric:
-        main_num_enc, aux_num_enc = _numeric_encoding(
-            main_table, main_num_cols, aux_table, aux_num_cols
+    Examples
+    --------
+    >>> df1 = pd.DataFrame({'a': ['ana', 'lala', 'nana'], 'b': [1, 2, 3]})
+    >>> df2 = pd.DataFrame({'a': ['anna', 'lala', 'ana', 'nnana'], 'c': [5, 6, 7, 8]})
+    >>> chunks = (df1.iloc[i : i + 2] for i in range(0, len(df1), 2))
+    >>> for chunk in fuzzy_join_chunks(chunks, df2, main_on='a', aux_on='a'):
+    ...     print(chunk)
+        a_x  b   a_y  c
+    0   ana  1   ana  7
+    1  lala  2  lala  6
+        a_x  b    a_y  c
+    0  nana  3  nnana  8
+    """
+    main_cols = np.atleast_1d(main_on).tolist()
+    aux_cols = np.atleast_1d(aux_on).tolist()
+    if len(main_cols) != len(aux_cols):
+        raise ValueError(
+            "main_on and aux_on should have the same number of columns, got "
+            f"{len(main_cols)} and {len(aux_cols)}. "
         )
-        main_enc.append(main_num_enc)
-        aux_enc.append(aux_num_enc)
-    if any_time:
-        main_time_enc, aux_time_enc = _time_encoding(
-            main_table, main_time_cols, aux_table, aux_time_cols
+    index = None
+    for chunk in main_chunks:
+        if index is None:
+            # The types of the keys are taken from the first chunk
+            index = FuzzyJoinIndex(
+                analyzer=analyzer,
+                ngram_range=ngram_range,
+                encoder=encoder,
+                normalize_keys=normalize_keys,
+                neighbors=neighbors,
+            ).fit(aux_table, aux_cols, chunk.head(0), main_cols)
+        yield _join_on_index(
+            chunk,
+            aux_table,
+            main_cols,
+            index,
+            return_score=return_score,
+            match_score=match_score,
+            drop_unmatched=drop_unmatched,
+            suffixes=suffixes,
+            n_jobs=n_jobs,
+            max_distance=index.max_distance_,
         )
-        main_enc.append(main_time_enc)
-        aux_enc.append(aux_time_enc)
-    if any_str:
-        main_str_enc, aux_str_enc = _string_encoding(
+
+
+def _join_on_index(
+    main_table: pd.DataFrame,
+    aux_table: pd.DataFrame,
+    main_cols: list[str],
+    index: FuzzyJoinIndex,
+    how: Literal["left", "right"] = "left",
+    return_score: bool = False,
+    match_score: float = 0,
+    drop_unmatched: bool = False,
+    sort: bool = False,
+    suffixes: tuple[str, str] = ("_x", "_y"),
+    n_jobs: int = None,
+    max_distance: float | None = None,
+    blocks: tuple[pd.DataFrame, NDArray, NDArray] | None = None,
+) -> pd.DataFrame:
+    """Join the main table to the auxiliary table indexed by `index`.
+
+    See :func:`fuzzy_join` for a description of the parameters. The distances
+    are normalized by `max_distance` if given, and by the largest distance of
+    the matches otherwise. See :func:`_match` for `blocks`.
+    """
+    _, px = get_df_namespace(main_table, aux_table)
+    keys = _select_keys(main_table, main_cols)
+    _warn_missing_keys(keys)
+    idx_closest, matching_score, unmatched = _match(
+        keys,
+        main_cols,
+        index,
+        match_score=match_score,
+        max_distance=max_distance,
+        n_jobs=n_jobs,
+        blocks=blocks,
+    )
+
+    # Positions of the rows of the main table in the output
+    rows = np.arange(len(keys))
+    if drop_unmatched:
+        rows = rows[~unmatched]
+        matching_score = matching_score[~unmatched]
+    if sort:
+        sort_keys = keys.iloc[rows]
+        sort_keys.index = rows
+        rows = sort_keys.sort_values(by=list(main_cols)).index.to_numpy()
+
+    if px is not pd:
+        return _join_polars(
             main_table,
-            main_str_cols,
             aux_table,
-            aux_str_cols,
-            encoder=encoder,
-            analyzer=analyzer,
-            ngram_range=ngram_range,
+            rows,
+            idx_closest[rows],
+            matching_score,
+            unmatched[rows] & (not drop_unmatched),
+            how=how,
+            return_score=return_score,
+            suffixes=suffixes,
         )
-        main_enc.append(main_str_enc)
-        aux_enc.append(aux_str_enc)
-    main_enc = hstack(main_enc, format="csr")
-    aux_enc = hstack(aux_enc, format="csr")
-    idx_closest, matching_score = _nearest_matches(main_enc, aux_enc)
 
-    main_table["fj_idx"] = idx_closest
-    aux_table["fj_idx"] = aux_table.index
+    # The output is built column by column, from positional takes of both
+    # tables, and assembled with a single concatenation.
+    main_columns = _take_columns(main_table, rows)
+    aux_columns = _take_columns(aux_table, idx_closest[rows])
+    if not drop_unmatched and unmatched.any():
+        # The columns after the main keys are missing for the unmatched rows
+        if how == "left":
+            aux_columns = _mask_columns(aux_columns, unmatched[rows])
+        else:
+            main_columns = _mask_columns(main_columns, unmatched[rows])
 
-    if drop_unmatched:
-        main_table = main_table[match_score <= matching_score]
-        matching_score = matching_score[match_score <= matching_score]
+    # To keep order of columns as in pandas.merge (always left table first)
+    if how == "left":
+        left_columns, right_columns = main_columns, aux_columns
     else:
-        main_table.loc[np.ravel(match_score > matching_score), "fj_nan"] = 1
+        left_columns, right_columns = aux_columns, main_columns
+    overlap = {col.name for col in left_columns} & {col.name for col in right_columns}
+    for columns, suffix in [(left_columns, suffixes[0]), (right_columns, suffixes[1])]:
+        for col in columns:
+            if col.name in overlap:
+                col.name = f"{col.name}{suffix}"
+    columns = left_columns + right_columns
+    score_position = None
+    if return_score:
+        score = pd.Series(np.ravel(matching_score), name="matching_score")
+        names = [col.name for col in columns]
+        if "matching_score" in names:
+            score_position = names.index("matching_score")
+        else:
+            columns.append(score)
+    df_joined = pd.concat(columns, axis=1, copy=False)
+    if score_position is not None:
+        df_joined.isetitem(score_position, score)
 
-    if sort:
-        main_table.sort_values(by=[main_cols], inplace=True)
+    return df_joined
 
-    # To keep order of columns as in pandas.merge (always left table first)
+
+def _join_polars(
+    main_table: DataFrameLike,
+    aux_table: DataFrameLike,
+    main_rows: NDArray,
+    aux_rows: NDArray,
+    matching_score: NDArray,
+    masked: NDArray,
+    how: Literal["left", "right"],
+    return_score: bool,
+    suffixes: tuple[str, str],
+) -> DataFrameLike:
+    """Gather the matched rows of polars tables with joins.
+
+    The rows of the main table and of the auxiliary table in the output are
+    given by `main_rows` and `aux_rows`. The columns after the main keys are
+    missing for the `masked` rows.
+    """
+    skrub_px, px = get_df_namespace(main_table, aux_table)
     if how == "left":
-        df_joined = pd.merge(
-            main_table, aux_table, on="fj_idx", suffixes=suffixes, how=how
+        tables = [main_table, aux_table]
+        rows = [main_rows, np.where(masked, -1, aux_rows)]
+    else:
+        tables = [aux_table, main_table]
+        rows = [aux_rows, np.where(masked, -1, main_rows)]
+    left_names, right_names = tables[0].columns, tables[1].columns
+    overlap = set(left_names) & set(right_names)
+    names = [
+        [f"{name}{suffix}" if name in overlap else name for name in table_names]
+        for table_names, suffix in zip([left_names, right_names], suffixes)
+    ]
+    df_joined = skrub_px.take_rows(tables, rows, names)
+    if return_score:
+        df_joined = df_joined.with_columns(
+            px.Series("matching_score", np.ravel(matching_score))
         )
-    elif how == "right":
-        df_joined = pd.merge(
-            aux_table, main_table, on="fj_idx", suffixes=suffixes, how=how
+    return df_joined
+
+
+def _check_index(index: FuzzyJoinIndex, aux_table: pd.DataFrame) -> None:
+    """Check that a prebuilt index was fitted on the auxiliary table."""
+    if not isinstance(index, FuzzyJoinIndex):
+        raise TypeError(
+            f"Parameter 'index' should be a FuzzyJoinIndex, got {index!r}. "
+        )
+    check_is_fitted(index, "key_groups_")
+    skrub_px, _ = get_df_namespace(aux_table)
+    n_rows = skrub_px.n_rows(aux_table)
+    if index.n_samples_fit_ != n_rows:
+        raise ValueError(
+            f"The index was fitted on a table with {index.n_samples_fit_} rows, "
+            f"but the auxiliary table has {n_rows} rows. "
         )
 
-    if drop_unmatched:
-        df_joined.drop(columns=["fj_idx"], inplace=True)
+
+def _warn_missing_keys(keys: pd.DataFrame) -> None:
+    """Warn if presence of missing values in the keys."""
+    if keys.isna().any().any():
+        warnings.warn(
+            "You are merging on missing values. "
+            "The output correspondence will be random or missing. "
+            "To avoid unexpected errors you can drop them. ",
+            UserWarning,
+            stacklevel=4,
+        )
+
+
+def _match(
+    main_table: pd.DataFrame,
+    main_cols: list[str],
+    index: FuzzyJoinIndex,
+    match_score: float = 0,
+    max_distance: float | None = None,
+    n_jobs: int = None,
+    blocks: tuple[pd.DataFrame, NDArray, NDArray] | None = None,
+) -> tuple[NDArray, NDArray, NDArray]:
+    """Match the keys of the main table to the auxiliary table.
+
+    If `blocks` is given, it holds the keys of the auxiliary table and the
+    block codes of the rows of both tables, and the keys are only matched
+    within their block.
+
+    Returns
+    -------
+    ndarray
+        Position of the closest match in the auxiliary table, for each row.
+    ndarray of shape (n_samples, 1)
+        The matching scores, in [0, 1].
+    ndarray of bool
+        Whether the matching score is below `match_score`.
+    """
+    if blocks is None:
+        idx_closest, distance = index.kneighbors(main_table, main_cols, n_jobs=n_jobs)
     else:
-        mask_na = df_joined["fj_nan"] == 1
-        if mask_na.any():
-            right_cols = df_joined.columns[df_joined.columns.get_loc("fj_idx") :]
-            df_joined[right_cols] = pd.DataFrame.convert_dtypes(df_joined[right_cols])
-            df_joined.loc[mask_na, right_cols] = pd.NA
-        df_joined.drop(columns=["fj_idx", "fj_nan"], inplace=True)
+        idx_closest, distance = _block_kneighbors(
+            main_table[list(main_cols)], index, *blocks, n_jobs=n_jobs
+        )
+    # The rows without candidate in their block are not matched
+    no_match = np.isinf(distance)
+    # Normalizing distance between 0 and 1:
+    if max_distance is None:
+        max_distance = np.max(distance, initial=0, where=~no_match)
+    if max_distance > 0:
+        distance = np.minimum(distance / max_distance, 2)
+    matching_score = np.where(no_match, 0, 1 - (distance / 2))
+    unmatched = (match_score > matching_score) | no_match
+    return idx_closest, matching_score, np.ravel(unmatched)
 
-    if return_score:
-        df_joined["matching_score"] = matching_score
 
-    return df_joined
+def _block_codes(
+    main_blocks: pd.DataFrame, aux_blocks: pd.DataFrame
+) -> tuple[NDArray, NDArray]:
+    """Codes of the blocks of the rows of both tables, -1 for missing values."""
+    blocks = pd.concat(
+        [main_blocks, aux_blocks.set_axis(main_blocks.columns, axis=1)],
+        ignore_index=True,
+    )
+    codes = (
+        blocks.groupby(list(blocks.columns), sort=False, dropna=True)
+        .ngroup()
+        .fillna(-1)
+        .to_numpy(dtype=np.intp)
+    )
+    return codes[: len(main_blocks)], codes[len(main_blocks) :]
+
+
+def _block_rows(codes: NDArray) -> dict[int, NDArray]:
+    """Positions of the rows of each block, without the missing values."""
+    order = np.argsort(codes, kind="stable")
+    blocks, starts = np.unique(codes[order], return_index=True)
+    return {
+        block: rows
+        for block, rows in zip(blocks, np.split(order, starts[1:]))
+        if block >= 0
+    }
+
+
+def _block_kneighbors(
+    main_keys: pd.DataFrame,
+    index: FuzzyJoinIndex,
+    aux_keys: pd.DataFrame,
+    main_blocks: NDArray,
+    aux_blocks: NDArray,
+    n_jobs: int = None,
+) -> tuple[NDArray, NDArray]:
+    """Closest matches of the main keys among the aux keys of their block.
+
+    The distinct keys of both tables are encoded once with the encoders of
+    `index`, then each block is indexed and searched separately, in parallel.
+    The distance is infinite for the rows whose block has no aux keys.
+    """
+    # Distinct keys of each block
+    main_first, main_inverse, _ = _unique_keys(main_keys, main_blocks)
+    main_keys, main_blocks = main_keys.iloc[main_first], main_blocks[main_first]
+    aux_rows = np.flatnonzero(aux_blocks >= 0)
+    aux_first, _, _ = _unique_keys(aux_keys.iloc[aux_rows], aux_blocks[aux_rows])
+    aux_positions = aux_rows[aux_first]
+    aux_keys, aux_blocks = aux_keys.iloc[aux_positions], aux_blocks[aux_positions]
+
+    # Keys equal to a key of their block
+    aux_hashes, aux_first = np.unique(
+        index._key_hashes(aux_keys, aux_blocks), return_index=True
+    )
+    neighbors = _find_hashes(
+        index._key_hashes(main_keys, main_blocks), aux_hashes, aux_first
+    )
+    neighbors[main_keys.isna().any(axis=1).to_numpy()] = -1
+    distance = np.where(neighbors >= 0, 0.0, np.inf)[:, None]
+
+    fuzzy = np.flatnonzero((neighbors < 0) & np.isin(main_blocks, aux_blocks))
+    if len(fuzzy):
+        main_encoded = index._encode_search(main_keys.iloc[fuzzy])
+        aux_encoded = index._encode_search(aux_keys)
+        main_rows, aux_rows = _block_rows(main_blocks[fuzzy]), _block_rows(aux_blocks)
+        # The blocks searched in parallel share the working memory
+        working_memory = get_config()["working_memory"] / effective_n_jobs(n_jobs)
+        matches = Parallel(n_jobs=n_jobs, backend="threading")(
+            delayed(_run_in_memory)(
+                working_memory,
+                _search_block,
+                index,
+                main_encoded[rows],
+                aux_encoded,
+                aux_rows[block],
+            )
+            for block, rows in main_rows.items()
+        )
+        for rows, (block_neighbors, block_distance) in zip(main_rows.values(), matches):
+            neighbors[fuzzy[rows]] = block_neighbors
+            distance[fuzzy[rows]] = block_distance
+    # The rows without match are masked afterwards, whatever their neighbor
+    neighbors = np.where(neighbors >= 0, neighbors, 0)
+    if len(aux_positions):
+        neighbors = aux_positions[neighbors]
+    return neighbors[main_inverse], distance[main_inverse]
+
+
+def _search_block(
+    index: FuzzyJoinIndex, main_encoded, aux_encoded, aux_rows: NDArray
+) -> tuple[NDArray, NDArray]:
+    """Closest matches of encoded main keys among the aux keys at `aux_rows`."""
+    aux_encoded = aux_encoded[aux_rows]
+    if issparse(aux_encoded):
+        main_encoded, aux_encoded = _used_features(main_encoded, aux_encoded)
+    # A copy of the index shares its encoders, and indexes the block only
+    block_index = copy.copy(index)._fit_encoded(aux_encoded)
+    neighbors, distance = block_index._search(main_encoded)
+    return aux_rows[neighbors], distance
+
+
+def _used_features(*matrices: csr_matrix) -> list[csr_matrix]:
+    """Restrict CSR matrices to the features used by at least one of them.
+
+    The distances between the rows are unchanged, and the products of the
+    matrices do not depend on the number of hashed features anymore.
+    """
+    features, indices = np.unique(
+        np.concatenate([matrix.indices for matrix in matrices]), return_inverse=True
+    )
+    ends = np.cumsum([matrix.nnz for matrix in matrices])
+    return [
+        csr_matrix(
+            (matrix.data, matrix_indices, matrix.indptr),
+            shape=(matrix.shape[0], len(features)),
+        )
+        for matrix, matrix_indices in zip(matrices, np.split(indices, ends[:-1]))
+    ]
+
+
+def _run_in_memory(working_memory: float, func, *args, **kwargs):
+    """Call `func` within the given working memory (in MiB)."""
+    with config_context(working_memory=working_memory):
+        return func(*args, **kwargs)
+
+
+def _take_columns(table: pd.DataFrame, rows: NDArray) -> list[pd.Series]:
+    """Take rows of each column of a table, with a new range index."""
+    columns = []
+    for i in range(table.shape[1]):
+        col = table.iloc[:, i].take(rows)
+        col.index = pd.RangeIndex(len(rows))
+        columns.append(col)
+    return columns
+
+
+def _mask_columns(columns: list[pd.Series], mask: NDArray) -> list[pd.Series]:
+    """Set the masked rows to missing values, using nullable dtypes."""
+    return [col.convert_dtypes().mask(mask, pd.NA) for col in columns]
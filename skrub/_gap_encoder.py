@@ -17,12 +17,13 @@ from scipy import sparse
 from sklearn.base import BaseEstimator, TransformerMixin, clone
 from sklearn.cluster import KMeans, kmeans_plusplus
 from sklearn.decomposition._nmf import _beta_divergence
-from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.neighbors import NearestNeighbors
 from sklearn.utils import check_random_state, gen_batches
 from sklearn.utils.extmath import row_norms, safe_sparse_dot
 from sklearn.utils.validation import _num_samples, check_is_fitted
 
+from ._ngram_counts import CachedCountVectorizer, CachedHashingVectorizer
 from ._utils import check_input
 
 
@@ -88,7 +89,7 @@ class GapEncoderColumn(BaseEstimator, TransformerMixin):
         """
         # Init n-grams counts vectorizer
         if self.hashing:
-            self.ngrams_count_ = HashingVectorizer(
+            self.ngrams_count_ = CachedHashingVectorizer(
                 analyzer=self.analyzer,
                 ngram_range=self.ngram_range,
                 n_features=self.hashing_n_features,
@@ -96,18 +97,18 @@ class GapEncoderColumn(BaseEstimator, TransformerMixin):
                 alternate_sign=False,
             )
             if self.add_words:  # Init a word counts vectorizer if needed
-                self.word_count_ = HashingVectorizer(
+                self.word_count_ = CachedHashingVectorizer(
                     analyzer="word",
                     n_features=self.hashing_n_features,
                     norm=None,
                     alternate_sign=False,
                 )
         else:
-            self.ngrams_count_ = CountVectorizer(
+            self.ngrams_count_ = CachedCountVectorizer(
                 analyzer=self.analyzer, ngram_range=self.ngram_range, dtype=np.float64
             )
             if self.add_words:
-                self.word_count_ = CountVectorizer(dtype=np.float64)
+                self.word_count_ = CachedCountVectorizer(dtype=np.float64)
 
         # Init H_dict_ with empty dict to train from scratch
         self.H_dict_ = dict()
@@ -1212,7 +1213,7 @@ def get_kmeans_prototypes(
       - k-means clustering
       - nearest neighbor
     """
-    vectorizer = HashingVectorizer(
+    vectorizer = CachedHashingVectorizer(
         analyzer=analyzer,
         norm=None,
         alternate_sign=False,
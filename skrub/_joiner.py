@@ -7,9 +7,22 @@ from typing import Literal
 
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn import get_config
 from sklearn.base import BaseEstimator, TransformerMixin
 
-from skrub._fuzzy_join import fuzzy_join
+from skrub._fuzzy_join import (
+    FuzzyJoinIndex,
+    _check_index,
+    _mask_columns,
+    _match,
+    _run_in_memory,
+    _select_keys,
+    _take_columns,
+    _warn_missing_keys,
+)
+from skrub.dataframe import DataFrameLike
+from skrub.dataframe._namespace import get_df_namespace
 
 
 class Joiner(TransformerMixin, BaseEstimator):
@@ -18,11 +31,21 @@ class Joiner(TransformerMixin, BaseEstimator):
     Given a list of tables and key column names,
     fuzzy join them to the main table.
 
+    Accepts :obj:`pandas.DataFrame`, :class:`polars.DataFrame` and
+    :class:`polars.LazyFrame` inputs, and returns tables of the same type.
+
     The principle is as follows:
 
     1. The auxiliary tables and the key column names are provided at initialisation.
-    2. The main table is provided for fitting, and the auxiliary tables will be joined
-       to the main table sequentially when `Joiner.transform` is called.
+    2. The main table is provided for fitting: the keys of each auxiliary table
+       are encoded and stored in a nearest-neighbor index.
+    3. When `Joiner.transform` is called, the keys of the main table are
+       encoded and matched in the indices of all the auxiliary tables, then
+       the matched columns are gathered in the joined table.
+
+    The columns of an auxiliary table whose names are already used, by the
+    main table or by a previous auxiliary table, are suffixed with "_aux" as
+    many times as needed for all the names of the joined table to be distinct.
 
     It is advised to use hyperparameter tuning tools such as GridSearchCV
     to determine the best `match_score` parameter, as this can significantly
@@ -56,6 +79,36 @@ class Joiner(TransformerMixin, BaseEstimator):
         The lower and upper boundaries of the range of n-values for different
          n-grams used in the string similarity. All values of `n` such
          that ``min_n <= n <= max_n`` will be used.
+    normalize_keys : bool, default=False
+        Whether the string keys are lowercased and their whitespace collapsed
+        before looking for exact matches. Keys matched this way are
+        considered as perfect matches.
+    neighbors : estimator, optional
+        Nearest-neighbor search used for the keys without exact match,
+        implementing `fit` and `kneighbors` like
+        :class:`~sklearn.neighbors.NearestNeighbors`. By default, an exact
+        search is performed. Use :class:`RandomProjectionLSH` for an
+        approximate search on very large tables.
+    n_jobs : int, optional
+        The number of threads used to match the keys in the auxiliary tables
+        in parallel, or to search the closest matches if there is a single
+        auxiliary table. None means 1 unless in a
+        :obj:`joblib.parallel_backend` context. -1 means using all processors.
+    indices : list of FuzzyJoinIndex, optional
+        Prebuilt indices of the keys of the auxiliary tables, in the order of
+        `tables`, for instance loaded with :meth:`FuzzyJoinIndex.load`. The
+        auxiliary tables are then not encoded during `fit`, and `analyzer`,
+        `ngram_range`, `normalize_keys` and `neighbors` are those of the
+        indices. The matching scores are normalized by the diameter of the
+        indexed keys.
+
+    Attributes
+    ----------
+    tables_ : list of 2-tuple (:obj:`~pandas.DataFrame`, str)
+        The tables to join, with their key column names.
+    indices_ : list of FuzzyJoinIndex
+        For each auxiliary table, the fitted encoders of the keys and the
+        nearest-neighbor index of its encoded keys.
 
     See Also
     --------
@@ -134,22 +187,32 @@ class Joiner(TransformerMixin, BaseEstimator):
         match_score: float = 0.0,
         analyzer: Literal["word", "char", "char_wb"] = "char_wb",
         ngram_range: tuple[int, int] = (2, 4),
+        normalize_keys: bool = False,
+        neighbors=None,
+        n_jobs: int = None,
+        indices: list[FuzzyJoinIndex] | None = None,
     ):
         self.tables = tables
         self.main_key = main_key
         self.match_score = match_score
         self.analyzer = analyzer
         self.ngram_range = ngram_range
+        self.normalize_keys = normalize_keys
+        self.neighbors = neighbors
+        self.n_jobs = n_jobs
+        self.indices = indices
 
-    def fit(self, X: pd.DataFrame, y=None) -> "Joiner":
+    def fit(self, X: DataFrameLike, y=None) -> "Joiner":
         """Fit the instance to the main table.
 
-        In practice, just checks if the key columns in X,
-        the main table, and in the auxiliary tables exist.
+        Checks if the key columns in X, the main table, and in the auxiliary
+        tables exist, then encodes the keys of each auxiliary table and stores
+        them in a nearest-neighbor index. The encoders are fitted on the keys
+        of X and of the auxiliary table, as done by :func:`fuzzy_join`.
 
         Parameters
         ----------
-        X : :obj:`~pandas.DataFrame`, shape [n_samples, n_features]
+        X : DataFrameLike, shape [n_samples, n_features]
             The main table, to be joined to the auxiliary ones.
         y : None
             Unused, only here for compatibility.
@@ -183,34 +246,112 @@ class Joiner(TransformerMixin, BaseEstimator):
                         f"Column key {col!r} not found in columns of "
                         f"table index {table_idx}: {df.columns.tolist()}. "
                     )
+
+        if self.indices is not None:
+            if len(self.indices) != len(self.tables_):
+                raise ValueError(
+                    f"Got {len(self.indices)} indices for {len(self.tables_)} "
+                    "auxiliary tables. "
+                )
+            for index, (df, _) in zip(self.indices, self.tables_):
+                _check_index(index, df)
+            self.indices_ = list(self.indices)
+            return self
+
+        self.indices_ = [
+            FuzzyJoinIndex(
+                analyzer=self.analyzer,
+                ngram_range=self.ngram_range,
+                normalize_keys=self.normalize_keys,
+                neighbors=self.neighbors,
+            ).fit(df, np.atleast_1d(cols).tolist(), X, main_key_list)
+            for df, cols in self.tables_
+        ]
         return self
 
-    def transform(self, X: pd.DataFrame, y=None) -> pd.DataFrame:
+    def transform(self, X: DataFrameLike, y=None) -> DataFrameLike:
         """Transform `X` using the specified encoding scheme.
 
         Parameters
         ----------
-        X : :obj:`~pandas.DataFrame`, shape [n_samples, n_features]
+        X : DataFrameLike, shape [n_samples, n_features]
             The main table, to be joined to the auxiliary ones.
         y : None
             Unused, only here for compatibility.
 
         Returns
         -------
-        :obj:`~pandas.DataFrame`
-            The final joined table.
+        DataFrameLike
+            The final joined table, of the same type as `X`.
         """
 
-        for df, cols in self.tables_:
-            aux_table = df
-            X = fuzzy_join(
-                X,
-                aux_table,
-                left_on=self.main_key,
-                right_on=cols,
-                match_score=self.match_score,
-                analyzer=self.analyzer,
-                ngram_range=self.ngram_range,
-                suffixes=("", "_aux"),
+        skrub_px, px = get_df_namespace(X, *[table for table, _ in self.tables_])
+        main_key_list = np.atleast_1d(self.main_key).tolist()
+        keys = _select_keys(X, main_key_list)
+        _warn_missing_keys(keys)
+
+        # The matches only depend on the main key: they are computed for all
+        # the auxiliary tables in parallel, and their columns are gathered in
+        # a single concatenation.
+        if len(self.indices_) > 1:
+            n_jobs, search_n_jobs = self.n_jobs, None
+        else:
+            n_jobs, search_n_jobs = None, self.n_jobs
+        # The tables matched in parallel share the working memory
+        working_memory = get_config()["working_memory"] / effective_n_jobs(n_jobs)
+        matches = Parallel(n_jobs=n_jobs, backend="threading")(
+            delayed(_run_in_memory)(
+                working_memory,
+                _match,
+                keys,
+                main_key_list,
+                index,
+                self.match_score,
+                max_distance=(None if self.indices is None else index.max_distance_),
+                n_jobs=search_n_jobs,
             )
-        return X
+            for index in self.indices_
+        )
+
+        names = _joined_names(X, [aux_table for aux_table, _ in self.tables_])
+        if px is not pd:
+            return skrub_px.take_rows(
+                [X] + [aux_table for aux_table, _ in self.tables_],
+                [np.arange(len(keys))]
+                + [
+                    np.where(unmatched, -1, idx_closest)
+                    for idx_closest, _, unmatched in matches
+                ],
+                names,
+            )
+
+        columns = _take_columns(X, np.arange(len(X)))
+        for (aux_table, _), (idx_closest, _, unmatched), aux_names in zip(
+            self.tables_, matches, names[1:]
+        ):
+            aux_columns = _take_columns(aux_table, idx_closest)
+            if unmatched.any():
+                aux_columns = _mask_columns(aux_columns, unmatched)
+            for col, name in zip(aux_columns, aux_names):
+                col.name = name
+            columns.extend(aux_columns)
+        return pd.concat(columns, axis=1, copy=False)
+
+
+def _joined_names(main_table, aux_tables: list) -> list[list[str]]:
+    """Column names of the main and auxiliary tables in the joined table.
+
+    "_aux" is appended to the name of an auxiliary column until it differs
+    from the names of the main table and of the previous columns.
+    """
+    names = [list(main_table.columns)]
+    used = set(names[0])
+    for aux_table in aux_tables:
+        aux_names = []
+        for name in aux_table.columns:
+            while name in used:
+                name = f"{name}_aux"
+            used.add(name)
+            aux_names.append(name)
+        names.append(aux_names)
+    return names
@@ -177,32 +177,43 @@ class MinHashEncoder(TransformerMixin, BaseEstimator):
         self.handle_missing = handle_missing
         self.n_jobs = n_jobs
 
-    def _get_murmur_hash(self, string: str) -> NDArray:
+    def _get_murmur_hashes(self, strings: Collection[str]) -> NDArray:
         """
-        Encode a string using murmur hashing function.
+        Encode strings using murmur hashing function.
+
+        Each distinct n-gram of the strings is hashed once, and the minimum
+        over the n-grams of each string is taken with sparse row offsets.
 
         Parameters
         ----------
-        string : str
-            The string to encode.
+        strings : collection of str
+            The strings to encode.
 
         Returns
         -------
-        ndarray of shape (n_components, )
-            The encoded string.
+        ndarray of shape (len(strings), n_components)
+            The encoded strings.
         """
-        min_hashes = np.ones(self.n_components) * np.infty
-        grams = get_unique_ngrams(string, self.ngram_range)
-        if len(grams) == 0:
-            grams = get_unique_ngrams(" Na ", self.ngram_range)
-        for gram in grams:
-            hash_array = np.array(
-                [
-                    murmurhash3_32("".join(gram), seed=d, positive=True)
-                    for d in range(self.n_components)
-                ]
+        ngrams, has_ngram = get_unique_ngrams(strings, self.ngram_range)
+        # The strings without any n-gram are encoded as " Na "
+        empty = np.diff(has_ngram.indptr) == 0
+        if empty.any():
+            strings = np.where(empty, " Na ", np.asarray(strings, dtype=object))
+            ngrams, has_ngram = get_unique_ngrams(strings, self.ngram_range)
+            empty = np.diff(has_ngram.indptr) == 0
+        min_hashes = np.full((len(strings), self.n_components), np.infty)
+        if not has_ngram.nnz:
+            return min_hashes
+        starts = has_ngram.indptr[:-1][~empty]
+        for d in range(self.n_components):
+            hashes = np.fromiter(
+                (murmurhash3_32(gram, seed=d, positive=True) for gram in ngrams),
+                dtype=np.float64,
+                count=len(ngrams),
+            )
+            min_hashes[~empty, d] = np.minimum.reduceat(
+                hashes[has_ngram.indices], starts
             )
-            min_hashes = np.minimum(min_hashes, hash_array)
         return min_hashes / (2**32 - 1)
 
     def _get_fast_hash(self, string: str) -> NDArray:
@@ -235,20 +246,36 @@ class MinHashEncoder(TransformerMixin, BaseEstimator):
                 ]
             )
 
+    def _get_fast_hashes(self, strings: Collection[str]) -> NDArray:
+        """Encode strings with fast hashing function, one at a time.
+
+        Parameters
+        ----------
+        strings : collection of str
+            The strings to encode.
+
+        Returns
+        -------
+        ndarray of shape (len(strings), n_components)
+            The encoded strings, using specified encoding scheme.
+        """
+        return np.array([self._get_fast_hash(string) for string in strings])
+
     def _compute_hash_batched(
-        self, batch: Collection[str], hash_func: Callable[[str], NDArray]
+        self, batch: Collection[str], hash_func: Callable[[Collection[str]], NDArray]
     ) -> NDArray:
         """Function called to compute the hashes of a batch of strings.
 
-        Check if the string is in the hash dictionary, if not, compute the hash
-        using the specified hashing function and add it to the dictionary.
+        Check if the strings are in the hash dictionary, compute the hashes
+        of those that are not at once using the specified hashing function,
+        and add them to the dictionary.
 
         Parameters
         ----------
         batch : collection of str
-            The batch of strings to encode.
+            The batch of distinct strings to encode.
         hash_func : callable
-            Hashing function to use on the string.
+            Hashing function to use on the strings.
 
         Returns
         -------
@@ -256,13 +283,19 @@ class MinHashEncoder(TransformerMixin, BaseEstimator):
             The encoded strings, using specified encoding scheme.
         """
         res = np.zeros((len(batch), self.n_components))
+        to_hash = []
         for i, string in enumerate(batch):
-            if string not in self.hash_dict_:
-                if string == "NAN":  # true if x is a missing value
-                    self.hash_dict_[string] = np.zeros(self.n_components)
-                else:
-                    self.hash_dict_[string] = hash_func(string)
-            res[i] = self.hash_dict_[string]
+            if string in self.hash_dict_:
+                res[i] = self.hash_dict_[string]
+            elif string == "NAN":  # true if x is a missing value
+                self.hash_dict_[string] = np.zeros(self.n_components)
+            else:
+                to_hash.append(i)
+        if to_hash:
+            hashes = hash_func([batch[i] for i in to_hash])
+            for i, hash_array in zip(to_hash, hashes):
+                res[i] = hash_array
+                self.hash_dict_[batch[i]] = res[i].copy()
         return res
 
     def fit(self, X: ArrayLike, y=None) -> "MinHashEncoder":
@@ -354,9 +387,9 @@ class MinHashEncoder(TransformerMixin, BaseEstimator):
                 X[missing_mask] = "NAN"
 
         if self.hashing == "fast":
-            hash_func = self._get_fast_hash
+            hash_func = self._get_fast_hashes
         elif self.hashing == "murmur":
-            hash_func = self._get_murmur_hash
+            hash_func = self._get_murmur_hashes
         else:
             raise ValueError(
                 "Hashing function should be either 'fast' or 'murmur', "
@@ -0,0 +1,356 @@
+"""
+Nearest-neighbor searches used to match the keys of fuzzy joins.
+"""
+
+import numbers
+
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from numpy.typing import NDArray
+from scipy.sparse import csr_matrix
+from sklearn.base import BaseEstimator
+from sklearn.neighbors import KDTree
+from sklearn.utils import (
+    check_array,
+    check_random_state,
+    gen_batches,
+    gen_even_slices,
+    get_chunk_n_rows,
+)
+from sklearn.utils.extmath import row_norms
+from sklearn.utils.validation import check_is_fitted
+
+
+def _nearest_block(
+    X: csr_matrix, Y_T: csr_matrix, Y_squared_norms: NDArray
+) -> tuple[NDArray, NDArray]:
+    """Closest row of Y and its Euclidean distance, for each row of X."""
+    # ||x - y||^2 = ||x||^2 + ||y||^2 - 2 x.y, where the dot products are a
+    # sparse product. For the unit-norm TF-IDF rows, this is the cosine
+    # distance up to a constant.
+    distance = (X @ Y_T).toarray()
+    distance *= -2
+    distance += Y_squared_norms
+    distance += row_norms(X, squared=True)[:, None]
+    neighbors = np.argmin(distance, axis=1)
+    distance = np.take_along_axis(distance, neighbors[:, None], axis=1)
+    return neighbors, np.sqrt(np.maximum(distance, 0))
+
+
+def _nearest_rows(
+    X: csr_matrix, Y_T: csr_matrix, Y_squared_norms: NDArray, n_jobs: int = None
+) -> tuple[NDArray, NDArray]:
+    """Find the closest row of Y for each row of X.
+
+    The distances are computed over blocks of rows of X, so that the memory
+    used for the distance matrix is bounded, and the blocks are processed
+    in parallel threads.
+
+    Parameters
+    ----------
+    X : csr_matrix of shape (n_samples_X, n_features)
+        The rows to match.
+    Y_T : csr_matrix of shape (n_features, n_samples_Y)
+        The transpose of the rows in which the matches are searched, as a
+        CSR matrix (e.g. ``Y.T.tocsr()``), so that it is not converted again
+        for each block.
+    Y_squared_norms : ndarray of shape (n_samples_Y,)
+        The squared Euclidean norms of the rows of Y.
+    n_jobs : int, optional
+        The number of threads to use. None means 1 unless in a
+        :obj:`joblib.parallel_backend` context. -1 means using all processors.
+
+    Returns
+    -------
+    ndarray of shape (n_samples_X,)
+        Index of the closest row of Y.
+    ndarray of shape (n_samples_X, 1)
+        Euclidean distance to the closest row of Y.
+    """
+    # The blocks processed in parallel share the working memory
+    batch_size = get_chunk_n_rows(
+        row_bytes=8 * max(Y_T.shape[1], 1) * effective_n_jobs(n_jobs)
+    )
+    blocks = Parallel(n_jobs=n_jobs, backend="threading")(
+        delayed(_nearest_block)(X[batch], Y_T, Y_squared_norms)
+        for batch in gen_batches(X.shape[0], batch_size)
+    )
+    if not blocks:
+        return np.empty(0, dtype=np.intp), np.empty((0, 1))
+    neighbors, distance = zip(*blocks)
+    return np.concatenate(neighbors), np.concatenate(distance)
+
+
+def _nearest_sorted(
+    x: NDArray, sorted_values: NDArray, order: NDArray
+) -> tuple[NDArray, NDArray]:
+    """Find the closest value for each element of x, with a sorted search.
+
+    Parameters
+    ----------
+    x : ndarray of shape (n_samples,)
+        The values to match.
+    sorted_values : ndarray of shape (n_values,)
+        The values in which the matches are searched, sorted.
+    order : ndarray of shape (n_values,)
+        The position of each sorted value in the original values. Ties are
+        broken in favor of the smallest position.
+
+    Returns
+    -------
+    ndarray of shape (n_samples,)
+        Position of the closest value in the original values.
+    ndarray of shape (n_samples, 1)
+        Absolute difference with the closest value.
+    """
+    above = np.minimum(np.searchsorted(sorted_values, x), len(sorted_values) - 1)
+    below = np.maximum(above - 1, 0)
+    distance_above = np.abs(sorted_values[above] - x)
+    distance_below = np.abs(x - sorted_values[below])
+    pick_above = (distance_above < distance_below) | (
+        (distance_above == distance_below) & (order[above] < order[below])
+    )
+    neighbors = np.where(pick_above, order[above], order[below])
+    distance = np.where(pick_above, distance_above, distance_below)
+    return neighbors, distance[:, None]
+
+
+def _tree_query(
+    tree: KDTree, X: NDArray, n_jobs: int = None
+) -> tuple[NDArray, NDArray]:
+    """Find the closest point of a KD-tree for each row of X, in parallel threads.
+
+    Returns
+    -------
+    ndarray of shape (n_samples,)
+        Index of the closest point.
+    ndarray of shape (n_samples, 1)
+        Euclidean distance to the closest point.
+    """
+    n_slices = min(effective_n_jobs(n_jobs), max(X.shape[0], 1))
+    blocks = Parallel(n_jobs=n_jobs, backend="threading")(
+        delayed(tree.query)(X[batch], k=1)
+        for batch in gen_even_slices(X.shape[0], n_slices)
+    )
+    distance, neighbors = zip(*blocks)
+    return np.concatenate(neighbors)[:, 0], np.concatenate(distance)
+
+
+class RandomProjectionLSH(BaseEstimator):
+    """Approximate nearest-neighbor search with random-projection hashing.
+
+    Each of the `n_tables` hash tables splits the space with `n_bits` random
+    hyperplanes, and puts the rows on the same side of all of them in the
+    same bucket. The closest match of a query is searched among the rows
+    sharing a bucket with it in at least one table, which are likely to have
+    a high cosine similarity with it. Queries that share no bucket with any
+    row are searched exhaustively.
+
+    This can be passed as the `neighbors` parameter of :func:`fuzzy_join` or
+    :class:`Joiner`, to match keys against very large tables.
+
+    Parameters
+    ----------
+    n_tables : int, default=16
+        Number of hash tables. More tables find more candidates, which
+        increases the recall at the cost of a slower search.
+    n_bits : int, default=16
+        Number of hyperplanes per table, between 1 and 64. More hyperplanes
+        make smaller buckets, which speeds up the search but lowers the
+        recall.
+    random_state : int or RandomState, optional
+        Controls the random hyperplanes, for reproducible results.
+
+    Attributes
+    ----------
+    features_ : ndarray of shape (n_used_features,)
+        The features that are non-zero in at least one of the rows seen
+        during fit. The other features are orthogonal to all these rows, and
+        are not projected.
+    projections_ : ndarray of shape (n_used_features, n_tables * n_bits)
+        The normal vectors of the hyperplanes, restricted to `features_`.
+    order_ : ndarray of shape (n_samples_fit, n_tables)
+        The rows seen during fit, sorted by their bucket in each table.
+    sorted_buckets_ : ndarray of shape (n_samples_fit, n_tables)
+        The buckets of the rows seen during fit, in the order of `order_`.
+    X_fit_ : csr_matrix of shape (n_samples_fit, n_features)
+        The rows seen during fit.
+    squared_norms_ : ndarray of shape (n_samples_fit,)
+        The squared Euclidean norms of the rows seen during fit.
+    n_features_in_ : int
+        Number of features seen during fit.
+
+    See Also
+    --------
+    fuzzy_join :
+        Join two tables (dataframes) based on approximate column matching.
+
+    Examples
+    --------
+    >>> import pandas as pd
+    >>> from skrub import fuzzy_join
+    >>> df1 = pd.DataFrame({'a': ['ana', 'lala', 'nana'], 'b': [1, 2, 3]})
+    >>> df2 = pd.DataFrame({'a': ['anna', 'lala', 'ana', 'nnana'], 'c': [5, 6, 7, 8]})
+    >>> neighbors = RandomProjectionLSH(random_state=0)
+    >>> fuzzy_join(df1, df2, on='a', neighbors=neighbors)
+        a_x  b    a_y  c
+    0   ana  1    ana  7
+    1  lala  2   lala  6
+    2  nana  3  nnana  8
+    """
+
+    def __init__(self, n_tables=16, n_bits=16, random_state=None):
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.random_state = random_state
+
+    def _project(self, X: csr_matrix) -> NDArray:
+        """Products of the rows of X with the normal vectors of the hyperplanes."""
+        # Only the features seen during fit are kept: the hyperplanes are
+        # restricted to them, so that their size does not depend on the
+        # total number of (e.g. hashed) features.
+        columns = np.searchsorted(self.features_, X.indices)
+        kept = columns < len(self.features_)
+        kept[kept] = self.features_[columns[kept]] == X.indices[kept]
+        rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+        indptr = np.zeros(X.shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[kept], minlength=X.shape[0]), out=indptr[1:])
+        X = csr_matrix(
+            (X.data[kept], columns[kept], indptr),
+            shape=(X.shape[0], len(self.features_)),
+        )
+        return np.asarray(X @ self.projections_)
+
+    def _hash(self, X: csr_matrix) -> NDArray:
+        """Bucket of each row of X, in each table."""
+        above = self._project(X) > 0
+        above = above.reshape(X.shape[0], self.n_tables, self.n_bits)
+        powers = np.left_shift(np.uint64(1), np.arange(self.n_bits, dtype=np.uint64))
+        return np.bitwise_or.reduce(np.where(above, powers, np.uint64(0)), axis=2)
+
+    def fit(self, X, y=None) -> "RandomProjectionLSH":
+        """Hash the rows in which the neighbors are searched.
+
+        Parameters
+        ----------
+        X : {array-like, sparse matrix} of shape (n_samples, n_features)
+            The rows in which the neighbors are searched.
+        y : None
+            Unused, only here for compatibility.
+
+        Returns
+        -------
+        RandomProjectionLSH
+            The fitted instance (self).
+        """
+        if not isinstance(self.n_tables, numbers.Integral) or self.n_tables < 1:
+            raise ValueError(
+                f"Got n_tables={self.n_tables!r}, but expected a positive integer. "
+            )
+        if not isinstance(self.n_bits, numbers.Integral) or not 1 <= self.n_bits <= 64:
+            raise ValueError(
+                f"Got n_bits={self.n_bits!r}, but expected an integer between 1 "
+                "and 64. "
+            )
+        X = csr_matrix(check_array(X, accept_sparse="csr", dtype=np.float64))
+        self.n_features_in_ = X.shape[1]
+        # Projecting a query on the features seen during fit does not change
+        # its angles with the rows, which are all orthogonal to the others
+        self.features_ = np.unique(X.indices)
+        rng = check_random_state(self.random_state)
+        self.projections_ = rng.standard_normal(
+            (len(self.features_), self.n_tables * self.n_bits)
+        ).astype(np.float32)
+        buckets = self._hash(X)
+        self.order_ = np.argsort(buckets, axis=0, kind="stable")
+        self.sorted_buckets_ = np.take_along_axis(buckets, self.order_, axis=0)
+        self.X_fit_ = X
+        self.squared_norms_ = row_norms(X, squared=True)
+        return self
+
+    def _candidates(
+        self, buckets: NDArray, start: NDArray, stop: NDArray
+    ) -> tuple[NDArray, NDArray]:
+        """Pairs of (query, row) sharing a bucket, without duplicates."""
+        queries, rows = [], []
+        for table in range(self.n_tables):
+            counts = stop[:, table] - start[:, table]
+            query = np.repeat(np.arange(len(buckets)), counts)
+            offset = np.arange(counts.sum()) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            queries.append(query)
+            rows.append(self.order_[start[query, table] + offset, table])
+        pairs = np.unique(
+            np.concatenate(queries) * self.X_fit_.shape[0] + np.concatenate(rows)
+        )
+        return pairs // self.X_fit_.shape[0], pairs % self.X_fit_.shape[0]
+
+    def kneighbors(self, X, n_neighbors=1, return_distance=True):
+        """Find the approximate nearest neighbor of each row of X.
+
+        Parameters
+        ----------
+        X : {array-like, sparse matrix} of shape (n_queries, n_features)
+            The query rows.
+        n_neighbors : int, default=1
+            Number of neighbors to return. Only 1 is supported.
+        return_distance : bool, default=True
+            Whether to return the distances.
+
+        Returns
+        -------
+        neigh_dist : ndarray of shape (n_queries, 1)
+            Euclidean distance to the neighbor. Only present if
+            `return_distance=True`.
+        neigh_ind : ndarray of shape (n_queries, 1)
+            Index of the neighbor in the rows seen during fit.
+        """
+        check_is_fitted(self, "projections_")
+        if n_neighbors != 1:
+            raise ValueError(
+                f"Got n_neighbors={n_neighbors!r}, but only 1 neighbor is supported. "
+            )
+        X = csr_matrix(check_array(X, accept_sparse="csr", dtype=np.float64))
+        squared_norms = row_norms(X, squared=True)
+        buckets = self._hash(X)
+        start = np.empty_like(buckets, dtype=np.intp)
+        stop = np.empty_like(buckets, dtype=np.intp)
+        for table in range(self.n_tables):
+            sorted_buckets = self.sorted_buckets_[:, table]
+            start[:, table] = np.searchsorted(sorted_buckets, buckets[:, table])
+            stop[:, table] = np.searchsorted(
+                sorted_buckets, buckets[:, table], side="right"
+            )
+
+        neighbors = np.full(X.shape[0], -1, dtype=np.intp)
+        distance = np.zeros(X.shape[0])
+        # Bound the memory used by the candidate pairs
+        n_candidates = max((stop - start).sum() // max(X.shape[0], 1), 1)
+        batch_size = get_chunk_n_rows(row_bytes=8 * n_candidates)
+        for batch in gen_batches(X.shape[0], batch_size):
+            queries, rows = self._candidates(buckets[batch], start[batch], stop[batch])
+            queries += batch.start
+            squared_distance = (
+                squared_norms[queries]
+                + self.squared_norms_[rows]
+                - 2
+                * np.asarray(X[queries].multiply(self.X_fit_[rows]).sum(axis=1))[:, 0]
+            )
+            order = np.lexsort((squared_distance, queries))
+            _, first = np.unique(queries[order], return_index=True)
+            best = order[first]
+            neighbors[queries[best]] = rows[best]
+            distance[queries[best]] = np.sqrt(np.maximum(squared_distance[best], 0))
+
+        missing = np.flatnonzero(neighbors < 0)
+        if len(missing):
+            # Transposed once for all the blocks of the exhaustive search
+            neighbors[missing], missing_distance = _nearest_rows(
+                X[missing], self.X_fit_.T.tocsr(), self.squared_norms_
+            )
+            distance[missing] = missing_distance[:, 0]
+
+        if return_distance:
+            return distance[:, None], neighbors[:, None]
+        return neighbors[:, None]
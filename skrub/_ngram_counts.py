@@ -0,0 +1,332 @@
+"""
+N-gram counts shared across the encoders.
+
+Several encoders (and several columns encoded by the same encoder) tokenize
+the same strings into n-grams. The :class:`CachedCountVectorizer`,
+:class:`CachedHashingVectorizer` and :class:`CachedTfidfVectorizer` store the
+n-gram counts of the strings they have seen in a process-wide cache, keyed by
+the analysis parameters, so that each distinct string is only tokenized once.
+"""
+
+import threading
+from collections import Counter
+from collections.abc import Callable, Hashable
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+from scipy import sparse
+from sklearn.feature_extraction.text import (
+    CountVectorizer,
+    HashingVectorizer,
+    TfidfVectorizer,
+)
+from sklearn.preprocessing import normalize
+
+from ._utils import LRUDict
+
+# Maximum number of strings whose n-gram counts are kept, per set of
+# analysis parameters.
+NGRAM_CACHE_SIZE = 2**14
+
+_ngram_caches: dict[Hashable, "NgramCountCache"] = {}
+_ngram_caches_lock = threading.Lock()
+
+
+class NgramCountCache:
+    """Cache of the n-gram counts of strings.
+
+    The counts of the last `capacity` strings are kept in an LRU dict. Each
+    string is stored with its own n-grams, so that the memory used by the
+    cache is bounded by `capacity` and released when a string is evicted.
+
+    Parameters
+    ----------
+    capacity : int
+        Maximum number of strings whose counts are kept.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.rows = LRUDict(capacity)
+
+    def count(self, strings, analyzer: Callable) -> list[tuple[NDArray, NDArray]]:
+        """Count the n-grams of unique strings.
+
+        Parameters
+        ----------
+        strings : sequence of str
+            The strings, without duplicates.
+        analyzer : callable
+            Function splitting a string into n-grams, as returned by
+            :meth:`CountVectorizer.build_analyzer`.
+
+        Returns
+        -------
+        list of (ndarray, ndarray)
+            For each string, its distinct n-grams (in order of first
+            appearance in the string) and their counts.
+        """
+        values, missing = self.rows.get_many(strings)
+        for i in missing:
+            string_counts = Counter(analyzer(strings[i]))
+            ngrams = np.empty(len(string_counts), dtype=object)
+            ngrams[:] = list(string_counts)
+            counts = np.fromiter(
+                string_counts.values(), dtype=np.float64, count=len(string_counts)
+            )
+            values[i] = (ngrams, counts)
+        self.rows.set_many((strings[i], values[i]) for i in missing)
+        return values
+
+
+def get_ngram_cache(key: Hashable) -> NgramCountCache:
+    """Return the n-gram cache shared by the vectorizers with the given key."""
+    with _ngram_caches_lock:
+        if key not in _ngram_caches:
+            _ngram_caches[key] = NgramCountCache(NGRAM_CACHE_SIZE)
+        return _ngram_caches[key]
+
+
+def clear_ngram_caches() -> None:
+    """Empty the n-gram caches, e.g. to release memory."""
+    with _ngram_caches_lock:
+        _ngram_caches.clear()
+
+
+class _CachedNgramsMixin:
+    """Access to the n-gram cache shared by the vectorizers."""
+
+    def _get_ngram_cache(self) -> NgramCountCache | None:
+        if (
+            self.input != "content"
+            or not isinstance(self.analyzer, str)
+            or self.preprocessor is not None
+            or self.tokenizer is not None
+            or self.stop_words is not None
+        ):
+            return None
+        key = (
+            self.analyzer,
+            tuple(self.ngram_range),
+            self.lowercase,
+            self.strip_accents,
+            self.token_pattern,
+            self.encoding,
+            self.decode_error,
+        )
+        return get_ngram_cache(key)
+
+    def _count_unique(self, raw_documents, cache: NgramCountCache):
+        """Count the n-grams of the unique documents with the cache.
+
+        Returns None when the documents must be handled by the parent
+        vectorizer, e.g. to raise the usual errors. Iterators are not
+        consumed, and are left to the parent vectorizer as well.
+        """
+        if not hasattr(raw_documents, "__len__"):
+            return None
+        documents = np.asarray(list(raw_documents), dtype=object)
+        if documents.ndim != 1:
+            return None
+        codes, uniques = pd.factorize(documents)
+        if (codes < 0).any():
+            # Missing values
+            return None
+        values = cache.count(uniques, self.build_analyzer())
+        lengths = np.fromiter(
+            (len(ngrams) for ngrams, _ in values), dtype=np.int64, count=len(values)
+        )
+        if values:
+            ngrams = np.concatenate([ngrams for ngrams, _ in values])
+            data = np.concatenate([data for _, data in values])
+        else:
+            ngrams, data = np.empty(0, dtype=object), np.empty(0)
+        return codes, ngrams, data, lengths
+
+
+class CachedCountVectorizer(_CachedNgramsMixin, CountVectorizer):
+    """CountVectorizer sharing the n-gram counts of the strings it has seen.
+
+    The output is identical to the one of a :class:`CountVectorizer` with the
+    same parameters. The n-gram counts of each distinct document are computed
+    once and stored in a cache shared by all the vectorizers with the same
+    analysis parameters, so that a column encoded by several encoders, or
+    fitted and then transformed, is tokenized only once per process.
+
+    The cache is only used with the built-in analyzers, and without custom
+    preprocessor, tokenizer or stop words. It is also not used to fit a
+    vocabulary that is fixed or limited by `max_df`, `min_df` or
+    `max_features`. Otherwise, this behaves exactly as a
+    :class:`CountVectorizer`.
+    """
+
+    def _count_matrix(self, codes, columns, data, lengths, sort_key, n_features):
+        """Assemble the count matrix of the documents.
+
+        The entries with a negative column are dropped, and the entries of
+        each row are ordered by `sort_key`.
+        """
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        kept = np.flatnonzero(columns >= 0)
+        kept = kept[np.lexsort((sort_key[kept], rows[kept]))]
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[kept], minlength=len(lengths)), out=indptr[1:])
+        X = sparse.csr_matrix(
+            (data[kept], columns[kept], indptr),
+            shape=(len(lengths), n_features),
+            dtype=self.dtype,
+        )[codes]
+        if self.binary:
+            X.data.fill(1)
+        return X
+
+    def fit_transform(self, raw_documents, y=None):
+        """Learn the vocabulary dictionary and return the document-term matrix.
+
+        Parameters
+        ----------
+        raw_documents : iterable
+            An iterable which generates str objects.
+        y : None
+            This parameter is ignored.
+
+        Returns
+        -------
+        X : sparse matrix of shape (n_samples, n_features)
+            Document-term matrix.
+        """
+        cache = self._get_ngram_cache()
+        if (
+            cache is None
+            or isinstance(raw_documents, str)
+            or self.vocabulary is not None
+            or self.max_df != 1.0
+            or self.min_df != 1
+            or self.max_features is not None
+        ):
+            return super().fit_transform(raw_documents, y)
+        counted = self._count_unique(raw_documents, cache)
+        if counted is None:
+            return super().fit_transform(raw_documents, y)
+        codes, ngrams, data, lengths = counted
+
+        # The n-grams are numbered in order of first appearance, as the
+        # CountVectorizer does before sorting the features: the entries of
+        # each row are stored in this order, then mapped to sorted features.
+        first_appearance, ngrams = pd.factorize(ngrams)
+        if not len(ngrams):
+            raise ValueError(
+                "empty vocabulary; perhaps the documents only contain stop words"
+            )
+        order = np.argsort(ngrams)
+        vocabulary = ngrams[order]
+        columns = np.empty(len(order), dtype=np.int64)
+        columns[order] = np.arange(len(order))
+        X = self._count_matrix(
+            codes,
+            columns[first_appearance],
+            data,
+            lengths,
+            first_appearance,
+            len(vocabulary),
+        )
+        self.vocabulary_ = dict(zip(vocabulary.tolist(), range(len(vocabulary))))
+        self.fixed_vocabulary_ = False
+        return X
+
+    def transform(self, raw_documents):
+        """Transform documents to a document-term matrix.
+
+        Parameters
+        ----------
+        raw_documents : iterable
+            An iterable which generates str objects.
+
+        Returns
+        -------
+        X : sparse matrix of shape (n_samples, n_features)
+            Document-term matrix.
+        """
+        cache = self._get_ngram_cache()
+        if (
+            cache is None
+            or isinstance(raw_documents, str)
+            or not hasattr(self, "vocabulary_")
+        ):
+            return super().transform(raw_documents)
+        counted = self._count_unique(raw_documents, cache)
+        if counted is None:
+            return super().transform(raw_documents)
+        codes, ngrams, data, lengths = counted
+
+        columns = np.fromiter(
+            map(self.vocabulary_.get, ngrams, repeat(-1)),
+            dtype=np.int64,
+            count=len(ngrams),
+        )
+        return self._count_matrix(
+            codes, columns, data, lengths, columns, len(self.vocabulary_)
+        )
+
+
+class CachedTfidfVectorizer(TfidfVectorizer, CachedCountVectorizer):
+    """TfidfVectorizer sharing the n-gram counts of the strings it has seen.
+
+    The counts are computed by :class:`CachedCountVectorizer`, with the same
+    restrictions, then weighted as done by the :class:`TfidfVectorizer`.
+    """
+
+
+class CachedHashingVectorizer(_CachedNgramsMixin, HashingVectorizer):
+    """HashingVectorizer sharing the n-gram counts of the strings it has seen.
+
+    The output is identical to the one of a :class:`HashingVectorizer` with
+    the same parameters. The n-gram counts of the distinct documents are read
+    from the cache shared with the other cached vectorizers, and each
+    distinct n-gram is hashed once. The cache is only used with the built-in
+    analyzers, and without custom preprocessor, tokenizer or stop words.
+    """
+
+    def transform(self, X):
+        """Transform a sequence of documents to a document-term matrix.
+
+        Parameters
+        ----------
+        X : iterable over raw text documents, length = n_samples
+            Samples. Each sample must be a text document.
+
+        Returns
+        -------
+        X : sparse matrix of shape (n_samples, n_features)
+            Document-term matrix.
+        """
+        cache = self._get_ngram_cache()
+        if cache is None or isinstance(X, str):
+            return super().transform(X)
+        self._validate_ngram_range()
+        counted = self._count_unique(X, cache)
+        if counted is None:
+            return super().transform(X)
+        codes, ngrams, data, lengths = counted
+
+        ngram_codes, distinct = pd.factorize(ngrams)
+        columns, signs = np.empty(0, dtype=np.int32), np.empty(0)
+        if len(distinct):
+            # A single feature (and its sign) per distinct n-gram
+            hashed = self._get_hasher().transform([ngram] for ngram in distinct)
+            columns, signs = hashed.indices[ngram_codes], hashed.data[ngram_codes]
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        X = sparse.csr_matrix(
+            (data * signs, (rows, columns)),
+            shape=(len(lengths), self.n_features),
+            dtype=self.dtype,
+        )
+        X.sum_duplicates()
+        X = X[codes]
+        if self.binary:
+            X.data.fill(1)
+        if self.norm is not None:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
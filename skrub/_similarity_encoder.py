@@ -3,97 +3,165 @@ Implements the SimilarityEncoder, a generalization of the OneHotEncoder,
 which encodes similarity instead of equality of values.
 """
 
+import numbers
+from collections.abc import Iterator
 from typing import Literal
 
 import numpy as np
 import pandas as pd
 import sklearn
 from joblib import Parallel, delayed
+from numpy.random import RandomState
 from numpy.typing import ArrayLike, NDArray
 from scipy import sparse
 from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
 from sklearn.preprocessing import OneHotEncoder
-from sklearn.utils import parse_version
+from sklearn.utils import gen_batches, get_chunk_n_rows, parse_version
 from sklearn.utils.validation import check_is_fitted
 
-from ._string_distances import get_ngram_count, preprocess
+from ._gap_encoder import get_kmeans_prototypes
+from ._ngram_counts import CachedCountVectorizer
+from ._string_distances import (
+    build_ngram_index,
+    get_ngram_count,
+    ngram_intersection,
+    preprocess,
+)
+from ._utils import LRUDict
 
 # Ignore lines too long, first docstring lines can't be cut
 # flake8: noqa: E501
 
 
-def _ngram_similarity_one_sample_inplace(
-    x_count_vector: NDArray,
-    vocabulary_count_matrix: NDArray,
-    str_x: str,
+def _ngram_similarity_block(
+    X_count_matrix: sparse.csr_matrix,
+    X_ngram_counts: NDArray,
+    vocabulary_ngram_index: list[sparse.csr_matrix],
     vocabulary_ngram_counts: NDArray,
-    se_dict: dict,
-    unq_X: NDArray,
-    i: int,
-    ngram_range: tuple[int, int],
+    out: NDArray,
 ) -> None:
     """
-    Update inplace a dict of similarities between a string and a vocabulary
+    Compute inplace the similarities between a block of samples and a vocabulary
+
+    Only the pairs of sample and category that share at least one n-gram are
+    computed, the other similarities are zero.
 
     Parameters
     ----------
-    x_count_vector : ndarray
-        Count vector of the sample based on the ngrams of the vocabulary
-    vocabulary_count_matrix : ndarray
-        Count vector of the vocabulary based on its ngrams
-    str_x: str
-        The actual sample string
-    vocabulary_ngram_counts : ndarray
+    X_count_matrix : csr_matrix of shape (n_samples, n_ngrams)
+        Count vectors of the samples based on the ngrams of the vocabulary
+    X_ngram_counts : ndarray of shape (n_samples,)
+        Number of ngrams of each sample
+    vocabulary_ngram_index : list of csr_matrix of shape (n_ngrams, n_categories)
+        Inverted n-gram index of the vocabulary, see :func:`build_ngram_index`
+    vocabulary_ngram_counts : ndarray of shape (n_categories,)
         Number of ngrams for each unique element of the vocabulary
-    se_dict : dict
-        Dictionary containing the similarities for each x in unq_X
-    unq_X : ndarray
-        The arrays of all unique samples
-    i : str
-        The index of x_count_vector in the csr count matrix
-    ngram_range : 2-tuple of int
-        The lower and upper boundaries of the range of n-values for different
-        n-grams used in the string similarity. All values of `n` such
-        that ``min_n <= n <= max_n`` will be used.
+    out : ndarray of shape (n_samples, n_categories)
+        Array in which the similarities are written
     """
-    nonzero_idx = x_count_vector.indices
-    nonzero_vals = x_count_vector.data
+    same_grams = ngram_intersection(X_count_matrix, vocabulary_ngram_index)
+    rows = np.repeat(np.arange(same_grams.shape[0]), np.diff(same_grams.indptr))
+    cols = same_grams.indices
 
-    same_grams = np.asarray(
-        (vocabulary_count_matrix[:, nonzero_idx].minimum(nonzero_vals)).sum(axis=1)
-    )
-
-    all_grams = (
-        get_ngram_count(str_x, ngram_range) + vocabulary_ngram_counts - same_grams
-    )
+    all_grams = X_ngram_counts[rows] + vocabulary_ngram_counts[cols] - same_grams.data
     similarity = np.divide(
-        same_grams, all_grams, out=np.zeros_like(same_grams), where=all_grams != 0
+        same_grams.data,
+        all_grams,
+        out=np.zeros_like(all_grams),
+        where=all_grams != 0,
     )
-    se_dict[unq_X[i]] = similarity.reshape(-1)
+    out[:] = 0
+    out[rows, cols] = similarity
 
 
-def ngram_similarity_matrix(
+def _truncate_similarities(
+    similarities: NDArray,
+    top_k: int | None,
+    min_similarity: float,
+) -> None:
+    """
+    Set inplace to zero the similarities that should not be kept.
+
+    Parameters
+    ----------
+    similarities : ndarray of shape (n_samples, n_categories)
+        Similarities between samples and categories.
+    top_k : int, optional
+        Only the `top_k` largest similarities of each row are kept.
+        If `None`, all of them are kept.
+    min_similarity : float
+        Similarities strictly lower than this value are set to zero.
+    """
+    if min_similarity > 0:
+        similarities[similarities < min_similarity] = 0
+    if top_k is not None and top_k < similarities.shape[1]:
+        # Ties between the k-th largest similarities are broken arbitrarily
+        discarded = np.argpartition(similarities, -top_k, axis=1)[:, :-top_k]
+        np.put_along_axis(similarities, discarded, 0, axis=1)
+
+
+def get_most_frequent(prototypes: NDArray, n_prototypes: int) -> NDArray:
+    """Get the `n_prototypes` most frequent values of `prototypes`.
+
+    Ties are broken by keeping the first values in lexicographic order.
+    The returned values are sorted.
+    """
+    values, counts = np.unique(prototypes, return_counts=True)
+    sorted_indexes = np.argsort(-counts, kind="stable")[:n_prototypes]
+    return np.sort(values[sorted_indexes])
+
+
+def iter_ngram_similarity_matrix(
     X,
     cats: list[str],
     ngram_range: tuple[int, int],
     analyzer: Literal["word", "char", "char_wb"],
     hashing_dim: int,
     dtype: type = np.float64,
-) -> NDArray:
+    batch_size: int | None = None,
+) -> Iterator[tuple[NDArray, NDArray]]:
     """
-    Similarity encoding for dirty categorical variables:
-    Given two arrays of strings, returns the similarity encoding matrix
-    of size len(X) x len(cats)
+    Iterate over chunks of the similarity encoding matrix of `X`.
 
-    ngram_sim(s_i, s_j) =
-        ||min(ci, cj)||_1 / (||ci||_1 + ||cj||_1 - ||min(ci, cj)||_1)
+    The similarities are computed for blocks of unique values of `X`, and
+    each block is returned with the indices of the rows of `X` that it
+    encodes, so that the full matrix never has to be held in memory.
+
+    Parameters
+    ----------
+    X : array-like of str
+        The strings to encode.
+    cats : list of str
+        The categories to compare the strings to.
+    ngram_range : 2-tuple of int
+        The lower and upper boundaries of the range of n-values for different
+        n-grams used in the string similarity.
+    analyzer : {'word', 'char', 'char_wb'}
+        Analyzer parameter for the HashingVectorizer / CountVectorizer.
+    hashing_dim : int
+        If falsy, the base vectorizer is a CountVectorizer, otherwise it is a
+        HashingVectorizer with a number of features equal to `hashing_dim`.
+    dtype : number type, default=float64
+        Desired dtype of output.
+    batch_size : int, optional
+        Number of unique values encoded at once. By default, it is chosen
+        so that each block fits in scikit-learn's `working_memory`.
+
+    Yields
+    ------
+    indices : ndarray of int
+        Indices of the rows of `X` encoded in this chunk.
+    similarities : ndarray of shape (len(indices), len(cats))
+        Similarities between these rows and the categories.
     """
     min_n, max_n = ngram_range
-    unq_X = np.unique(X)
+    X = np.asarray(X)
+    unq_X, unq_inverse = np.unique(X, return_inverse=True)
+    unq_inverse = unq_inverse.reshape(-1)
     cats = np.array([" %s " % cat for cat in cats])
     unq_X_ = np.array([" %s " % x for x in unq_X])
     if not hashing_dim:
-        vectorizer = CountVectorizer(
+        vectorizer = CachedCountVectorizer(
             analyzer=analyzer, ngram_range=(min_n, max_n), dtype=dtype
         )
         vectorizer.fit(np.concatenate((cats, unq_X_)))
@@ -108,28 +176,61 @@ def ngram_similarity_matrix(
         )
         vectorizer.fit(X)
     count_cats = vectorizer.transform(cats)
-    count_X = vectorizer.transform(unq_X_)
-    # We don't need the vectorizer anymore, delete it to save memory
-    del vectorizer
-    sum_cats = np.asarray(count_cats.sum(axis=1))
-    SE_dict = {}
-
-    for i, x in enumerate(count_X):
-        _, nonzero_idx, nonzero_vals = sparse.find(x)
-        same_grams = np.asarray(
-            (count_cats[:, nonzero_idx].minimum(nonzero_vals)).sum(axis=1)
+    cats_ngram_index = build_ngram_index(count_cats)
+    sum_cats = np.asarray(count_cats.sum(axis=1), dtype=np.float64).reshape(-1)
+    # We don't need the counts of the categories anymore, delete them
+    # to save memory
+    del count_cats
+
+    # Rows of X sorted by unique value, to gather the rows of each block
+    order = np.argsort(unq_inverse, kind="stable")
+    bounds = np.searchsorted(unq_inverse[order], np.arange(len(unq_X) + 1))
+
+    if batch_size is None:
+        batch_size = get_chunk_n_rows(
+            row_bytes=np.dtype(dtype).itemsize * max(len(cats), 1)
+        )
+    for batch in gen_batches(len(unq_X), batch_size):
+        count_X = vectorizer.transform(unq_X_[batch])
+        sum_X = np.asarray(count_X.sum(axis=1), dtype=np.float64).reshape(-1)
+        similarities = np.empty((count_X.shape[0], len(cats)), dtype=dtype)
+        _ngram_similarity_block(
+            count_X, sum_X, cats_ngram_index, sum_cats, similarities
         )
-        all_grams = x.sum() + sum_cats - same_grams
-        similarity = np.divide(same_grams, all_grams)
-        SE_dict[unq_X[i]] = similarity.reshape(-1)
-    # We don't need the counts anymore, delete them to save memory
-    del count_cats, count_X
+        indices = order[bounds[batch.start] : bounds[batch.stop]]
+        yield indices, similarities[unq_inverse[indices] - batch.start]
+
+
+def ngram_similarity_matrix(
+    X,
+    cats: list[str],
+    ngram_range: tuple[int, int],
+    analyzer: Literal["word", "char", "char_wb"],
+    hashing_dim: int,
+    dtype: type = np.float64,
+) -> NDArray:
+    """
+    Similarity encoding for dirty categorical variables:
+    Given two arrays of strings, returns the similarity encoding matrix
+    of size len(X) x len(cats)
 
-    out = np.empty((len(X), similarity.size), dtype=dtype)
-    for x, out_row in zip(X, out):
-        out_row[:] = SE_dict[x]
+    ngram_sim(s_i, s_j) =
+        ||min(ci, cj)||_1 / (||ci||_1 + ||cj||_1 - ||min(ci, cj)||_1)
 
-    return np.nan_to_num(out, copy=False)
+    The matrix is filled by chunks of unique values,
+    see :func:`iter_ngram_similarity_matrix`.
+    """
+    out = np.empty((len(X), len(cats)), dtype=dtype)
+    for indices, similarities in iter_ngram_similarity_matrix(
+        X,
+        cats,
+        ngram_range=ngram_range,
+        analyzer=analyzer,
+        hashing_dim=hashing_dim,
+        dtype=dtype,
+    ):
+        out[indices] = similarities
+    return out
 
 
 class SimilarityEncoder(OneHotEncoder):
@@ -152,9 +253,10 @@ class SimilarityEncoder(OneHotEncoder):
     2. To avoid dealing with high-dimensional encodings when `k` is high,
        we can use ``d << k`` prototypes ``[p1, ..., pd]`` with which
        similarities will be computed:  ``xi -> [sim(xi, p1), ..., sim(xi, pd)]``.
-       These prototypes can be provided by the user. Otherwise, we recommend
-       using the MinHashEncoder or GapEncoder when taking all unique entries
-       leads to too many prototypes.
+       These prototypes can be provided by the user, or selected from the
+       training data with ``categories='most_frequent'`` or
+       ``categories='k-means'``, which bounds the output dimension to
+       `n_prototypes` per feature.
 
     The similarity measure is based on the proportion of common n-grams between
     two strings.
@@ -171,10 +273,16 @@ class SimilarityEncoder(OneHotEncoder):
         word counts or character-level n-gram counts.
         Option ‘char_wb’ creates character n-grams only from text inside word
         boundaries; n-grams at the edges of words are padded with space.
-    categories : {'auto'} or list of list of str
+    categories : {'auto', 'most_frequent', 'k-means'} or list of list of str
         Categories (unique values) per feature:
 
         - 'auto' : Determine categories automatically from the training data.
+        - 'most_frequent' : Use the `n_prototypes` most frequent values of
+          each feature as categories.
+        - 'k-means' : Use as categories the values closest to the centers
+          of a k-means clustering (with `n_prototypes` clusters) of the
+          hashed n-gram counts of the unique values of each feature,
+          weighted by their frequency.
         - list : `categories[i]` holds the categories expected in the i-th
           column. The passed categories must be sorted and should not mix
           strings and numeric values.
@@ -202,9 +310,38 @@ class SimilarityEncoder(OneHotEncoder):
     hashing_dim : int, optional
         If `None`, the base vectorizer is a CountVectorizer, otherwise it is a
         HashingVectorizer with a number of features equal to `hashing_dim`.
+    n_prototypes : int, optional
+        Number of prototypes per feature, used only when `categories` is
+        'most_frequent' or 'k-means'. The output has at most `n_prototypes`
+        columns per feature, whatever the cardinality of the data.
+    random_state : int or RandomState, optional
+        Random number generator seed for reproducible output across multiple
+        function calls. Used only when `categories='k-means'`.
     n_jobs : int, optional
         Maximum number of processes used to compute similarity matrices. Used
         only if `fast=True` in SimilarityEncoder.transform.
+    top_k : int, optional
+        If set, only the `top_k` largest similarities of each sample with the
+        categories of a feature are kept, and the others are set to zero.
+        By default, all similarities are kept.
+    min_similarity : float, default=0.0
+        Similarities strictly lower than this value are set to zero.
+        Must be in the [0, 1] interval.
+    cache_size : int, optional
+        If set, the encoded rows of up to `cache_size` unique values per
+        feature are kept in a LRU cache, which is shared across calls to
+        SimilarityEncoder.transform (and between threads). Only the values
+        that are not cached are then compared with the categories, which
+        speeds up repeated calls on recurring values, e.g. when serving
+        predictions. The cache is reset by SimilarityEncoder.fit.
+        Used only if `fast=True` in SimilarityEncoder.transform.
+    sparse_output : bool, default=False
+        Whether SimilarityEncoder.transform returns a sparse CSR matrix instead
+        of a dense array. Combined with `top_k` or `min_similarity`, this
+        keeps the memory footprint proportional to the number of similarities
+        that are kept, rather than to the total number of categories. Sparse
+        blocks are then kept sparse by the TableVectorizer when its
+        `sparse_threshold` allows it.
 
     Attributes
     ----------
@@ -225,10 +362,11 @@ class SimilarityEncoder(OneHotEncoder):
     Notes
     -----
     The functionality of SimilarityEncoder is easy to explain and understand,
-    but it is not scalable. It is useful only to capture links across a few categories
-    (eg eg: "west", "north", "north-west"), but not when there are many categories,
-    as with open-ended entries.
-    Instead, the GapEncoder is usually recommended.
+    but it is not scalable with ``categories='auto'``. It is useful only to capture
+    links across a few categories (eg eg: "west", "north", "north-west"), but not
+    when there are many categories, as with open-ended entries.
+    In that case, ``categories='most_frequent'`` or ``categories='k-means'`` keep
+    the output dimension bounded, but the GapEncoder is usually recommended.
 
     References
     ----------
@@ -267,19 +405,29 @@ class SimilarityEncoder(OneHotEncoder):
     vectorizers_: list[CountVectorizer]
     vocabulary_count_matrices_: list[NDArray]
     vocabulary_ngram_counts_: list[list[int]]
+    vocabulary_ngram_indices_: list[list[sparse.csr_matrix]]
     _infrequent_enabled: bool
+    _fitted_values: list[NDArray] | None
 
     def __init__(
         self,
         *,
         ngram_range: tuple[int, int] = (2, 4),
         analyzer: Literal["word", "char", "char_wb"] = "char",
-        categories: Literal["auto"] | list[list[str]] = "auto",
+        categories: (
+            Literal["auto", "most_frequent", "k-means"] | list[list[str]]
+        ) = "auto",
         dtype: type = np.float64,
         handle_unknown: Literal["error", "ignore"] = "ignore",
         handle_missing: Literal["error", ""] = "",
         hashing_dim: int | None = None,
+        n_prototypes: int | None = None,
+        random_state: int | RandomState | None = None,
         n_jobs: int | None = None,
+        top_k: int | None = None,
+        min_similarity: float = 0.0,
+        cache_size: int | None = None,
+        sparse_output: bool = False,
     ):
         super().__init__()
         self.categories = categories
@@ -289,13 +437,20 @@ class SimilarityEncoder(OneHotEncoder):
         self.ngram_range = ngram_range
         self.analyzer = analyzer
         self.hashing_dim = hashing_dim
+        self.n_prototypes = n_prototypes
+        self.random_state = random_state
         self.n_jobs = n_jobs
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.cache_size = cache_size
+        self.sparse_output = sparse_output
 
         if not isinstance(categories, list):
-            if categories not in ["auto"]:
+            if categories not in ["auto", "most_frequent", "k-means"]:
                 raise ValueError(
                     f"Got categories={self.categories}, but expected "
-                    "'auto' or a list of prototypes. "
+                    "any of {'auto', 'most_frequent', 'k-means'} "
+                    "or a list of prototypes. "
                 )
 
     def fit(self, X: ArrayLike, y=None) -> "SimilarityEncoder":
@@ -356,17 +511,75 @@ class SimilarityEncoder(OneHotEncoder):
                 f"type ({type(self.hashing_dim)}), expected None or int. "
             )
 
-        if self.categories not in ["auto"]:
+        if self.top_k is not None and (
+            not isinstance(self.top_k, numbers.Integral) or self.top_k < 1
+        ):
+            raise ValueError(
+                f"Got top_k={self.top_k!r}, but expected None or a positive int. "
+            )
+
+        if not isinstance(self.min_similarity, numbers.Real) or not (
+            0 <= self.min_similarity <= 1
+        ):
+            raise ValueError(
+                f"Got min_similarity={self.min_similarity!r}, but expected "
+                "a float in the [0, 1] interval. "
+            )
+
+        if self.cache_size is not None and (
+            not isinstance(self.cache_size, numbers.Integral) or self.cache_size < 1
+        ):
+            raise ValueError(
+                f"Got cache_size={self.cache_size!r}, but expected None "
+                "or a positive int. "
+            )
+
+        if self.categories in ["most_frequent", "k-means"]:
+            if (
+                not isinstance(self.n_prototypes, numbers.Integral)
+                or self.n_prototypes < 1
+            ):
+                raise ValueError(
+                    f"Got n_prototypes={self.n_prototypes!r}, but expected a "
+                    f"positive int with categories={self.categories!r}. "
+                )
+        elif self.categories not in ["auto"]:
             for cats in self.categories:
                 if not np.all(np.sort(cats) == np.array(cats)):
                     raise ValueError("Unsorted categories are not yet supported. ")
 
         self.categories_ = list()
+        # The prototypes only cover some of the values seen during fit: keep
+        # all of them to detect the unknown values in transform, only when
+        # these raise an error.
+        self._fitted_values = None
+        if (
+            self.categories in ["most_frequent", "k-means"]
+            and self.handle_unknown == "error"
+        ):
+            self._fitted_values = [np.unique(Xi) for Xi in Xlist]
 
         for i in range(n_features):
             Xi = Xlist[i]
             if self.categories == "auto":
                 self.categories_.append(np.unique(Xi))
+            elif self.categories == "most_frequent":
+                self.categories_.append(get_most_frequent(Xi, self.n_prototypes))
+            elif self.categories == "k-means":
+                uniques, counts = np.unique(Xi, return_counts=True)
+                if len(uniques) <= self.n_prototypes:
+                    self.categories_.append(uniques)
+                else:
+                    self.categories_.append(
+                        get_kmeans_prototypes(
+                            uniques,
+                            self.n_prototypes,
+                            analyzer=self.analyzer,
+                            ngram_range=self.ngram_range,
+                            sample_weight=counts,
+                            random_state=self.random_state,
+                        )
+                    )
             else:
                 if self.handle_unknown == "error":
                     valid_mask = np.in1d(Xi, self.categories[i])
@@ -381,9 +594,10 @@ class SimilarityEncoder(OneHotEncoder):
         self.vectorizers_ = []
         self.vocabulary_count_matrices_ = []
         self.vocabulary_ngram_counts_ = []
+        self.vocabulary_ngram_indices_ = []
 
         for i in range(n_features):
-            vectorizer = CountVectorizer(
+            vectorizer = CachedCountVectorizer(
                 ngram_range=self.ngram_range,
                 analyzer=self.analyzer,
                 dtype=self.dtype,
@@ -407,12 +621,22 @@ class SimilarityEncoder(OneHotEncoder):
             )
 
             self.vocabulary_ngram_counts_.append(
-                [
-                    get_ngram_count(preprocess(category), self.ngram_range)
-                    for category in categories
-                ]
+                get_ngram_count(
+                    [preprocess(category) for category in categories],
+                    self.ngram_range,
+                ).tolist()
             )
 
+            # Inverted index from the n-grams to the categories containing
+            # them, used in transform to only compare values with the
+            # categories they share n-grams with.
+            self.vocabulary_ngram_indices_.append(
+                build_ngram_index(self.vocabulary_count_matrices_[i])
+            )
+
+        # The caches are created at the first transform
+        self._similarity_caches = None
+
         self._infrequent_enabled = False
         if parse_version(sklearn.__version__) >= parse_version("1.2.2"):
             self.drop_idx_ = self._set_drop_idx()
@@ -421,7 +645,7 @@ class SimilarityEncoder(OneHotEncoder):
 
         return self
 
-    def transform(self, X: ArrayLike, fast: bool = True) -> NDArray:
+    def transform(self, X: ArrayLike, fast: bool = True) -> NDArray | sparse.csr_matrix:
         """Transform `X` using specified encoding scheme.
 
         Parameters
@@ -433,8 +657,9 @@ class SimilarityEncoder(OneHotEncoder):
 
         Returns
         -------
-        ndarray, shape [n_samples, n_features_new]
-            Transformed input.
+        ndarray or csr_matrix, shape [n_samples, n_features_new]
+            Transformed input. A sparse matrix is returned
+            if `sparse_output=True`.
         """
         check_is_fitted(self, "categories_")
         if hasattr(X, "iloc") and X.isna().values.any():
@@ -462,9 +687,14 @@ class SimilarityEncoder(OneHotEncoder):
         Xlist, n_samples, n_features = self._check_X(X)
         self._check_n_features(X, reset=False)
 
+        # Prototypes only cover a subset of the values seen during fit,
+        # the unknown values are the ones that were not seen at all.
+        known_values = getattr(self, "_fitted_values", None)
+        if known_values is None:
+            known_values = self.categories_
         for i in range(n_features):
             Xi = Xlist[i]
-            valid_mask = np.in1d(Xi, self.categories_[i])
+            valid_mask = np.in1d(Xi, known_values[i])
 
             if not np.all(valid_mask):
                 if self.handle_unknown == "error":
@@ -475,8 +705,11 @@ class SimilarityEncoder(OneHotEncoder):
 
         min_n, max_n = self.ngram_range
 
-        total_length = sum(len(x) for x in self.categories_)
-        out = np.empty((n_samples, total_length), dtype=self.dtype)
+        if self.sparse_output:
+            out = []
+        else:
+            total_length = sum(len(x) for x in self.categories_)
+            out = np.empty((n_samples, total_length), dtype=self.dtype)
         last = 0
         for j, categories in enumerate(self.categories_):
             if fast:
@@ -490,16 +723,25 @@ class SimilarityEncoder(OneHotEncoder):
                     hashing_dim=self.hashing_dim,
                     dtype=np.float32,
                 )
+                _truncate_similarities(encoded_Xj, self.top_k, self.min_similarity)
+                if self.sparse_output:
+                    encoded_Xj = sparse.csr_matrix(encoded_Xj, dtype=self.dtype)
 
-            out[:, last : last + len(categories)] = encoded_Xj
-            last += len(categories)
+            if self.sparse_output:
+                out.append(encoded_Xj)
+            else:
+                out[:, last : last + len(categories)] = encoded_Xj
+                last += len(categories)
+
+        if self.sparse_output:
+            return sparse.hstack(out, format="csr", dtype=self.dtype)
         return out
 
     def _ngram_similarity_fast(
         self,
         X: list | NDArray,
         col_idx: int,
-    ) -> NDArray:
+    ) -> NDArray | sparse.csr_matrix:
         """
         Fast computation of ngram similarity.
 
@@ -518,44 +760,134 @@ class SimilarityEncoder(OneHotEncoder):
         col_idx : int
             The column index of X in the original feature matrix.
         """
-        vectorizer = self.vectorizers_[col_idx]
+        cache = None
+        # Encoders fitted before the cache was introduced have no cache_size
+        cache_size = getattr(self, "cache_size", None)
+        if cache_size is not None:
+            caches = getattr(self, "_similarity_caches", None)
+            if caches is None:
+                caches = self._similarity_caches = [
+                    LRUDict(capacity=cache_size) for _ in self.categories_
+                ]
+            cache = caches[col_idx]
+        unq_X, unq_inverse, unq_counts = np.unique(
+            X, return_inverse=True, return_counts=True
+        )
+        unq_inverse = unq_inverse.reshape(-1)
+        if cache is None:
+            return self._encode_unique(unq_X, col_idx)[unq_inverse]
+
+        # Only the values missing from the cache are encoded
+        cached_rows, missing = cache.get_many(unq_X)
+        missing = np.asarray(missing, dtype=np.intp)
+        hits = np.setdiff1d(np.arange(len(unq_X)), missing)
+        rows = [cached_rows[i] for i in hits]
+        if len(missing):
+            missing_out = self._encode_unique(unq_X[missing], col_idx)
+            # Cache the most frequent values last, so that they are evicted last
+            to_cache = np.argsort(unq_counts[missing], kind="stable")
+            to_cache = to_cache[-cache.capacity :]
+            cache.set_many((unq_X[missing[i]], missing_out[i].copy()) for i in to_cache)
+            rows.insert(0, missing_out)
+
+        # The encoded missing values come first, followed by the cached ones
+        position = np.empty(len(unq_X), dtype=np.intp)
+        position[missing] = np.arange(len(missing))
+        position[hits] = len(missing) + np.arange(len(hits))
+        if self.sparse_output:
+            unq_out = sparse.vstack(rows, format="csr")
+        else:
+            unq_out = np.vstack(rows)
+        return unq_out[position[unq_inverse]]
+
+    def _encode_unique(
+        self, unq_X: NDArray, col_idx: int
+    ) -> NDArray | sparse.csr_matrix:
+        """
+        Encode unique values, block by block.
+
+        Parameters
+        ----------
+        unq_X : ndarray
+            Unique observations being transformed.
+        col_idx : int
+            The column index of X in the original feature matrix.
+
+        Returns
+        -------
+        ndarray or csr_matrix of shape (len(unq_X), n_categories)
+            The encoded values.
+        """
+        n_categories = len(self.vocabulary_ngram_counts_[col_idx])
+        if not len(unq_X):
+            if self.sparse_output:
+                return sparse.csr_matrix((0, n_categories), dtype=self.dtype)
+            return np.empty((0, n_categories), dtype=self.dtype)
 
-        unq_X = np.unique(X)
+        vectorizer = self.vectorizers_[col_idx]
         unq_X_ = np.array([preprocess(x) for x in unq_X])
 
         X_count_matrix = vectorizer.transform(unq_X_)
-        vocabulary_count_matrix = self.vocabulary_count_matrices_[col_idx]
+        X_ngram_count = get_ngram_count(unq_X_, self.ngram_range).astype(np.float64)
+        vocabulary_ngram_index = self.vocabulary_ngram_indices_[col_idx]
         vocabulary_ngram_count = np.array(
-            self.vocabulary_ngram_counts_[col_idx]
-        ).reshape(-1, 1)
+            self.vocabulary_ngram_counts_[col_idx], dtype=np.float64
+        )
 
-        se_dict = {}
+        batch_size = get_chunk_n_rows(row_bytes=8 * max(n_categories, 1))
+        if self.sparse_output:
+            unq_out = None
+        else:
+            unq_out = np.empty((len(unq_X), n_categories), dtype=self.dtype)
 
-        Parallel(n_jobs=self.n_jobs, backend="threading")(
-            delayed(_ngram_similarity_one_sample_inplace)(
-                X_count_vector,
-                vocabulary_count_matrix,
-                x_str,
+        blocks = Parallel(n_jobs=self.n_jobs, backend="threading")(
+            delayed(self._encode_unique_block)(
+                X_count_matrix[batch],
+                X_ngram_count[batch],
+                vocabulary_ngram_index,
                 vocabulary_ngram_count,
-                se_dict,
-                unq_X,
-                i,
-                self.ngram_range,
-            )
-            for X_count_vector, x_str, i in zip(
-                X_count_matrix, unq_X_, range(len(unq_X))
+                None if unq_out is None else unq_out[batch],
             )
+            for batch in gen_batches(len(unq_X), batch_size)
         )
 
-        out = np.empty(
-            (len(X), vocabulary_count_matrix.shape[0]),
-            dtype=self.dtype,
-        )
+        if self.sparse_output:
+            unq_out = sparse.vstack(blocks, format="csr")
+        return unq_out
 
-        for x, out_row in zip(X, out):
-            out_row[:] = se_dict[x]
+    def _encode_unique_block(
+        self,
+        X_count_matrix: sparse.csr_matrix,
+        X_ngram_count: NDArray,
+        vocabulary_ngram_index: list[sparse.csr_matrix],
+        vocabulary_ngram_count: NDArray,
+        out: NDArray | None,
+    ) -> sparse.csr_matrix | None:
+        """
+        Encode a block of unique values, applying `top_k` and `min_similarity`.
 
-        return np.nan_to_num(out, copy=False)
+        The similarities are written inplace in `out` for dense outputs.
+        For sparse outputs, `out` is None and the block is returned
+        as a CSR matrix.
+        """
+        if out is None:
+            block = np.empty(
+                (X_count_matrix.shape[0], len(vocabulary_ngram_count)),
+                dtype=self.dtype,
+            )
+        else:
+            block = out
+        _ngram_similarity_block(
+            X_count_matrix,
+            X_ngram_count,
+            vocabulary_ngram_index,
+            vocabulary_ngram_count,
+            block,
+        )
+        _truncate_similarities(block, self.top_k, self.min_similarity)
+        if out is None:
+            return sparse.csr_matrix(block)
+        return None
 
     def _more_tags(self):
         return {
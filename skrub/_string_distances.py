@@ -5,12 +5,14 @@ Some string distances
 import re
 from collections import Counter
 
-# TODO vectorize these functions (accept arrays)
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+from scipy import sparse
 
 
-def get_ngram_count(string: str, ngram_range: tuple[int, int]) -> int:
+def get_ngram_count(string, ngram_range: tuple[int, int]):
     """
-    Compute the number of ngrams in a string.
+    Compute the number of ngrams in a string, or in each string of an array.
 
     Here is where the formula comes from:
 
@@ -18,16 +20,29 @@ def get_ngram_count(string: str, ngram_range: tuple[int, int]) -> int:
       size 3 in the string: len(string) - 3 + 1
     * this can be generalized to n-grams by changing 3 by n.
     * when given a ngram_range, we can sum this formula over all possible
-      ngrams
+      ngrams, which gives
+      ``(max_n - min_n + 1) * (len(string) + 1) - (min_n + ... + max_n)``.
 
+    Parameters
+    ----------
+    string : str or array-like of str
+        The string(s) to count the n-grams of.
+    ngram_range : tuple (min_n, max_n)
+        The lower and upper boundaries of the range of n-values.
+
+    Returns
+    -------
+    int or ndarray of int
+        The number of n-grams, with the same shape as `string`.
     """
     min_n, max_n = ngram_range
-    ngram_count = 0
-
-    for i in range(min_n, max_n + 1):
-        ngram_count += len(string) - i + 1
-
-    return ngram_count
+    n_sizes = max_n - min_n + 1
+    sum_sizes = (min_n + max_n) * n_sizes // 2
+    if isinstance(string, str):
+        return n_sizes * (len(string) + 1) - sum_sizes
+    lengths = np.fromiter(map(len, np.ravel(string)), dtype=np.int64)
+    lengths = lengths.reshape(np.shape(string))
+    return n_sizes * (lengths + 1) - sum_sizes
 
 
 def preprocess(x: str) -> str:
@@ -56,14 +71,64 @@ def preprocess(x: str) -> str:
     return _white_spaces.sub(" ", x)
 
 
-def get_unique_ngrams(string: str, ngram_range: tuple[int, int]):
+def _normalize(string: str) -> str:
+    """Lowercase, collapse the whitespace and pad a string with spaces."""
+    spaces = " "  # * (n // 2 + n % 2)
+    return spaces + " ".join(string.lower().split()) + spaces
+
+
+def _ngram_matrix(
+    strings: ArrayLike, ngram_range: tuple[int, int]
+) -> tuple[NDArray, sparse.csr_matrix]:
+    """
+    Count the n-grams of an array of strings.
+
+    All the sliding windows of all the (normalized) strings are extracted at
+    once from a single array of code points, so that the only loops in
+    Python are over the strings to normalize them, and over the n-gram sizes.
+
+    Returns the distinct n-grams and the matrix of their counts, of shape
+    (n_strings, n_ngrams).
+    """
+    strings = [
+        _normalize(str(string))
+        for string in np.ravel(np.asarray(strings, dtype=object))
+    ]
+    codes = np.frombuffer(
+        "".join(strings).encode("utf-32-le", "surrogatepass"), dtype=np.uint32
+    )
+    lengths = np.fromiter(map(len, strings), dtype=np.int64, count=len(strings))
+    starts = np.cumsum(lengths) - lengths
+    rows, columns, ngrams = [], [], []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        n_windows = np.maximum(lengths - n + 1, 0)
+        positions = np.repeat(
+            starts - np.cumsum(n_windows) + n_windows, n_windows
+        ) + np.arange(n_windows.sum())
+        windows = codes[positions[:, None] + np.arange(n)]
+        distinct, inverse = np.unique(windows, axis=0, return_inverse=True)
+        rows.append(np.repeat(np.arange(len(strings)), n_windows))
+        columns.append(inverse.ravel() + len(ngrams))
+        # Only the distinct n-grams are decoded back to strings
+        ngrams.extend(
+            window.tobytes().decode("utf-32-le", "surrogatepass") for window in distinct
+        )
+    rows, columns = np.concatenate(rows), np.concatenate(columns)
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, columns)), shape=(len(strings), len(ngrams))
+    )
+    counts.sum_duplicates()
+    return np.array(ngrams, dtype=object), counts
+
+
+def get_unique_ngrams(string, ngram_range: tuple[int, int]):
     """
-    Return the set of unique n-grams of a string.
+    Return the set of unique n-grams of a string, or of each string of an array.
 
     Parameters
     ----------
-    string : str
-        The string to split in n-grams.
+    string : str or array-like of str
+        The string(s) to split in n-grams.
     ngram_range : tuple (min_n, max_n)
         The lower and upper boundaries of the range of n-values for different
         n-grams used in the string similarity. All values of `n` such
@@ -71,11 +136,17 @@ def get_unique_ngrams(string: str, ngram_range: tuple[int, int]):
 
     Returns
     -------
-    set
-        The set of unique n-grams of the string.
+    set or tuple of (ndarray, csr_matrix)
+        For a single string, the set of its unique n-grams, as tuples of
+        characters. For an array of strings, the distinct n-grams of all the
+        strings, as an array of str of shape (n_ngrams,), and the binary
+        matrix of shape (n_strings, n_ngrams) of the n-grams of each string.
     """
-    spaces = " "  # * (n // 2 + n % 2)
-    string = spaces + " ".join(string.lower().split()) + spaces
+    if not isinstance(string, str):
+        ngrams, counts = _ngram_matrix(string, ngram_range)
+        counts.data[:] = 1
+        return ngrams, counts
+    string = _normalize(string)
     ngram_set = set()
     for n in range(ngram_range[0], ngram_range[1] + 1):
         string_list = [string[i:] for i in range(n)]
@@ -83,11 +154,29 @@ def get_unique_ngrams(string: str, ngram_range: tuple[int, int]):
     return ngram_set
 
 
-def get_ngrams(string: str, n: int) -> list[tuple]:
-    """Return the set of different n-grams in a string"""
+def get_ngrams(string, n: int):
+    """
+    Return the n-grams of a string, or count those of each string of an array.
+
+    Parameters
+    ----------
+    string : str or array-like of str
+        The string(s) to split in n-grams.
+    n : int
+        The size of the n-grams.
+
+    Returns
+    -------
+    list of tuple or tuple of (ndarray, csr_matrix)
+        For a single string, the list of its n-grams, as tuples of
+        characters. For an array of strings, the distinct n-grams of all the
+        strings, as an array of str of shape (n_ngrams,), and the matrix of
+        shape (n_strings, n_ngrams) of their counts in each string.
+    """
+    if not isinstance(string, str):
+        return _ngram_matrix(string, (n, n))
     # Pure Python implementation: no numpy
-    spaces = " "  # * (n // 2 + n % 2)
-    string = spaces + " ".join(string.lower().split()) + spaces
+    string = _normalize(string)
     string_list = [string[i:] for i in range(n)]
     return list(zip(*string_list))
 
@@ -107,3 +196,169 @@ def ngram_similarity(string1, string2, n, preprocess_strings=True):
     allgrams = len(ngrams1) + len(ngrams2)
     similarity = samegrams / (allgrams - samegrams)
     return similarity
+
+
+def _ngram_count_matrices(
+    strings1: ArrayLike, strings2: ArrayLike, n: int
+) -> tuple[sparse.csr_matrix, sparse.csr_matrix]:
+    """
+    Count the n-grams of two arrays of strings in a shared vocabulary.
+
+    The strings are normalized as in :func:`get_ngrams`, so that the counts
+    match the n-grams used by :func:`ngram_similarity`.
+    """
+    strings1 = np.ravel(np.asarray(strings1, dtype=object))
+    strings2 = np.ravel(np.asarray(strings2, dtype=object))
+    _, counts = get_ngrams(np.concatenate([strings1, strings2]), n)
+    return counts[: len(strings1)], counts[len(strings1) :]
+
+
+def _ngram_similarity_from_counts(
+    intersection: NDArray, counts1: NDArray, counts2: NDArray
+) -> NDArray:
+    all_grams = counts1 + counts2 - intersection
+    return np.divide(
+        intersection,
+        all_grams,
+        out=np.zeros_like(all_grams, dtype=np.float64),
+        where=all_grams != 0,
+    )
+
+
+def paired_ngram_similarity(
+    strings1: ArrayLike, strings2: ArrayLike, n: int
+) -> NDArray:
+    """
+    Compute the n-gram similarity between pairs of strings.
+
+    Vectorized version of :func:`ngram_similarity`: the n-grams of all
+    strings are counted at once in sparse matrices, and the similarity of
+    ``strings1[i]`` and ``strings2[i]`` is computed for every `i`.
+
+    Parameters
+    ----------
+    strings1 : array-like of str of shape (n_pairs,)
+        The left strings.
+    strings2 : array-like of str of shape (n_pairs,)
+        The right strings.
+    n : int
+        The size of the n-grams.
+
+    Returns
+    -------
+    ndarray of shape (n_pairs,)
+        The similarities. Pairs of strings that have no n-gram at all
+        (both shorter than ``n - 2`` characters) have a similarity of 0.
+    """
+    if np.size(strings1) != np.size(strings2):
+        raise ValueError(
+            "strings1 and strings2 must have the same length, "
+            f"got {np.size(strings1)} and {np.size(strings2)}. "
+        )
+    counts1, counts2 = _ngram_count_matrices(strings1, strings2, n)
+    intersection = np.asarray(counts1.minimum(counts2).sum(axis=1)).ravel()
+    return _ngram_similarity_from_counts(
+        intersection,
+        np.asarray(counts1.sum(axis=1)).ravel(),
+        np.asarray(counts2.sum(axis=1)).ravel(),
+    )
+
+
+def pairwise_ngram_similarity(
+    strings1: ArrayLike, strings2: ArrayLike, n: int
+) -> NDArray:
+    """
+    Compute the n-gram similarity between all pairs of two arrays of strings.
+
+    Vectorized version of :func:`ngram_similarity` over the cartesian
+    product of `strings1` and `strings2`. The intersections are computed with
+    the inverted index of :func:`build_ngram_index`, so that only the pairs
+    sharing n-grams are visited.
+
+    Parameters
+    ----------
+    strings1 : array-like of str of shape (n_strings1,)
+        The left strings.
+    strings2 : array-like of str of shape (n_strings2,)
+        The right strings.
+    n : int
+        The size of the n-grams.
+
+    Returns
+    -------
+    ndarray of shape (n_strings1, n_strings2)
+        The similarities. Pairs of strings that have no n-gram at all
+        (both shorter than ``n - 2`` characters) have a similarity of 0.
+    """
+    counts1, counts2 = _ngram_count_matrices(strings1, strings2, n)
+    intersection = ngram_intersection(counts1, build_ngram_index(counts2))
+    return _ngram_similarity_from_counts(
+        intersection.toarray(),
+        np.asarray(counts1.sum(axis=1)),
+        np.asarray(counts2.sum(axis=1)).reshape(1, -1),
+    )
+
+
+def build_ngram_index(count_matrix: sparse.spmatrix) -> list[sparse.csr_matrix]:
+    """
+    Build an inverted index from n-grams to the strings containing them.
+
+    The index is made of one binary matrix per count level: row `g` of the
+    level-`t` matrix lists the strings in which the n-gram `g` appears at
+    least `t` times. For non-negative integer counts,
+    ``min(a, b) = sum_t [a >= t] * [b >= t]``, so that intersections of
+    n-gram multisets can be computed with sparse products only
+    (see :func:`ngram_intersection`).
+
+    Parameters
+    ----------
+    count_matrix : sparse matrix of shape (n_strings, n_ngrams)
+        Matrix of n-gram counts, as returned by a CountVectorizer.
+
+    Returns
+    -------
+    list of csr_matrix of shape (n_ngrams, n_strings)
+        The binary matrices for levels 1, 2, ..., up to the maximum count.
+    """
+    count_matrix = sparse.csr_matrix(count_matrix)
+    max_count = int(count_matrix.max()) if count_matrix.nnz else 1
+    return [
+        (count_matrix >= level).astype(np.float64).T.tocsr()
+        for level in range(1, max_count + 1)
+    ]
+
+
+def ngram_intersection(
+    count_matrix: sparse.spmatrix, ngram_index: list[sparse.csr_matrix]
+) -> sparse.csr_matrix:
+    """
+    Compute the size of the n-gram intersections between strings and an index.
+
+    Entry ``(i, j)`` of the result is ``sum_g min(count_matrix[i, g], c[j, g])``,
+    where `c` is the count matrix used to build `ngram_index`. Only the pairs
+    sharing at least one n-gram are stored: each string only visits the
+    postings of its own n-grams, so the cost scales with the actual overlap
+    rather than with the number of indexed strings.
+
+    Parameters
+    ----------
+    count_matrix : sparse matrix of shape (n_samples, n_ngrams)
+        Matrix of n-gram counts, sharing its n-gram vocabulary with the index.
+    ngram_index : list of csr_matrix of shape (n_ngrams, n_strings)
+        Inverted index, as returned by :func:`build_ngram_index`.
+
+    Returns
+    -------
+    csr_matrix of shape (n_samples, n_strings)
+        Size of the intersections.
+    """
+    count_matrix = sparse.csr_matrix(count_matrix)
+    intersection = sparse.csr_matrix(
+        (count_matrix.shape[0], ngram_index[0].shape[1]), dtype=np.float64
+    )
+    for level, level_index in enumerate(ngram_index, start=1):
+        level_matrix = (count_matrix >= level).astype(np.float64)
+        if not level_matrix.nnz:
+            break
+        intersection = intersection + level_matrix @ level_index
+    return intersection
@@ -1,10 +1,12 @@
-import collections
+import copy
 from typing import Literal
 
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 from numpy.typing import ArrayLike, NDArray
-from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.model_selection import check_cv
 from sklearn.preprocessing import LabelEncoder
 from sklearn.utils import check_array
 from sklearn.utils.validation import _check_y, check_is_fitted
@@ -16,6 +18,69 @@ def lambda_(x, n):
     return x / (x + n)
 
 
+def _safe_divide(sums: NDArray, counts: NDArray) -> NDArray:
+    """Divide per-category sums by counts, with 0 for unseen categories."""
+    return np.divide(
+        sums, counts, out=np.zeros(len(counts), dtype=np.float64), where=counts != 0
+    )
+
+
+def _cross_fit_encode(
+    codes: NDArray,
+    n_categories: int,
+    n_unknown: int,
+    folds: NDArray,
+    n_folds: int,
+    targets: NDArray,
+) -> NDArray:
+    """Encode each fold of a feature with the statistics of the other folds.
+
+    Parameters
+    ----------
+    codes : ndarray of shape (n_samples,)
+        Codes of the categories, `n_categories` for the unknown values.
+    n_categories : int
+        Number of categories.
+    n_unknown : int
+        Number of distinct unknown values.
+    folds : ndarray of shape (n_samples,)
+        Fold of each sample.
+    n_folds : int
+        Number of folds.
+    targets : ndarray of shape (n_samples, n_outputs)
+        The target, one-hot encoded for multiclass classification.
+
+    Returns
+    -------
+    ndarray of shape (n_samples, n_outputs)
+        The out-of-fold encodings.
+    """
+    n_codes = n_categories + 1
+    keys = folds * n_codes + codes
+    # Per-fold statistics, and those of the other folds by subtraction
+    counts = np.bincount(keys, minlength=n_folds * n_codes).reshape(n_folds, n_codes)
+    counts = counts.sum(axis=0) - counts
+    n = counts.sum(axis=1)
+    # Unknown values are encoded with the prior
+    counts[:, -1] = 0
+    # The distinct unknown values of the other folds are not tracked, use
+    # those of all the folds
+    k = np.maximum(np.count_nonzero(counts, axis=1) + n_unknown, 1)
+    lambda_n = lambda_(counts, (n / k)[:, np.newaxis])
+
+    out = np.empty(targets.shape)
+    for i in range(targets.shape[1]):
+        sums = np.bincount(
+            keys, weights=targets[:, i], minlength=n_folds * n_codes
+        ).reshape(n_folds, n_codes)
+        sums = sums.sum(axis=0) - sums
+        Ey = sums.sum(axis=1) / n
+        Eyx = np.divide(sums, counts, out=np.zeros(sums.shape), where=counts != 0)
+        encodings = lambda_n * Eyx + (1 - lambda_n) * Ey[:, np.newaxis]
+        out[:, i] = encodings[folds, codes]
+    return out
+
+
 class TargetEncoder(BaseEstimator, TransformerMixin):
     """Encode categorical features as a numeric array given a target vector.
 
@@ -55,6 +120,22 @@ class TargetEncoder(BaseEstimator, TransformerMixin):
         columns for this feature will be all zeros.
         "Missing values" are any value for which ``pandas.isna`` returns
         ``True``, such as ``numpy.nan`` or ``None``.
+    cv : int, cross-validation generator or iterable, optional
+        Cross-fitting strategy of TargetEncoder.fit_transform. If `None`,
+        fit_transform is fit followed by transform, so that the encoding of
+        each sample depends on its own target. Otherwise, the samples are
+        split as in :func:`~sklearn.model_selection.check_cv` (an int gives
+        the number of folds of a :class:`~sklearn.model_selection.KFold`, or
+        of a :class:`~sklearn.model_selection.StratifiedKFold` for
+        classification), and each fold is encoded with the statistics of the
+        other folds, to avoid target leakage. The test sets must form a
+        partition of the samples. TargetEncoder.transform always uses the
+        statistics of the whole training data.
+    n_jobs : int, optional
+        The number of jobs to run in parallel over the columns during the
+        cross-fitting of TargetEncoder.fit_transform.
+        `None` means 1 unless in a :obj:`joblib.parallel_backend` context.
+        -1 means using all processors.
 
     Attributes
     ----------
@@ -65,6 +146,19 @@ class TargetEncoder(BaseEstimator, TransformerMixin):
         (in order corresponding with output of TargetEncoder.transform).
     n_ : int
         Length of :term:`y`
+    Ey_ : float or dict
+        Mean of :term:`y` or, for multiclass classification, a dict mapping
+        each class to its frequency.
+    Eyx_ : list of ndarray or dict
+        For each feature, the mean of :term:`y` for each category, in the
+        order of ``categories_``. For multiclass classification, a dict
+        mapping each class to these lists of means.
+    counter_ : list of ndarray
+        For each feature, the number of occurrences of each category
+        during TargetEncoder.fit, in the order of ``categories_``.
+    k_ : ndarray of shape (n_features,)
+        Number of distinct values of each feature seen during
+        TargetEncoder.fit.
 
     See Also
     --------
@@ -124,12 +218,16 @@ class TargetEncoder(BaseEstimator, TransformerMixin):
         dtype: type = np.float64,
         handle_unknown: Literal["error", "ignore"] = "error",
         handle_missing: Literal["error", ""] = "",
+        cv=None,
+        n_jobs: int | None = None,
     ):
         self.categories = categories
         self.dtype = dtype
         self.clf_type = clf_type
         self.handle_unknown = handle_unknown
         self.handle_missing = handle_missing
+        self.cv = cv
+        self.n_jobs = n_jobs
 
     def _more_tags(self) -> dict[str, list[str]]:
         """
@@ -155,6 +253,18 @@ class TargetEncoder(BaseEstimator, TransformerMixin):
         TargetEncoder
             Fitted TargetEncoder instance (self).
         """
+        self._fit(X, y)
+        return self
+
+    def _fit(
+        self, X: ArrayLike, y: ArrayLike
+    ) -> tuple[NDArray, list[NDArray], NDArray]:
+        """Compute the statistics of the categories.
+
+        Returns the validated target, and for each feature the codes of
+        the samples (``len(categories_[j])`` for unknown values) and the
+        number of distinct unknown values.
+        """
         X = check_input(X)
         y = _check_y(y, y_numeric=True, estimator=self)
         self.n_features_in_ = X.shape[1]
@@ -191,49 +301,235 @@ class TargetEncoder(BaseEstimator, TransformerMixin):
         n_samples, n_features = X.shape
 
         self._label_encoders_ = [LabelEncoder() for _ in range(n_features)]
+        self.n_ = len(y)
+        if self.clf_type in ["multiclass-clf"]:
+            self.classes_, y_codes = np.unique(y, return_inverse=True)
+            n_classes = len(self.classes_)
+            class_counts = np.bincount(y_codes, minlength=n_classes)
+            self.Ey_ = {
+                c: class_counts[k] / self.n_ for k, c in enumerate(self.classes_)
+            }
+            self.Eyx_ = {c: [] for c in self.classes_}
+        else:
+            self.Ey_ = np.mean(y)
+            self.Eyx_ = []
+        self.counter_ = []
+        self.k_ = np.zeros(n_features, dtype=np.int64)
+        X_codes = []
+        n_unknowns = np.zeros(n_features, dtype=np.int64)
 
         for j in range(n_features):
             le = self._label_encoders_[j]
             Xj = X[:, j]
+            n_unknown = 0
             if self.categories == "auto":
-                le.fit(Xj)
+                # Integer codes of the values, i.e. their index in `classes_`
+                codes = le.fit_transform(Xj)
+                valid_mask = slice(None)
             else:
-                if self.handle_unknown == "error":
-                    valid_mask = np.in1d(Xj, self.categories[j])
-                    if not np.all(valid_mask):
-                        diff = np.unique(Xj[~valid_mask])
+                valid_mask = np.in1d(Xj, self.categories[j])
+                if not np.all(valid_mask):
+                    diff = np.unique(Xj[~valid_mask])
+                    if self.handle_unknown == "error":
                         raise ValueError(
                             f"Found unknown categories {diff} in column {j} during fit"
                         )
+                    n_unknown = len(diff)
                 le.classes_ = np.array(self.categories[j])
+                codes = le.transform(Xj[valid_mask])
+
+            n_categories = len(le.classes_)
+            counts = np.bincount(codes, minlength=n_categories)
+            self.counter_.append(counts)
+            self.k_[j] = np.count_nonzero(counts) + n_unknown
+            Xj_codes = np.full(n_samples, n_categories, dtype=np.intp)
+            Xj_codes[valid_mask] = codes
+            X_codes.append(Xj_codes)
+            n_unknowns[j] = n_unknown
+            if self.clf_type in ["multiclass-clf"]:
+                class_counts = np.bincount(
+                    codes * n_classes + y_codes[valid_mask],
+                    minlength=n_categories * n_classes,
+                ).reshape(n_categories, n_classes)
+                for k, c in enumerate(self.classes_):
+                    self.Eyx_[c].append(_safe_divide(class_counts[:, k], counts))
+            else:
+                sums = np.bincount(codes, weights=y[valid_mask], minlength=n_categories)
+                self.Eyx_.append(_safe_divide(sums, counts))
 
         self.categories_ = [le.classes_ for le in self._label_encoders_]
-        self.n_ = len(y)
-        if self.clf_type in ["binary-clf", "regression"]:
-            self.Eyx_ = [
-                {cat: np.mean(y[X[:, j] == cat]) for cat in self.categories_[j]}
-                for j in range(len(self.categories_))
-            ]
-            self.Ey_ = np.mean(y)
-            self.counter_ = {j: collections.Counter(X[:, j]) for j in range(n_features)}
-        if self.clf_type in ["multiclass-clf"]:
-            self.classes_ = np.unique(y)
-
-            self.Eyx_ = {
-                c: [
-                    {
-                        cat: np.mean((y == c)[X[:, j] == cat])
-                        for cat in self.categories_[j]
-                    }
-                    for j in range(len(self.categories_))
-                ]
-                for c in self.classes_
-            }
-            self.Ey_ = {c: np.mean(y == c) for c in self.classes_}
-            self.counter_ = {j: collections.Counter(X[:, j]) for j in range(n_features)}
-        self.k_ = {j: len(self.counter_[j]) for j in self.counter_}
+        return y, X_codes, n_unknowns
+
+    def fit_transform(self, X: ArrayLike, y: ArrayLike) -> NDArray:
+        """Fit to `X` and `y`, then transform `X`.
+
+        If `cv` is not `None`, the samples of each fold are encoded with the
+        statistics of the other folds (cross-fitting). The statistics of all
+        folds are computed in a single pass, and those of the other folds are
+        obtained by subtracting the statistics of each fold from the total.
+
+        Parameters
+        ----------
+        X : array-like, shape [n_samples, n_features]
+            The data to determine the categories of each feature.
+        y : ndarray
+            The associated target vector.
+
+        Returns
+        -------
+        2-d ndarray
+            Transformed input.
+        """
+        if self.cv is None:
+            return self.fit(X, y).transform(X)
+        y, X_codes, n_unknowns = self._fit(X, y)
+
+        cv = check_cv(self.cv, y, classifier=self.clf_type != "regression")
+        folds = np.full(self.n_, -1, dtype=np.intp)
+        n_folds = 0
+        for _, test in cv.split(np.zeros((self.n_, 1)), y):
+            if (folds[test] != -1).any():
+                raise ValueError("The test sets of cv must not overlap. ")
+            folds[test] = n_folds
+            n_folds += 1
+        if (folds == -1).any():
+            raise ValueError("The test sets of cv must cover all the samples. ")
+
+        if self.clf_type == "multiclass-clf":
+            targets = (y[:, np.newaxis] == self.classes_).astype(np.float64)
+        else:
+            targets = np.asarray(y, dtype=np.float64)[:, np.newaxis]
+        out = Parallel(n_jobs=self.n_jobs)(
+            delayed(_cross_fit_encode)(
+                codes, len(cats), n_unknown, folds, n_folds, targets
+            )
+            for codes, cats, n_unknown in zip(X_codes, self.categories_, n_unknowns)
+        )
+        return np.hstack(out)
+
+    def partial_fit(self, X: ArrayLike, y: ArrayLike) -> "TargetEncoder":
+        """Update the statistics of the categories with a batch of data.
+
+        To be used in an online learning procedure where batches of data are
+        coming one by one. The resulting encoder is the same as if it was
+        fitted on all the batches at once.
+
+        Parameters
+        ----------
+        X : array-like, shape [n_samples, n_features]
+            The data to determine the categories of each feature.
+        y : ndarray
+            The associated target vector.
+
+        Returns
+        -------
+        TargetEncoder
+            Fitted TargetEncoder instance (self).
+        """
+        if not hasattr(self, "n_features_in_"):
+            return self.fit(X, y)
+        self._merge_statistics(clone(self).fit(X, y))
         return self
 
+    @classmethod
+    def merge(cls, encoders: list["TargetEncoder"]) -> "TargetEncoder":
+        """Merge TargetEncoders fitted on different samples of the same data.
+
+        This allows fitting encoders on separate shards of the data, for
+        instance in separate processes, and then combining them into the
+        encoder that would have been fitted on all the shards at once.
+
+        Parameters
+        ----------
+        encoders : list of TargetEncoder
+            The fitted encoders, with the same parameters.
+
+        Returns
+        -------
+        TargetEncoder
+            A new fitted TargetEncoder.
+        """
+        encoders = list(encoders)
+        if not encoders:
+            raise ValueError("Expected at least one TargetEncoder to merge. ")
+        for encoder in encoders:
+            check_is_fitted(encoder, attributes=["n_features_in_"])
+        merged = copy.deepcopy(encoders[0])
+        for encoder in encoders[1:]:
+            merged._merge_statistics(encoder)
+        return merged
+
+    def _get_sums(self, j: int, classes: NDArray | None = None) -> NDArray:
+        """Sums of the target for each category of feature `j`.
+
+        Returns an array of shape (n_categories, n_outputs). In the multiclass
+        case, the columns correspond to `classes`.
+        """
+        counts = self.counter_[j][:, np.newaxis]
+        if self.clf_type != "multiclass-clf":
+            return self.Eyx_[j][:, np.newaxis] * counts
+        sums = np.zeros((len(self.categories_[j]), len(classes)))
+        for c in self.classes_:
+            sums[:, np.searchsorted(classes, c)] = self.Eyx_[c][j]
+        return sums * counts
+
+    def _merge_statistics(self, other: "TargetEncoder") -> None:
+        """Add the statistics of another fitted encoder to this one."""
+        if other.clf_type != self.clf_type:
+            raise ValueError(
+                f"Cannot merge TargetEncoders with clf_type={self.clf_type!r} "
+                f"and clf_type={other.clf_type!r}. "
+            )
+        if other.n_features_in_ != self.n_features_in_:
+            raise ValueError(
+                f"Cannot merge TargetEncoders fitted on {self.n_features_in_} "
+                f"and {other.n_features_in_} features. "
+            )
+        n = self.n_ + other.n_
+        multiclass = self.clf_type == "multiclass-clf"
+        classes = np.union1d(self.classes_, other.classes_) if multiclass else None
+
+        Eyx, counter, categories = [], [], []
+        for j in range(self.n_features_in_):
+            cats = np.union1d(self.categories_[j], other.categories_[j])
+            counts = np.zeros(len(cats), dtype=np.int64)
+            sums = np.zeros((len(cats), len(classes) if multiclass else 1))
+            n_unknown = 0
+            for encoder in [self, other]:
+                index = np.searchsorted(cats, encoder.categories_[j])
+                counts[index] += encoder.counter_[j]
+                sums[index] += encoder._get_sums(j, classes)
+                # The distinct unknown values are not stored, so we cannot
+                # know how many are shared by the two encoders
+                n_unknown = max(
+                    n_unknown,
+                    encoder.k_[j] - np.count_nonzero(encoder.counter_[j]),
+                )
+            self.k_[j] = np.count_nonzero(counts) + n_unknown
+            Eyx.append([_safe_divide(sums[:, i], counts) for i in range(sums.shape[1])])
+            counter.append(counts)
+            categories.append(cats)
+
+        if multiclass:
+            self.Ey_ = {
+                c: (self.Ey_.get(c, 0.0) * self.n_ + other.Ey_.get(c, 0.0) * other.n_)
+                / n
+                for c in classes
+            }
+            self.Eyx_ = {c: [Eyx_j[i] for Eyx_j in Eyx] for i, c in enumerate(classes)}
+            self.classes_ = classes
+        else:
+            self.Ey_ = (self.Ey_ * self.n_ + other.Ey_ * other.n_) / n
+            self.Eyx_ = [Eyx_j[0] for Eyx_j in Eyx]
+        self.n_ = n
+        self.counter_ = counter
+        self._label_encoders_ = []
+        for cats in categories:
+            le = LabelEncoder()
+            le.classes_ = cats
+            self._label_encoders_.append(le)
+        self.categories_ = categories
+
     def transform(self, X: ArrayLike) -> NDArray:
         """Transform `X` using the specified encoding scheme.
 
@@ -269,60 +565,43 @@ class TargetEncoder(BaseEstimator, TransformerMixin):
         X = X_temp
 
         n_samples, n_features = X.shape
-        X_int = np.zeros_like(X, dtype=int)
-        X_mask = np.ones_like(X, dtype=bool)
-
-        for i in range(n_features):
-            Xi = X[:, i]
-            valid_mask = np.in1d(Xi, self.categories_[i])
+        n_outputs = len(self.classes_) if self.clf_type == "multiclass-clf" else 1
+        out = np.empty((n_samples, n_features * n_outputs))
 
+        for j, cats in enumerate(self.categories_):
+            Xj = X[:, j]
+            # Hash-based lookup of the codes, which unlike a binary search
+            # does not compare values of different types: unknown values get -1
+            codes = pd.Index(cats).get_indexer(Xj)
+            valid_mask = codes >= 0
             if not np.all(valid_mask):
                 if self.handle_unknown == "error":
-                    diff = np.unique(X[~valid_mask, i])
+                    diff = np.unique(Xj[~valid_mask])
                     raise ValueError(
-                        f"Found unknown categories {diff} in column {i} "
+                        f"Found unknown categories {diff} in column {j} "
                         "during transform."
                     )
-                else:
-                    # Set the problematic rows to an acceptable value and
-                    # continue `The rows are marked `X_mask` and will be
-                    # removed later.
-                    X_mask[:, i] = valid_mask
-                    Xi = Xi.copy()
-                    Xi[~valid_mask] = self.categories_[i][0]
-            X_int[:, i] = self._label_encoders_[i].transform(Xi)
+                # Unknown values get the code len(cats), which indexes the
+                # last row of the encodings: the prior
+                codes[~valid_mask] = len(cats)
+            out[:, j * n_outputs : (j + 1) * n_outputs] = np.take(
+                self._get_encodings(j), codes, axis=0
+            )
+        return out
 
-        out = []
+    def _get_encodings(self, j: int) -> NDArray:
+        """Encodings of the categories of feature `j`.
 
-        for j, cats in enumerate(self.categories_):
-            unqX = np.unique(X[:, j])
-            encoder = {x: 0 for x in unqX}
-            if self.clf_type in ["binary-clf", "regression"]:
-                for x in unqX:
-                    if x not in cats:
-                        Eyx = 0
-                    else:
-                        Eyx = self.Eyx_[j][x]
-                    lambda_n = lambda_(self.counter_[j][x], self.n_ / self.k_[j])
-                    encoder[x] = lambda_n * Eyx + (1 - lambda_n) * self.Ey_
-                x_out = np.zeros((len(X[:, j]), 1))
-                for i, x in enumerate(X[:, j]):
-                    x_out[i, 0] = encoder[x]
-                out.append(x_out.reshape(-1, 1))
-            if self.clf_type == "multiclass-clf":
-                x_out = np.zeros((len(X[:, j]), len(self.classes_)))
-                lambda_n = {x: 0 for x in unqX}
-                for x in unqX:
-                    lambda_n[x] = lambda_(self.counter_[j][x], self.n_ / self.k_[j])
-                for k, c in enumerate(np.unique(self.classes_)):
-                    for x in unqX:
-                        if x not in cats:
-                            Eyx = 0
-                        else:
-                            Eyx = self.Eyx_[c][j][x]
-                        encoder[x] = lambda_n[x] * Eyx + (1 - lambda_n[x]) * self.Ey_[c]
-                    for i, x in enumerate(X[:, j]):
-                        x_out[i, k] = encoder[x]
-                out.append(x_out)
-        out = np.hstack(out)
-        return out
+        Returns an array of shape (n_categories + 1, n_outputs), whose last
+        row is the encoding of the unknown categories.
+        """
+        counts = np.append(self.counter_[j], 0)
+        lambda_n = lambda_(counts, self.n_ / self.k_[j])[:, np.newaxis]
+        if self.clf_type == "multiclass-clf":
+            Eyx = np.column_stack([self.Eyx_[c][j] for c in self.classes_])
+            Ey = np.array([self.Ey_[c] for c in self.classes_])
+        else:
+            Eyx = self.Eyx_[j][:, np.newaxis]
+            Ey = self.Ey_
+        Eyx = np.vstack([Eyx, np.zeros((1, Eyx.shape[1]))])
+        return lambda_n * Eyx + (1 - lambda_n) * Ey
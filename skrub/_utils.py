@@ -1,6 +1,7 @@
 import collections
 import importlib
 import re
+import threading
 from collections.abc import Hashable
 from typing import Any, Iterable
 
@@ -12,21 +13,46 @@ from sklearn.utils import check_array
 class LRUDict:
     """dict with limited capacity
 
-    Using LRU eviction avoids memorizing a full dataset"""
+    Using LRU eviction avoids memorizing a full dataset.
+    Accesses are guarded by a lock, so the dict can be shared between threads."""
 
     def __init__(self, capacity: int):
         self.capacity = capacity
         self.cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Locks can't be pickled
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
     def __getitem__(self, key: Hashable):
-        try:
-            value = self.cache.pop(key)
-            self.cache[key] = value
-            return value
-        except KeyError:
-            return -1
+        with self._lock:
+            try:
+                value = self.cache.pop(key)
+                self.cache[key] = value
+                return value
+            except KeyError:
+                return -1
 
     def __setitem__(self, key: Hashable, value: Any):
+        with self._lock:
+            self._set(key, value)
+
+    def __contains__(self, key: Hashable):
+        with self._lock:
+            return key in self.cache
+
+    def __len__(self):
+        with self._lock:
+            return len(self.cache)
+
+    def _set(self, key: Hashable, value: Any):
         try:
             self.cache.pop(key)
         except KeyError:
@@ -34,8 +60,37 @@ class LRUDict:
                 self.cache.popitem(last=False)
         self.cache[key] = value
 
-    def __contains__(self, key: Hashable):
-        return key in self.cache
+    def get_many(self, keys: Iterable[Hashable]) -> tuple[list, list[int]]:
+        """Look up several keys at once.
+
+        Parameters
+        ----------
+        keys : iterable of hashable
+            The keys to look up.
+
+        Returns
+        -------
+        values : list
+            The value of each key, or None for the keys that are not cached.
+        missing : list of int
+            The positions in `keys` of the keys that are not cached.
+        """
+        values, missing = [], []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    values.append(self.cache[key])
+                else:
+                    values.append(None)
+                    missing.append(i)
+        return values, missing
+
+    def set_many(self, items: Iterable[tuple[Hashable, Any]]) -> None:
+        """Insert several (key, value) pairs at once."""
+        with self._lock:
+            for key, value in items:
+                self._set(key, value)
 
 
 def combine_lru_dicts(capacity: int, *lru_dicts: LRUDict) -> LRUDict:
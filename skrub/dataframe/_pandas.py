@@ -62,14 +62,25 @@ def aggregate(
 
     num_cols, categ_cols = split_num_categ_cols(table[cols_to_agg])
 
-    num_named_agg, num_value_counts = get_named_agg(table, num_cols, num_operations)
-    categ_named_agg, categ_value_counts = get_named_agg(
+    num_named_agg, num_value_counts, num_modes = get_named_agg(
+        table, num_cols, num_operations
+    )
+    categ_named_agg, categ_value_counts, categ_modes = get_named_agg(
         table, categ_cols, categ_operations
     )
 
     named_agg = {**num_named_agg, **categ_named_agg}
-    if named_agg:
-        base_group = table.groupby(key).agg(**named_agg)
+    modes = {**num_modes, **categ_modes}
+    if named_agg or modes:
+        groups = table.groupby(key)
+        if named_agg:
+            base_group = groups.agg(**named_agg)
+        else:
+            base_group = pd.DataFrame(index=groups.size().index)
+        # 'mode' is computed for all the groups at once, instead of calling
+        # a Python function on each group
+        for output_key, col_to_agg in modes.items():
+            base_group[output_key] = _mode(table, key, col_to_agg)
     else:
         base_group = None
 
@@ -150,14 +161,15 @@ def join(
 
 def get_named_agg(
     table: pd.DataFrame, cols: list[str], operations: list[str]
-) -> tuple[dict, dict]:
+) -> tuple[dict, dict, dict]:
     """Map aggregation tuples to their output key.
 
     The dictionary has the form: output_key = (column, aggfunc).
     This is used as input for the ``dataframe.agg`` method from Pandas.
 
     'value_counts' and 'hist' operation require to pivot
-    the tables and treated in a separate mapping.
+    the tables and treated in a separate mapping. 'mode' is computed
+    by :func:`_mode` and also treated in a separate mapping.
 
     Parameters
     ----------
@@ -178,8 +190,11 @@ def get_named_agg(
 
     value_counts : dict,
         ``value_counts`` operations mapping.
+
+    modes : dict,
+        ``mode`` operations mapping, of the form: output_key = column.
     """
-    named_agg, value_counts = {}, {}
+    named_agg, value_counts, modes = {}, {}, {}
     for col, operation in product(cols, operations):
         op_root, bin_args = _parse_argument(operation)
         aggfunc, bin_args = _get_aggfunc(table[col], op_root, bin_args)
@@ -189,10 +204,47 @@ def get_named_agg(
         # and must be treated separately.
         if aggfunc == "value_counts":
             value_counts[output_key] = (col, bin_args)
+        elif aggfunc == "mode":
+            modes[output_key] = col
         else:
             named_agg[output_key] = (col, aggfunc)
 
-    return named_agg, value_counts
+    return named_agg, value_counts, modes
+
+
+def _mode(table: pd.DataFrame, key: list[str], col: str) -> pd.Series:
+    """Most frequent value of a column in each group.
+
+    As with :meth:`pandas.Series.mode`, missing values are ignored and ties are
+    broken by taking the smallest value. The values are counted with a single
+    groupby on the key and the column, instead of one call per group.
+
+    Parameters
+    ----------
+    table : pd.DataFrame,
+        The input dataframe.
+
+    key : list of str,
+        The columns used as keys to aggregate on.
+
+    col : str,
+        The column to aggregate.
+
+    Returns
+    -------
+    mode : pd.Series,
+        The mode of each group, indexed by the key. The groups whose values
+        are all missing are absent.
+    """
+    # Sorted by key, then by value
+    counts = table.groupby([*key, col], observed=True).size()
+    # The stable sort keeps the smallest value first among equal counts
+    counts = counts.sort_values(ascending=False, kind="stable")
+    groups = counts.index.droplevel(-1)
+    first = ~groups.duplicated()
+    return pd.Series(
+        counts.index.get_level_values(-1)[first], index=groups[first], name=col
+    )
 
 
 def _parse_argument(operation: str) -> tuple[str, int | None]:
@@ -231,7 +283,7 @@ def _parse_argument(operation: str) -> tuple[str, int | None]:
 
 
 PANDAS_OPS_MAPPING = {
-    "mode": pd.Series.mode,
+    "mode": "mode",
     "quantile": pd.Series.quantile,
     "hist": "value_counts",
 }
@@ -295,3 +347,11 @@ def split_num_categ_cols(table):
 
 def select(dataframe, columns):
     return dataframe[columns]
+
+
+def to_pandas(dataframe):
+    return dataframe
+
+
+def n_rows(dataframe):
+    return len(dataframe)
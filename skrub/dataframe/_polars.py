@@ -3,6 +3,9 @@ Polars specialization of the aggregate and join operations.
 """
 from typing import Iterable
 
+import pandas as pd
+from sklearn.utils import parse_version
+
 from skrub.dataframe._types import POLARS_SETUP, DataFrameLike
 
 if POLARS_SETUP:
@@ -220,3 +223,93 @@ def split_num_categ_cols(table):
 
 def select(dataframe, columns):
     return dataframe.select(columns)
+
+
+def to_pandas(dataframe):
+    """Convert a polars dataframe or lazyframe to a pandas dataframe.
+
+    Each column is extracted with :meth:`polars.Series.to_numpy`, which does
+    not copy the columns whose type allows it (e.g. numerical columns without
+    nulls), and the pandas dataframe is built on these arrays without copy.
+    Categorical columns are converted to object columns of strings.
+    """
+    if isinstance(dataframe, pl.LazyFrame):
+        dataframe = dataframe.collect()
+    return pd.DataFrame(
+        {name: dataframe.get_column(name).to_numpy() for name in dataframe.columns},
+        copy=False,
+    )
+
+
+def _polars_version():
+    return parse_version(pl.__version__)
+
+
+def n_rows(dataframe):
+    """Number of rows of a polars dataframe or lazyframe."""
+    if isinstance(dataframe, pl.LazyFrame):
+        # `pl.count()` is deprecated in favor of `pl.len()` since polars 0.20.5
+        if _polars_version() >= parse_version("0.20.5"):
+            n_rows_expr = pl.len()
+        else:
+            n_rows_expr = pl.count()
+        return dataframe.select(n_rows_expr).collect().item()
+    return dataframe.height
+
+
+def _with_row_index(table, name):
+    """Add a column with the position of each row, named `name`."""
+    # `with_row_count` is deprecated in favor of `with_row_index` since
+    # polars 0.20.4
+    if _polars_version() >= parse_version("0.20.4"):
+        return table.with_row_index(name)
+    return table.with_row_count(name)
+
+
+def take_rows(
+    tables: list[DataFrameLike],
+    rows: list,
+    names: list[list[str]],
+) -> DataFrameLike:
+    """Gather rows of several tables side by side.
+
+    Each table is left-joined on the positions of its rows, so that
+    lazyframes stay lazy.
+
+    Parameters
+    ----------
+    tables : list of pl.DataFrame or list of pl.LazyFrame,
+        The tables to gather.
+
+    rows : list of ndarray,
+        For each table, the position of the row in each row of the output.
+        Negative positions give missing values.
+
+    names : list of list of str,
+        For each table, the names of its columns in the output.
+
+    Returns
+    -------
+    gathered : pl.DataFrame or pl.LazyFrame,
+        The gathered rows, with the columns of all the tables.
+    """
+    row_names = [f"__skrub_row_{i}__" for i in range(len(tables))]
+    gathered = pl.DataFrame(
+        [pl.Series(name, table_rows) for name, table_rows in zip(row_names, rows)]
+    ).select(
+        pl.when(pl.col(name) >= 0).then(pl.col(name)).cast(pl.UInt32).alias(name)
+        for name in row_names
+    )
+    if isinstance(tables[0], pl.LazyFrame):
+        gathered = gathered.lazy()
+    # The order of the rows of a left join is only guaranteed with
+    # `maintain_order`, since polars 1.18
+    join_kwargs = {}
+    if _polars_version() >= parse_version("1.18"):
+        join_kwargs["maintain_order"] = "left"
+    for table, table_names, row_name in zip(tables, names, row_names):
+        table = table.rename(dict(zip(table.columns, table_names)))
+        gathered = gathered.join(
+            _with_row_index(table, row_name), on=row_name, how="left", **join_kwargs
+        )
+    return gathered.select([name for table_names in names for name in table_names])
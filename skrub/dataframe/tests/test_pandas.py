@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
@@ -36,6 +37,28 @@ def test_simple_agg():
     assert_frame_equal(aggregated, expected)
 
 
+def test_mode_agg():
+    table = pd.DataFrame(
+        {
+            "key": [1, 1, 1, 1, 2, 2, 3],
+            "genre": ["sf", "drama", "drama", "sf", "comedy", None, None],
+        }
+    )
+    aggregated = aggregate(
+        table=table,
+        key="key",
+        cols_to_agg="genre",
+        num_operations=None,
+        categ_operations="mode",
+    )
+    # Ties give the smallest value and missing values are ignored
+    expected = pd.DataFrame(
+        {"genre_mode": ["drama", "comedy", np.nan]},
+        index=pd.Index([1, 2, 3], name="key"),
+    )
+    assert_frame_equal(aggregated, expected)
+
+
 def test_value_counts_agg():
     aggregated = aggregate(
         table=main,
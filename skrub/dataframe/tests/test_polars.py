@@ -1,8 +1,9 @@
+import numpy as np
 import pandas as pd
 import pytest
 
 from skrub.dataframe import POLARS_SETUP
-from skrub.dataframe._polars import aggregate, join
+from skrub.dataframe._polars import aggregate, join, n_rows, take_rows, to_pandas
 
 if POLARS_SETUP:
     import polars as pl
@@ -71,3 +72,27 @@ def test_incorrect_dataframe_inputs():
             cols_to_agg="rating",
             num_operations="mean",
         )
+
+
+@pytest.mark.skipif(not POLARS_SETUP, reason=POLARS_MISSING_MSG)
+@pytest.mark.parametrize("lazy", [False, True])
+def test_to_pandas_and_take_rows(lazy):
+    table = main.lazy() if lazy else main
+    converted = to_pandas(table)
+    pd.testing.assert_frame_equal(converted, main.to_pandas())
+    if not lazy:
+        # Numerical columns without nulls are not copied
+        assert np.shares_memory(
+            converted["rating"].to_numpy(), main.get_column("rating").to_numpy()
+        )
+    assert n_rows(table) == 6
+
+    gathered = take_rows(
+        [table, table],
+        [np.array([5, -1, 0]), np.array([0, 1, 2])],
+        [["a", "b", "c", "d"], ["e", "f", "g", "h"]],
+    )
+    if lazy:
+        gathered = gathered.collect()
+    assert gathered.get_column("b").to_list() == [1704, None, 1]
+    assert gathered.get_column("f").to_list() == [1, 3, 6]
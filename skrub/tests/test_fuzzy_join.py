@@ -1,12 +1,20 @@
 from typing import Literal
 
+import joblib
 import numpy as np
 import pandas as pd
 import pytest
+from numpy.testing import assert_array_equal
 from pandas.testing import assert_frame_equal
-from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 
-from skrub import fuzzy_join
+from skrub import RandomProjectionLSH, fuzzy_join, fuzzy_join_chunks
+from skrub._fuzzy_join import FuzzyJoinIndex
+from skrub.dataframe import POLARS_SETUP
+
+if POLARS_SETUP:
+    import polars as pl
+    from polars.testing import assert_frame_equal as assert_frame_equal_pl
 
 
 @pytest.mark.parametrize(
@@ -537,3 +545,287 @@ def test_missing_values() -> None:
     with pytest.warns(UserWarning, match=r"merging on missing values"):
         c = fuzzy_join(b, a, left_on="col3", right_on="col1", return_score=True)
     assert c.shape[0] == len(b)
+
+
+def test_duplicated_keys() -> None:
+    """
+    Testing that repeated keys get the same matches and scores as if each
+    row was matched separately.
+    """
+    left = pd.DataFrame(
+        {"a": ["Paris", "Berln", "Paris", "rome", "Berln"], "b": [1, 2, 1, 3, 2]}
+    )
+    right = pd.DataFrame(
+        {
+            "a": ["Roma", "Berlin", "Paris", "Berlin"],
+            "b": [3, 2, 1, 2],
+            "c": ["r", "b1", "p", "b2"],
+        }
+    )
+    for on in ["a", ["a", "b"]]:
+        joined = fuzzy_join(left, right, on=on, return_score=True)
+        # The aux keys are matched to their first occurrence
+        assert joined["c"].tolist() == ["p", "b1", "p", "r", "b1"]
+        for i, j in [(0, 2), (1, 4)]:
+            assert joined["matching_score"][i] == joined["matching_score"][j]
+
+    # The TF-IDF weights are computed on all the rows
+    index = FuzzyJoinIndex().fit(right, ["a"], left, ["a"])
+    vectorizer = HashingVectorizer(analyzer="char_wb", ngram_range=(2, 4))
+    tfidf = TfidfTransformer().fit(
+        vectorizer.transform(pd.concat([left["a"], right["a"]]))
+    )
+    np.testing.assert_allclose(index.idf_, tfidf.idf_)
+
+
+def test_exact_matches() -> None:
+    """
+    Testing that exact matches are found before the fuzzy matching,
+    with a score of 1.
+    """
+    left = pd.DataFrame({"a": ["Paris", "new  York", "Berln", "Paris"]})
+    right = pd.DataFrame(
+        {"a": ["paris", "Paris", "New York", "Berlin"], "b": [0, 1, 2, 3]}
+    )
+    joined = fuzzy_join(left, right, on="a", return_score=True)
+    # "paris" and "Paris" have the same encoding, the exact match is chosen
+    assert joined["b"].tolist() == [1, 2, 3, 1]
+    scores = joined["matching_score"].to_numpy()
+    assert_array_equal(scores[[0, 3]], 1.0)
+    assert scores[2] < 1.0
+
+    joined = fuzzy_join(
+        left, right, on="a", return_score=True, normalize_keys=True, match_score=1
+    )
+    assert joined["a_y"].tolist() == ["paris", "New York", pd.NA, "paris"]
+    assert joined["matching_score"].tolist()[:2] == [1.0, 1.0]
+
+    # Only exact matches
+    joined = fuzzy_join(left.iloc[[0, 3]], right, on="a", return_score=True)
+    assert joined["matching_score"].tolist() == [1.0, 1.0]
+
+
+def test_output_assembly() -> None:
+    """
+    Testing the output built from the matched rows of both tables.
+    """
+    left = pd.DataFrame({"a": ["ana", "lala", "nana"], "b": [1, 2, 3]}, index=[5, 3, 4])
+    right = pd.DataFrame(
+        {"a": ["anna", "lala", "ana"], "b": [5, 6, 7], "c": [0.5, 1.5, 2.5]}
+    )
+    left_copy = left.copy()
+    joined = fuzzy_join(left, right, on="a", match_score=1, return_score=True)
+    assert_frame_equal(left, left_copy)
+    expected = pd.DataFrame(
+        {
+            "a_x": ["ana", "lala", "nana"],
+            "b_x": [1, 2, 3],
+            "a_y": pd.array(["ana", "lala", pd.NA], dtype="string"),
+            "b_y": pd.array([7, 6, pd.NA], dtype="Int64"),
+            "c": pd.array([2.5, 1.5, pd.NA], dtype="Float64"),
+        }
+    )
+    assert_frame_equal(joined.drop(columns="matching_score"), expected)
+    assert joined["matching_score"].tolist()[:2] == [1.0, 1.0]
+
+
+def test_fuzzy_join_chunks() -> None:
+    """
+    Testing that the joined chunks do not depend on the chunk size.
+    """
+    rng = np.random.default_rng(0)
+    words = ["paris", "london", "berlin", "rome", "madrid", "lisbon"]
+    main = pd.DataFrame(
+        {
+            "city": [
+                w[:-1] if rng.random() < 0.5 else w for w in rng.choice(words, 20)
+            ],
+            "n": rng.normal(size=20),
+        }
+    )
+    aux = pd.DataFrame({"town": words, "n": rng.normal(size=6), "id": range(6)})
+    for main_on, aux_on in [("city", "town"), (["city", "n"], ["town", "n"])]:
+        outputs = []
+        for chunk_size in [1, 7, 20]:
+            chunks = (
+                main.iloc[i : i + chunk_size] for i in range(0, len(main), chunk_size)
+            )
+            joined = fuzzy_join_chunks(
+                chunks, aux, main_on=main_on, aux_on=aux_on, return_score=True
+            )
+            outputs.append(pd.concat(joined, ignore_index=True))
+        for output in outputs[1:]:
+            assert_frame_equal(output, outputs[0])
+        scores = outputs[0]["matching_score"]
+        assert ((0 <= scores) & (scores <= 1)).all()
+        if main_on == "city":
+            assert (scores[main["city"].isin(words)] == 1).all()
+
+    with pytest.raises(ValueError, match="same number of columns"):
+        next(fuzzy_join_chunks([main], aux, main_on=["city", "n"], aux_on="town"))
+
+
+def _is_memory_mapped(array) -> bool:
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+
+@pytest.mark.parametrize(
+    "on, neighbors",
+    [
+        ("a", None),
+        ("a", RandomProjectionLSH(n_tables=4, n_bits=4, random_state=0)),
+        (["b", "c"], None),
+    ],
+)
+def test_index_save_load(tmp_path, on, neighbors) -> None:
+    """
+    Testing that a saved index is memory-mapped and joins as the original.
+    """
+    left = pd.DataFrame(
+        {"a": ["ana", "lala", "nana", "sana"], "b": [1, 2, 3, 4], "c": [0.5] * 4}
+    )
+    right = pd.DataFrame(
+        {
+            "a": ["anna", "lala", "ana", "nnana", "ana"],
+            "b": [1, 5, 2, 3, 1],
+            "c": [0.1, 0.2, 0.3, 0.4, 0.5],
+        }
+    )
+    index = FuzzyJoinIndex(neighbors=neighbors).fit(right, np.atleast_1d(on))
+    index.save(tmp_path / "index")
+    loaded = FuzzyJoinIndex.load(tmp_path / "index")
+    assert _is_memory_mapped(loaded.aux_positions_)
+    assert _is_memory_mapped(loaded.exact_hashes_)
+    assert _is_memory_mapped(loaded.exact_positions_)
+    if on == "a" and neighbors is None:
+        assert _is_memory_mapped(loaded.aux_encoded_T_.data)
+        assert _is_memory_mapped(loaded.aux_encoded_T_.indices)
+    if neighbors is not None:
+        lsh = loaded.neighbors_
+        for array in [lsh.order_, lsh.sorted_buckets_, lsh.squared_norms_]:
+            assert _is_memory_mapped(array)
+        assert _is_memory_mapped(lsh.X_fit_.data)
+        assert _is_memory_mapped(lsh.projections_)
+    if on == "a":
+        assert _is_memory_mapped(loaded.idf_)
+    else:
+        assert _is_memory_mapped(loaded.tree_keys_)
+    # Only the parameters and the small fitted encoders are pickled
+    pickled = joblib.load(tmp_path / "index" / "index.pkl")["state"]
+    assert not {"tree_", "idf_", "exact_hashes_", "neighbors_"} & pickled.keys()
+
+    expected = fuzzy_join(left, right, on=on, index=index, return_score=True)
+    joined = fuzzy_join(left, right, on=on, index=loaded, return_score=True)
+    assert_frame_equal(joined, expected)
+    # Same matches as without prebuilt index
+    assert_frame_equal(
+        joined.drop(columns="matching_score"),
+        fuzzy_join(left, right, on=on, neighbors=neighbors),
+    )
+    in_memory = FuzzyJoinIndex.load(tmp_path / "index", mmap_mode=None)
+    assert not _is_memory_mapped(in_memory.aux_positions_)
+    assert_frame_equal(
+        fuzzy_join(left, right, on=on, index=in_memory, return_score=True),
+        expected,
+    )
+
+    with pytest.raises(ValueError, match="fitted on a table with 5 rows"):
+        fuzzy_join(left, right.iloc[:3], on=on, index=loaded)
+    with pytest.raises(TypeError, match="should be a FuzzyJoinIndex"):
+        fuzzy_join(left, right, on=on, index="index")
+    with pytest.raises(ValueError, match="mmap_mode"):
+        FuzzyJoinIndex.load(tmp_path / "index", mmap_mode="w+")
+
+
+@pytest.mark.skipif(not POLARS_SETUP, reason="Polars is not available")
+@pytest.mark.parametrize("lazy", [False, True])
+@pytest.mark.parametrize("how", ["left", "right"])
+@pytest.mark.parametrize("drop_unmatched, sort", [(False, False), (True, True)])
+def test_fuzzy_join_polars(lazy, how, drop_unmatched, sort) -> None:
+    """
+    Testing that polars tables give the same join as pandas ones.
+    """
+    left = pd.DataFrame(
+        {"a": ["ana", "lala", "nana", "zz"], "b": [1, 2, 3, 4], "c": [0.5] * 4}
+    )
+    right = pd.DataFrame({"a": ["anna", "lala", "ana", "nnana"], "d": [5, 6, 7, 8]})
+    kwargs = dict(
+        on="a",
+        how=how,
+        match_score=0.6,
+        return_score=True,
+        drop_unmatched=drop_unmatched,
+        sort=sort,
+    )
+    expected = fuzzy_join(left, right, **kwargs)
+    left_pl, right_pl = pl.DataFrame(left), pl.DataFrame(right)
+    if lazy:
+        left_pl, right_pl = left_pl.lazy(), right_pl.lazy()
+    joined = fuzzy_join(left_pl, right_pl, **kwargs)
+    assert isinstance(joined, pl.LazyFrame if lazy else pl.DataFrame)
+    if lazy:
+        joined = joined.collect()
+    assert_frame_equal_pl(joined, pl.from_pandas(expected))
+
+    with pytest.raises(TypeError, match="Mixing Pandas and Polars"):
+        fuzzy_join(left, right_pl, on="a")
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_block_on(n_jobs) -> None:
+    """
+    Testing that the keys are only matched within their block.
+    """
+    left = pd.DataFrame(
+        {
+            "city": ["Paris", "Parris", "London", "Londres", "Madrid", "Rome"],
+            "country": ["FR", "US", "UK", "CA", "ES", None],
+        }
+    )
+    right = pd.DataFrame(
+        {
+            "city": ["Paris", "Paris", "London", "London", "Lyon", "Rome"],
+            "country": ["FR", "US", "UK", "CA", "FR", "IT"],
+            "id": range(6),
+        }
+    )
+    joined = fuzzy_join(
+        left,
+        right,
+        on="city",
+        block_on="country",
+        return_score=True,
+        n_jobs=n_jobs,
+    )
+    assert joined["id"].tolist()[:4] == [0, 1, 2, 3]
+    # No block in the right table, or missing block
+    assert joined["id"].isna().tolist() == [False] * 4 + [True] * 2
+    assert joined["matching_score"].tolist()[4:] == [0, 0]
+    assert (joined["matching_score"][[0, 2]] == 1).all()
+
+    # Several blocking columns, and dropped unmatched rows
+    left["continent"], right["continent"] = "EU", "EU"
+    joined = fuzzy_join(
+        left,
+        right,
+        on="city",
+        block_on=["country", "continent"],
+        drop_unmatched=True,
+        n_jobs=n_jobs,
+    )
+    assert joined["id"].tolist() == [0, 1, 2, 3]
+
+    # Same matches as without blocks if there is a single block
+    assert_frame_equal(
+        fuzzy_join(left, right, on="city", block_on="continent"),
+        fuzzy_join(left, right, on="city"),
+    )
+
+    # Numerical keys
+    left["x"], right["x"] = [1.0, 5.0, 9.0, 2.0, 0, 0], [1.1, 7.0, 4.0, 2.5, 6, 0]
+    joined = fuzzy_join(left, right, on="x", block_on="country", n_jobs=n_jobs)
+    assert joined["id"].tolist()[:4] == [0, 1, 2, 3]
@@ -1,7 +1,13 @@
 import pandas as pd
 import pytest
+from sklearn.base import clone
 
-from skrub import Joiner
+from skrub import FuzzyJoinIndex, Joiner, fuzzy_join
+from skrub.dataframe import POLARS_SETUP
+
+if POLARS_SETUP:
+    import polars as pl
+    from polars.testing import assert_frame_equal as assert_frame_equal_pl
 
 
 def test_joiner() -> None:
@@ -116,3 +122,172 @@ def test_multiple_keys():
     result = joiner_list.fit_transform(df)
     expected = pd.DataFrame(pd.concat([df, df2], axis=1))
     pd.testing.assert_frame_equal(result, expected)
+
+
+def test_transform_uses_fitted_index() -> None:
+    main_table = pd.DataFrame({"Country": ["France", "Germany", "Italy", "Spain"]})
+    aux_table = pd.DataFrame(
+        {
+            "Country name": ["French Republic", "Germany", "Italia", "Espana"],
+            "Capital": ["Paris", "Berlin", "Rome", "Madrid"],
+        }
+    )
+    joiner = Joiner(tables=(aux_table, "Country name"), main_key="Country")
+    expected = fuzzy_join(
+        main_table,
+        aux_table,
+        left_on="Country",
+        right_on="Country name",
+        suffixes=("", "_aux"),
+    )
+    pd.testing.assert_frame_equal(joiner.fit_transform(main_table), expected)
+    assert len(joiner.indices_) == 1
+
+    # transform only queries the index built during fit
+    index = joiner.indices_[0]
+    aux_encoded = index.aux_encoded_T_
+    output = joiner.transform(main_table.iloc[[3, 0]])
+    assert joiner.indices_[0] is index and index.aux_encoded_T_ is aux_encoded
+    assert output["Capital"].tolist() == ["Madrid", "Paris"]
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_parallel_tables(n_jobs) -> None:
+    main_table = pd.DataFrame(
+        {"Country": ["France", "Germany", "Italy", "Spain"], "Code": [1, 2, 3, 4]},
+        index=[10, 11, 12, 13],
+    )
+    aux_tables = [
+        (
+            pd.DataFrame(
+                {
+                    "Country": ["French Republic", "Germany", "Italia"],
+                    "Code": [33, 49, 39],
+                }
+            ),
+            "Country",
+        ),
+        (
+            pd.DataFrame(
+                {"Name": ["Spain", "Italy", "France"], "Capital": ["M", "R", "P"]}
+            ),
+            "Name",
+        ),
+        (pd.DataFrame({"Country": ["Germany", "Spain"], "Code": [5, 6]}), "Country"),
+    ]
+    joiner = Joiner(aux_tables, main_key="Country", match_score=0.7, n_jobs=n_jobs)
+    output = joiner.fit_transform(main_table)
+
+    # Same output as joining the tables one after the other
+    expected = main_table
+    for aux_table, aux_key in aux_tables:
+        expected = fuzzy_join(
+            expected,
+            aux_table,
+            left_on="Country",
+            right_on=aux_key,
+            match_score=0.7,
+            suffixes=("", "_aux"),
+        )
+    # but with distinct column names
+    assert output.columns.tolist() == [
+        "Country",
+        "Code",
+        "Country_aux",
+        "Code_aux",
+        "Name",
+        "Capital",
+        "Country_aux_aux",
+        "Code_aux_aux",
+    ]
+    pd.testing.assert_frame_equal(output, expected.set_axis(output.columns, axis=1))
+
+
+def test_prebuilt_indices(tmp_path) -> None:
+    """
+    Testing the Joiner with indices loaded from disk.
+    """
+    main_table = pd.DataFrame({"Country": ["France", "Germany", "Italy"]})
+    aux_tables = [
+        (
+            pd.DataFrame(
+                {"Country": ["Germany", "France", "Italy"], "P": [84, 68, 59]}
+            ),
+            "Country",
+        ),
+        (
+            pd.DataFrame(
+                {"Name": ["French Republic", "Italia", "Germany"], "C": [1, 2, 3]}
+            ),
+            "Name",
+        ),
+    ]
+    for i, (table, key) in enumerate(aux_tables):
+        FuzzyJoinIndex().fit(table, [key]).save(tmp_path / str(i))
+    indices = [FuzzyJoinIndex.load(tmp_path / str(i)) for i in range(2)]
+
+    joiner = clone(Joiner(aux_tables, main_key="Country", indices=indices))
+    # The cloned Joiner shares the memory-mapped arrays of the indices
+    assert joiner.indices[1].aux_encoded_T_.data is indices[1].aux_encoded_T_.data
+    output = joiner.fit_transform(main_table)
+    assert joiner.indices_[0] is joiner.indices[0]
+    assert output["P"].tolist() == [68, 84, 59]
+    assert output["C"].tolist() == [1, 3, 2]
+
+    with pytest.raises(ValueError, match="Got 1 indices for 2 auxiliary tables"):
+        Joiner(aux_tables, main_key="Country", indices=indices[:1]).fit(main_table)
+    longer_table = pd.concat([aux_tables[0][0]] * 2)
+    with pytest.raises(ValueError, match="fitted on a table with 3 rows"):
+        Joiner(
+            [(longer_table, "Country"), aux_tables[1]],
+            main_key="Country",
+            indices=indices,
+        ).fit(main_table)
+
+
+@pytest.mark.skipif(not POLARS_SETUP, reason="Polars is not available")
+@pytest.mark.parametrize("lazy", [False, True])
+def test_joiner_polars(lazy) -> None:
+    """
+    Testing that polars tables give the same output as pandas ones.
+    """
+    main_table = pd.DataFrame({"Country": ["France", "Germany", "Italy", "Spain"]})
+    aux_tables = [
+        (
+            pd.DataFrame(
+                {"Country": ["Germany", "France", "Italy"], "P": [84, 68, 59]}
+            ),
+            "Country",
+        ),
+        (
+            pd.DataFrame(
+                {"Name": ["French Republic", "Italia", "Germany"], "Country": [1, 2, 3]}
+            ),
+            "Name",
+        ),
+    ]
+    expected = Joiner(aux_tables, main_key="Country", match_score=0.5).fit_transform(
+        main_table
+    )
+
+    def to_polars(table):
+        table = pl.DataFrame(table)
+        return table.lazy() if lazy else table
+
+    joiner = Joiner(
+        [(to_polars(table), key) for table, key in aux_tables],
+        main_key="Country",
+        match_score=0.5,
+    )
+    output = joiner.fit_transform(to_polars(main_table))
+    assert isinstance(output, pl.LazyFrame if lazy else pl.DataFrame)
+    if lazy:
+        output = output.collect()
+    # Polars columns have distinct names
+    assert output.columns == ["Country", "Country_aux", "P", "Name", "Country_aux_aux"]
+    assert_frame_equal_pl(
+        output, pl.from_pandas(expected.set_axis(output.columns, axis=1))
+    )
+
+    with pytest.raises(TypeError, match="Mixing Pandas and Polars"):
+        joiner.transform(main_table)
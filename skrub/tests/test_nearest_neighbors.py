@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.testing import assert_array_equal
+from scipy import sparse
+from sklearn import config_context
+from sklearn.exceptions import NotFittedError
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import normalize
+
+from skrub import Joiner, RandomProjectionLSH, fuzzy_join
+from skrub._fuzzy_join import FuzzyJoinIndex
+from skrub._nearest_neighbors import _nearest_rows, _nearest_sorted
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_nearest_rows(n_jobs) -> None:
+    """
+    Testing the blockwise search against scikit-learn's NearestNeighbors.
+    """
+    X = sparse.random(30, 20, density=0.3, format="csr", random_state=0)
+    Y = sparse.random(100, 20, density=0.3, format="csr", random_state=1)
+    X[3] = Y[7]
+    Y_squared_norms = np.asarray(Y.multiply(Y).sum(axis=1)).ravel()
+    expected_distance, expected_neighbors = (
+        NearestNeighbors(n_neighbors=1).fit(Y).kneighbors(X)
+    )
+    # Force several blocks
+    with config_context(working_memory=0.002):
+        neighbors, distance = _nearest_rows(
+            X, Y.T.tocsr(), Y_squared_norms, n_jobs=n_jobs
+        )
+    assert_array_equal(neighbors, expected_neighbors.ravel())
+    np.testing.assert_allclose(distance, expected_distance, atol=1e-12)
+    assert neighbors[3] == 7 and distance[3, 0] == 0
+
+
+def _random_rows(n_samples, random_state):
+    return normalize(
+        sparse.random(
+            n_samples, 50, density=0.2, format="csr", random_state=random_state
+        )
+    )
+
+
+def test_random_projection_lsh() -> None:
+    Y = _random_rows(500, 1)
+    X = sparse.vstack([Y[:10], _random_rows(30, 0)], format="csr")
+    expected_distance, expected_neighbors = (
+        NearestNeighbors(n_neighbors=1).fit(Y).kneighbors(X)
+    )
+
+    lsh = RandomProjectionLSH(n_tables=32, n_bits=4, random_state=0).fit(Y)
+    assert lsh.order_.shape == lsh.sorted_buckets_.shape == (500, 32)
+    assert lsh.X_fit_.shape == Y.shape
+    distance, neighbors = lsh.kneighbors(X)
+    assert distance.shape == neighbors.shape == (40, 1)
+    # Rows present in Y are always found
+    assert_array_equal(neighbors[:10, 0], np.arange(10))
+    np.testing.assert_allclose(distance[:10], 0, atol=1e-6)
+    recall = (neighbors == expected_neighbors).mean()
+    assert recall > 0.8
+    assert (distance >= expected_distance - 1e-12).all()
+    assert_array_equal(lsh.kneighbors(X, return_distance=False), neighbors)
+
+    # Fewer candidates: the returned neighbors are not as close on average
+    lsh = RandomProjectionLSH(n_tables=1, n_bits=4, random_state=0).fit(Y)
+    coarse_distance, coarse_neighbors = lsh.kneighbors(X)
+    assert (coarse_neighbors >= 0).all()
+    assert coarse_distance.mean() > distance.mean()
+
+
+def test_random_projection_lsh_used_features() -> None:
+    # Only the features of the rows seen during fit are projected
+    rng = np.random.default_rng(0)
+    rows = sparse.csr_matrix(
+        (
+            rng.random(130 * 10),
+            rng.integers(2**20, size=130 * 10),
+            range(0, 1301, 10),
+        ),
+        shape=(130, 2**20),
+    )
+    Y, X = rows[:100], sparse.vstack([rows[100:], rows[:5]], format="csr")
+    lsh = RandomProjectionLSH(n_tables=64, n_bits=32, random_state=0).fit(Y)
+    assert_array_equal(lsh.features_, np.unique(Y.indices))
+    assert lsh.projections_.shape == (len(lsh.features_), 64 * 32)
+    distance, neighbors = lsh.kneighbors(X)
+    assert_array_equal(neighbors[-5:, 0], np.arange(5))
+    expected_distance, _ = NearestNeighbors(n_neighbors=1).fit(Y).kneighbors(X)
+    assert (distance >= expected_distance - 1e-6).all()
+
+
+def test_random_projection_lsh_errors() -> None:
+    Y = _random_rows(10, 0)
+    for params in [{"n_tables": 0}, {"n_bits": 0}, {"n_bits": 65}]:
+        with pytest.raises(ValueError, match="expected"):
+            RandomProjectionLSH(**params).fit(Y)
+    with pytest.raises(ValueError, match="only 1 neighbor"):
+        RandomProjectionLSH().fit(Y).kneighbors(Y, n_neighbors=2)
+    with pytest.raises(NotFittedError):
+        RandomProjectionLSH().kneighbors(Y)
+
+
+def test_neighbors_backend() -> None:
+    left = pd.DataFrame({"a": ["Paris", "Berln", "Rome", "Lisboa", "Madrid"]})
+    right = pd.DataFrame(
+        {"a": ["Berlin", "Roma", "Paris", "Lisbon", "Madrid"], "b": range(5)}
+    )
+    expected = fuzzy_join(left, right, on="a", return_score=True)
+    for neighbors in [
+        NearestNeighbors(),
+        RandomProjectionLSH(n_tables=64, n_bits=2, random_state=0),
+    ]:
+        joined = fuzzy_join(left, right, on="a", return_score=True, neighbors=neighbors)
+        pd.testing.assert_frame_equal(joined, expected)
+
+    neighbors = RandomProjectionLSH(random_state=0)
+    joiner = Joiner((right, "a"), main_key="a", neighbors=neighbors).fit(left)
+    assert joiner.transform(left)["b"].notna().all()
+    assert not hasattr(neighbors, "projections_")
+
+
+def test_nearest_sorted() -> None:
+    values = np.array([3.0, 1.0, 5.0, 2.0])
+    order = np.argsort(values, kind="stable")
+    x = np.array([0.0, 1.4, 1.5, 4.0, 4.5, 9.0])
+    neighbors, distance = _nearest_sorted(x, values[order], order)
+    # Ties are broken in favor of the first value
+    assert_array_equal(neighbors, [1, 1, 1, 0, 2, 2])
+    np.testing.assert_allclose(distance[:, 0], [1.0, 0.4, 0.5, 1.0, 0.5, 4.0])
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_dense_keys(n_jobs) -> None:
+    rng = np.random.default_rng(0)
+    left = pd.DataFrame(
+        {
+            "x": rng.normal(size=50),
+            "y": rng.normal(size=50),
+            "t": pd.date_range("2020-01-01", periods=50, freq="7h"),
+        }
+    )
+    right = pd.DataFrame(
+        {
+            "x": rng.normal(size=80),
+            "y": rng.normal(size=80),
+            "t": pd.date_range("2020-01-02", periods=80, freq="3h"),
+        }
+    )
+    for on in ["x", "t", ["x", "y"], ["x", "t"]]:
+        index = FuzzyJoinIndex().fit(right, np.atleast_1d(on), left, np.atleast_1d(on))
+        neighbors, distance = index.kneighbors(left, np.atleast_1d(on), n_jobs=n_jobs)
+        if np.ndim(on) == 0:
+            assert hasattr(index, "sorted_keys_")
+        else:
+            assert hasattr(index, "tree_")
+        assert not hasattr(index, "aux_encoded_T_")
+
+        # Same matches as the brute-force search
+        encoded = index.encode(left[np.atleast_1d(on)])
+        aux_encoded = index.encode(right[np.atleast_1d(on)])
+        expected_distance, expected_neighbors = (
+            NearestNeighbors(n_neighbors=1).fit(aux_encoded).kneighbors(encoded)
+        )
+        assert_array_equal(neighbors, expected_neighbors[:, 0])
+        np.testing.assert_allclose(distance, expected_distance, atol=1e-12)
+
+
+@pytest.mark.parametrize("on", [["x"], ["x", "y"], ["x", "s"]])
+def test_missing_numeric_keys(on) -> None:
+    left = pd.DataFrame(
+        {"x": [1.0, np.nan, 3.2], "y": [1.0, 2.0, np.nan], "s": ["a", "b", "c"]}
+    )
+    right = pd.DataFrame(
+        {"x": [1.1, 2.9, 5.0], "y": [0.0, 2.0, 1.0], "s": ["a", "b", "d"]}
+    )
+    missing = left[on].isna().any(axis=1).to_numpy()
+    _, distance = FuzzyJoinIndex().fit(right, on).kneighbors(left, on)
+    assert np.isinf(distance[missing]).all()
+    assert np.isfinite(distance[~missing]).all()
+
+    # The keys with missing values are not matched
+    with pytest.warns(UserWarning, match="missing values"):
+        joined = fuzzy_join(left, right, on=on, return_score=True)
+    assert_array_equal(joined["matching_score"].to_numpy()[missing], 0)
+    assert joined.loc[missing, "x_y"].isna().all()
+    with pytest.warns(UserWarning, match="missing values"):
+        joined = fuzzy_join(left, right, on=on, drop_unmatched=True)
+    assert len(joined) == (~missing).sum()
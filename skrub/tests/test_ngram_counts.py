@@ -0,0 +1,148 @@
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import (
+    CountVectorizer,
+    HashingVectorizer,
+    TfidfVectorizer,
+)
+
+from skrub import _ngram_counts
+from skrub._ngram_counts import (
+    CachedCountVectorizer,
+    CachedHashingVectorizer,
+    CachedTfidfVectorizer,
+    clear_ngram_caches,
+)
+
+
+def _random_strings(n_strings, alphabet, seed=0):
+    rng = np.random.RandomState(seed)
+    return [
+        "".join(rng.choice(list(alphabet), rng.randint(0, 15)))
+        for _ in range(n_strings)
+    ]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        dict(analyzer="char", ngram_range=(2, 4)),
+        dict(analyzer="char_wb", ngram_range=(2, 4), dtype=np.float32),
+        dict(analyzer="word", ngram_range=(1, 2), min_df=2),
+        dict(analyzer="char", ngram_range=(2, 3), vocabulary=["ab", "b c", "zz"]),
+        dict(analyzer="char", binary=True),
+        dict(analyzer=list),
+    ],
+)
+def test_same_output_as_count_vectorizer(params) -> None:
+    X_fit = _random_strings(300, "abc dE")
+    X_transform = _random_strings(100, "abcxyz ", seed=1)
+    expected = CountVectorizer(**params)
+    vectorizer = CachedCountVectorizer(**params)
+    # Fill the cache in another order first
+    CachedCountVectorizer(**params).fit(X_transform + X_fit[::-1])
+    for A, B in [
+        (expected.fit_transform(X_fit), vectorizer.fit_transform(X_fit)),
+        (expected.transform(X_transform), vectorizer.transform(X_transform)),
+    ]:
+        assert A.dtype == B.dtype
+        # The entries are stored in the same order, not only equal
+        assert np.array_equal(A.indptr, B.indptr)
+        assert np.array_equal(A.indices, B.indices)
+        assert np.array_equal(A.data, B.data)
+    assert np.array_equal(
+        expected.get_feature_names_out(), vectorizer.get_feature_names_out()
+    )
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        dict(analyzer="char_wb", ngram_range=(2, 4)),
+        dict(analyzer="char", n_features=16, norm=None, alternate_sign=False),
+        dict(analyzer="word", binary=True, norm="l1"),
+        dict(analyzer=list),
+    ],
+)
+def test_same_output_as_hashing_vectorizer(params) -> None:
+    X = _random_strings(300, "abc dE")
+    expected = HashingVectorizer(**params).transform(X)
+    # Fill the cache with the counts of a count vectorizer first
+    CachedCountVectorizer(analyzer=params["analyzer"]).fit(X[::-1])
+    for _ in range(2):
+        X_out = CachedHashingVectorizer(**params).fit_transform(X)
+        assert X_out.dtype == expected.dtype
+        assert np.array_equal(X_out.indptr, expected.indptr)
+        assert np.array_equal(X_out.indices, expected.indices)
+        assert np.array_equal(X_out.data, expected.data)
+
+
+def test_same_output_as_tfidf_vectorizer() -> None:
+    X_fit = _random_strings(300, "abc dE")
+    X_transform = _random_strings(100, "abcxyz ", seed=1)
+    expected = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4))
+    vectorizer = CachedTfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4))
+    for A, B in [
+        (expected.fit_transform(X_fit), vectorizer.fit_transform(X_fit)),
+        (expected.transform(X_transform), vectorizer.transform(X_transform)),
+    ]:
+        assert np.array_equal(A.indices, B.indices)
+        np.testing.assert_allclose(A.data, B.data)
+    assert vectorizer.vocabulary_ == expected.vocabulary_
+
+
+def test_cache_is_shared() -> None:
+    clear_ngram_caches()
+    X = ["paris", "london", "paris", "berlin"]
+    CachedCountVectorizer(analyzer="char", ngram_range=(2, 3)).fit(X)
+    (cache,) = _ngram_counts._ngram_caches.values()
+    assert len(cache.rows) == 3
+
+    # Another vectorizer with the same analysis parameters reuses the counts
+    vectorizer = CachedCountVectorizer(analyzer="char", ngram_range=(2, 3))
+    vectorizer.fit(["paris", "rome"])
+    assert len(_ngram_counts._ngram_caches) == 1
+    assert len(cache.rows) == 4
+    # Other parameters use another cache
+    CachedCountVectorizer(analyzer="char", ngram_range=(2, 4)).fit(X)
+    assert len(_ngram_counts._ngram_caches) == 2
+
+    # The vectorizer does not depend on the cache it was fitted with
+    unpickled = pickle.loads(pickle.dumps(vectorizer))
+    expected = vectorizer.transform(X)
+    clear_ngram_caches()
+    assert not _ngram_counts._ngram_caches
+    assert (unpickled.transform(X) != expected).nnz == 0
+
+
+def test_cache_is_bounded(monkeypatch) -> None:
+    clear_ngram_caches()
+    monkeypatch.setattr(_ngram_counts, "NGRAM_CACHE_SIZE", 2)
+    X = _random_strings(50, "abcdef")
+    expected = CountVectorizer(analyzer="char", ngram_range=(2, 3)).fit_transform(X)
+    vectorizer = CachedCountVectorizer(analyzer="char", ngram_range=(2, 3))
+    assert (vectorizer.fit_transform(X) != expected).nnz == 0
+    assert (vectorizer.transform(X) != expected).nnz == 0
+    # Only the n-grams of the cached strings are kept
+    (cache,) = _ngram_counts._ngram_caches.values()
+    assert len(cache.rows) == 2
+    assert not hasattr(cache, "vocabulary")
+    clear_ngram_caches()
+
+
+def test_errors() -> None:
+    vectorizer = CachedCountVectorizer()
+    with pytest.raises(ValueError, match="invalid document"):
+        vectorizer.fit(["a", np.nan])
+    with pytest.raises(ValueError, match="empty vocabulary"):
+        vectorizer.fit(["", " "])
+    with pytest.raises(ValueError, match="string object received"):
+        vectorizer.fit("abc")
+    # Iterators are not consumed before falling back to the parent vectorizer
+    X_out = CachedHashingVectorizer(analyzer="char").transform(iter(["ab", "ba"]))
+    assert X_out.shape[0] == 2
+    # Documents without any n-gram
+    X_out = CachedHashingVectorizer().transform(["a", ""])
+    assert X_out.shape == (2, 2**20) and X_out.nnz == 0
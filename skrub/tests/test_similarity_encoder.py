@@ -1,13 +1,18 @@
+from collections import Counter
 from collections.abc import Callable
 
 import numpy as np
 import numpy.testing
 import pytest
+from scipy import sparse
 from sklearn.exceptions import NotFittedError
 
 from skrub import SimilarityEncoder
-from skrub._similarity_encoder import ngram_similarity_matrix
-from skrub._string_distances import ngram_similarity
+from skrub._similarity_encoder import (
+    iter_ngram_similarity_matrix,
+    ngram_similarity_matrix,
+)
+from skrub._string_distances import ngram_similarity, preprocess
 
 
 def test_specifying_categories() -> None:
@@ -187,6 +192,33 @@ def test_ngram_similarity_matrix(analyzer) -> None:
     assert sim.shape == (len(X1), len(X2))
 
 
+@pytest.mark.parametrize("hashing_dim", [None, 2**10])
+def test_iter_ngram_similarity_matrix(hashing_dim) -> None:
+    X = np.array(["aa", "aab", "b", "aa", "cat", "b", "aab", "aa", "", "ccat"])
+    cats = ["aab", "cat", "b"]
+    sim = ngram_similarity_matrix(
+        X, cats, ngram_range=(2, 3), analyzer="char", hashing_dim=hashing_dim
+    )
+    expected = [[_reference_similarity(x, cat, (2, 3)) for cat in cats] for x in X]
+    numpy.testing.assert_almost_equal(sim, expected)
+    # Each row of X is encoded exactly once, in chunks of unique values
+    chunked = np.full_like(sim, np.nan)
+    n_chunks = 0
+    for indices, similarities in iter_ngram_similarity_matrix(
+        X,
+        cats,
+        ngram_range=(2, 3),
+        analyzer="char",
+        hashing_dim=hashing_dim,
+        batch_size=2,
+    ):
+        assert np.isnan(chunked[indices]).all()
+        chunked[indices] = similarities
+        n_chunks += 1
+    assert n_chunks == 3
+    numpy.testing.assert_array_equal(chunked, sim)
+
+
 def test_determinist() -> None:
     sim_enc = SimilarityEncoder(
         categories="auto",
@@ -319,3 +351,164 @@ def test_check_fitted_super_vectorizer() -> None:
         sim_enc.transform(X)
     sim_enc.fit(X)
     sim_enc.transform(X)
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_fast_ngram_similarity_repeated_ngrams(n_jobs) -> None:
+    # The batched kernel must handle n-grams counted several times
+    # in both the samples and the categories.
+    X = np.array(["aaaa", "abab", "baaab", "b", "ababab aaaa"]).reshape(-1, 1)
+    X_test = np.array(["aaaaaa", "abababab", "ba", "", "aaab abab"]).reshape(-1, 1)
+
+    sim_enc = SimilarityEncoder(ngram_range=(2, 3), n_jobs=n_jobs).fit(X)
+    fast = sim_enc.transform(X_test, fast=True)
+
+    categories = sim_enc.categories_[0]
+    expected = np.zeros((len(X_test), len(categories)))
+    for i, x_t in enumerate(X_test.ravel()):
+        for j, cat in enumerate(categories):
+            expected[i, j] = _reference_similarity(x_t, cat, (2, 3))
+    numpy.testing.assert_almost_equal(fast, expected)
+
+
+def _reference_similarity(x: str, y: str, ngram_range: tuple[int, int]) -> float:
+    x, y = preprocess(x), preprocess(y)
+    count_x, count_y = Counter(), Counter()
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        count_x.update(x[i : i + n] for i in range(len(x) - n + 1))
+        count_y.update(y[i : i + n] for i in range(len(y) - n + 1))
+    same = sum((count_x & count_y).values())
+    all_ = sum(count_x.values()) + sum(count_y.values()) - same
+    return same / all_ if all_ else 0.0
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_sparse_output(fast) -> None:
+    X = np.array(
+        [
+            ["paris", "red"],
+            ["parisien", "blue"],
+            ["london", "green"],
+            ["londres", "reddish"],
+            ["berlin", "bluish"],
+        ],
+        dtype=object,
+    )
+    dense = SimilarityEncoder().fit(X).transform(X, fast=fast)
+
+    sim_enc = SimilarityEncoder(sparse_output=True).fit(X)
+    X_out = sim_enc.transform(X, fast=fast)
+    assert sparse.isspmatrix_csr(X_out)
+    numpy.testing.assert_allclose(X_out.toarray(), dense, rtol=1e-6)
+
+    # Only the 2 most similar categories of each feature are kept
+    sim_enc = SimilarityEncoder(sparse_output=True, top_k=2).fit(X)
+    X_out = sim_enc.transform(X, fast=fast)
+    assert (X_out[:, :5].getnnz(axis=1) <= 2).all()
+    assert (X_out[:, 5:].getnnz(axis=1) <= 2).all()
+    expected = np.sort(dense[:, :5], axis=1)[:, -2:]
+    numpy.testing.assert_allclose(
+        np.sort(X_out[:, :5].toarray(), axis=1)[:, -2:], expected, rtol=1e-6
+    )
+
+    sim_enc = SimilarityEncoder(sparse_output=True, min_similarity=0.3).fit(X)
+    X_out = sim_enc.transform(X, fast=fast)
+    numpy.testing.assert_allclose(
+        X_out.toarray(), np.where(dense >= 0.3, dense, 0), rtol=1e-6
+    )
+
+    # top_k also applies to dense outputs
+    sim_enc = SimilarityEncoder(top_k=1).fit(X)
+    numpy.testing.assert_allclose(
+        sim_enc.transform(X, fast=fast), np.where(dense == 1, dense, 0), rtol=1e-6
+    )
+
+
+def test_sparse_output_parameters() -> None:
+    X = [["foo"], ["baz"]]
+    with pytest.raises(ValueError, match=r"Got top_k="):
+        SimilarityEncoder(top_k=0).fit(X)
+    with pytest.raises(ValueError, match=r"Got min_similarity="):
+        SimilarityEncoder(min_similarity=2).fit(X)
+
+
+@pytest.mark.parametrize("categories", ["most_frequent", "k-means"])
+def test_prototype_categories(categories) -> None:
+    X = np.array(
+        ["paris", "pariss", "london", "londn", "berlin", "berln", "rome"] * 3
+        + ["paris"] * 5
+        + ["london"] * 2,
+        dtype=object,
+    ).reshape(-1, 1)
+
+    sim_enc = SimilarityEncoder(
+        categories=categories, n_prototypes=3, random_state=0, handle_unknown="error"
+    )
+    X_out = sim_enc.fit_transform(X)
+    assert len(sim_enc.categories_[0]) <= 3
+    assert np.array_equal(sim_enc.categories_[0], np.sort(sim_enc.categories_[0]))
+    assert X_out.shape == (len(X), len(sim_enc.categories_[0]))
+    if categories == "most_frequent":
+        assert sim_enc.categories_[0].tolist() == ["berlin", "london", "paris"]
+
+    # Values not selected as prototypes are not unknown categories
+    sim_enc.transform(np.array([["berln"], ["rome"]], dtype=object))
+    # but values never seen during fit are
+    with pytest.raises(ValueError, match=r"Found unknown categories"):
+        sim_enc.transform(np.array([["madrid"]], dtype=object))
+
+    # The values seen during fit are only kept to raise these errors
+    sim_enc = SimilarityEncoder(
+        categories=categories, n_prototypes=3, random_state=0
+    ).fit(X)
+    assert sim_enc._fitted_values is None
+    sim_enc.transform(np.array([["madrid"]], dtype=object))
+
+    # With more prototypes than unique values, all the values are kept
+    sim_enc = SimilarityEncoder(categories=categories, n_prototypes=100).fit(X)
+    assert np.array_equal(sim_enc.categories_[0], np.unique(X))
+
+    with pytest.raises(ValueError, match=r"Got n_prototypes="):
+        SimilarityEncoder(categories=categories).fit(X)
+
+
+@pytest.mark.parametrize("sparse_output", [False, True])
+def test_cache(sparse_output) -> None:
+    X = np.array(["paris", "london", "berlin", "rome", "roma"]).reshape(-1, 1)
+    X_test = np.array(["pariss", "londres", "rome", "paris", "pariss"]).reshape(-1, 1)
+    expected = SimilarityEncoder(sparse_output=sparse_output).fit(X).transform(X_test)
+
+    sim_enc = SimilarityEncoder(cache_size=2, sparse_output=sparse_output).fit(X)
+    for _ in range(3):
+        X_out = sim_enc.transform(X_test)
+        if sparse_output:
+            X_out, expected_ = X_out.toarray(), expected.toarray()
+        else:
+            expected_ = expected
+        numpy.testing.assert_array_equal(X_out, expected_)
+        assert len(sim_enc._similarity_caches[0]) == 2
+
+    # When all the values are cached, none of them is encoded again
+    sim_enc = SimilarityEncoder(cache_size=5, sparse_output=sparse_output).fit(X)
+    for _ in range(2):
+        X_out = sim_enc.transform(X_test)
+        if sparse_output:
+            X_out = X_out.toarray()
+        numpy.testing.assert_array_equal(X_out, expected_)
+    assert len(sim_enc._similarity_caches[0]) == 4
+
+    # When the cache is too small, the most frequent values are kept
+    sim_enc = SimilarityEncoder(cache_size=1, sparse_output=sparse_output).fit(X)
+    sim_enc.transform(X_test)
+    assert "pariss" in sim_enc._similarity_caches[0]
+
+    # Encoders fitted or unpickled without a cache create it when needed
+    sim_enc = SimilarityEncoder(cache_size=2, sparse_output=sparse_output).fit(X)
+    del sim_enc._similarity_caches
+    sim_enc.transform(X_test)
+    assert len(sim_enc._similarity_caches[0]) == 2
+    del sim_enc.cache_size
+    sim_enc.transform(X_test)
+
+    with pytest.raises(ValueError, match=r"Got cache_size="):
+        SimilarityEncoder(cache_size=0).fit(X)
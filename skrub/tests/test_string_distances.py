@@ -1,4 +1,6 @@
 import numpy as np
+import pytest
+from scipy import sparse
 
 from skrub import _string_distances
 
@@ -24,6 +26,26 @@ def test_get_unique_ngrams() -> None:
     assert ngrams == true_ngrams
 
 
+def test_vectorized_ngrams() -> None:
+    strings = [s for pair in _random_string_pairs(n_pairs=20) for s in pair]
+    strings += ["Test", "new  york ", "", "a", "z\x00"]
+    ngrams, has_ngram = _string_distances.get_unique_ngrams(strings, (2, 4))
+    assert has_ngram.shape == (len(strings), len(ngrams))
+    for i, string in enumerate(strings):
+        assert set(map(tuple, ngrams[has_ngram[i].indices])) == (
+            _string_distances.get_unique_ngrams(string, (2, 4))
+        )
+    assert (has_ngram.data == 1).all()
+
+    ngrams, counts = _string_distances.get_ngrams(np.array(strings, dtype=object), 3)
+    for i, string in enumerate(strings):
+        assert sorted(
+            gram
+            for gram, count in zip(ngrams[counts[i].indices], counts[i].data)
+            for _ in range(int(count))
+        ) == sorted(map("".join, _string_distances.get_ngrams(string, 3)))
+
+
 def _random_string_pairs(n_pairs=50, seed=1) -> list[tuple[str, str]]:
     rng = np.random.RandomState(seed)
     characters = list(map(chr, range(10000)))
@@ -47,3 +69,60 @@ def test_ngram_similarity() -> None:
     # assert ...
     for n in range(1, 4):
         _check_symmetry(_string_distances.ngram_similarity, n)
+
+
+def test_ngram_intersection() -> None:
+    rng = np.random.RandomState(0)
+    indexed = rng.randint(0, 4, size=(30, 20)) * (rng.rand(30, 20) < 0.3)
+    queries = rng.randint(0, 5, size=(10, 20)) * (rng.rand(10, 20) < 0.3)
+
+    index = _string_distances.build_ngram_index(sparse.csr_matrix(indexed))
+    intersection = _string_distances.ngram_intersection(
+        sparse.csr_matrix(queries), index
+    )
+
+    expected = np.minimum(queries[:, None, :], indexed[None, :, :]).sum(axis=2)
+    assert sparse.isspmatrix_csr(intersection)
+    assert np.array_equal(intersection.toarray(), expected)
+    # Only the pairs sharing n-grams are stored
+    assert intersection.nnz == np.count_nonzero(expected)
+
+    # An empty index still has the right number of strings
+    index = _string_distances.build_ngram_index(sparse.csr_matrix((3, 20)))
+    intersection = _string_distances.ngram_intersection(
+        sparse.csr_matrix(queries), index
+    )
+    assert intersection.shape == (10, 3)
+    assert intersection.nnz == 0
+
+
+def test_get_ngram_count() -> None:
+    strings = ["test", "", "a longer string"]
+    counts = _string_distances.get_ngram_count(np.array(strings), (2, 4))
+    expected = [_string_distances.get_ngram_count(s, (2, 4)) for s in strings]
+    assert np.array_equal(counts, expected)
+    assert _string_distances.get_ngram_count("test", (2, 4)) == 3 + 2 + 1
+
+
+def test_vectorized_ngram_similarity() -> None:
+    pairs = _random_string_pairs(n_pairs=20)
+    # Add strings that differ by their case and their whitespaces only
+    pairs += [("Paris", "paris"), ("new  york", "New York "), ("a", "ab")]
+    strings1, strings2 = map(np.array, zip(*pairs))
+    for n in range(1, 4):
+        paired = _string_distances.paired_ngram_similarity(strings1, strings2, n)
+        pairwise = _string_distances.pairwise_ngram_similarity(strings1, strings2, n)
+        assert paired.shape == (len(pairs),)
+        assert pairwise.shape == (len(pairs), len(pairs))
+        for i, a in enumerate(strings1):
+            assert paired[i] == pytest.approx(
+                _string_distances.ngram_similarity(a, strings2[i], n)
+            )
+            for j, b in enumerate(strings2):
+                assert pairwise[i, j] == pytest.approx(
+                    _string_distances.ngram_similarity(a, b, n)
+                )
+    assert _string_distances.paired_ngram_similarity(["paris"], ["PARIS"], 3) == 1.0
+
+    with pytest.raises(ValueError, match="same length"):
+        _string_distances.paired_ngram_similarity(["a", "b"], ["a"], 2)
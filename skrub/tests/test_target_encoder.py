@@ -1,10 +1,16 @@
 import numpy as np
 import pytest
 from sklearn.exceptions import NotFittedError
+from sklearn.model_selection import KFold, ShuffleSplit
 
 from skrub import _target_encoder
 
 
+def _as_dict(encoder, values, j):
+    """Map the categories of feature `j` to their fitted statistics."""
+    return dict(zip(encoder.categories_[j], values))
+
+
 def test_target_encoder() -> None:
     lambda_ = _target_encoder.lambda_
     X1 = np.array(
@@ -34,8 +40,8 @@ def test_target_encoder() -> None:
     for j in range(X.shape[1]):
         assert np.array_equal(encoder.categories_[j], np.unique(X[:, j]))
     assert Ey_ == encoder.Ey_
-    assert encoder.Eyx_[0] == Eyx_["color"]
-    assert encoder.Eyx_[1] == Eyx_["gender"]
+    assert _as_dict(encoder, encoder.Eyx_[0], 0) == Eyx_["color"]
+    assert _as_dict(encoder, encoder.Eyx_[1], 1) == Eyx_["gender"]
 
     Xtest1 = np.array(
         ["Red", "red", "blue", "green", "Red", "red", "blue", "green"]
@@ -86,15 +92,16 @@ def test_target_encoder() -> None:
     assert np.array_equal(np.unique(y), encoder.classes_)
     for k in [0, 1, 2]:
         assert Ey_[k] == encoder.Ey_[k]
-        assert encoder.Eyx_[k][0] == Eyx_[k]["color"]
-        assert encoder.Eyx_[k][1] == Eyx_[k]["gender"]
+        assert _as_dict(encoder, encoder.Eyx_[k][0], 0) == Eyx_[k]["color"]
+        assert _as_dict(encoder, encoder.Eyx_[k][1], 1) == Eyx_[k]["gender"]
 
     count_ = {
         "color": {"Red": 1, "red": 2, "green": 3, "blue": 2},
         "gender": {"male": 4, "female": 4},
     }
-    assert count_["color"] == encoder.counter_[0]
-    assert count_["gender"] == encoder.counter_[1]
+    assert count_["color"] == _as_dict(encoder, encoder.counter_[0], 0)
+    assert count_["gender"] == _as_dict(encoder, encoder.counter_[1], 1)
+    assert np.array_equal(encoder.k_, [4, 2])
 
     ans_dict = {0: {}, 1: {}, 2: {}}
     for k in [0, 1, 2]:
@@ -139,6 +146,35 @@ def test_target_encoder() -> None:
     assert np.array_equal(Xout, ans)
 
 
+@pytest.mark.parametrize("clf_type", ["regression", "multiclass-clf"])
+def test_fit_statistics(clf_type) -> None:
+    rng = np.random.RandomState(0)
+    X = rng.randint(0, 20, size=(500, 2))
+    y = rng.randint(0, 3, size=500)
+    encoder = _target_encoder.TargetEncoder(clf_type=clf_type).fit(X, y)
+    for j in range(X.shape[1]):
+        counts = [np.sum(X[:, j] == cat) for cat in encoder.categories_[j]]
+        assert np.array_equal(encoder.counter_[j], counts)
+        assert encoder.k_[j] == len(np.unique(X[:, j]))
+        for c in encoder.classes_ if clf_type == "multiclass-clf" else [None]:
+            target = y if c is None else y == c
+            Eyx = encoder.Eyx_[j] if c is None else encoder.Eyx_[c][j]
+            expected = [
+                np.mean(target[X[:, j] == cat]) for cat in encoder.categories_[j]
+            ]
+            assert np.allclose(Eyx, expected)
+
+    # Categories that are not seen during fit have a count of 0
+    encoder = _target_encoder.TargetEncoder(
+        categories=[[0, 1, 2, 3]], handle_unknown="ignore"
+    )
+    encoder.fit([[0], [1], [1], [4]], [1.0, 2.0, 4.0, 8.0])
+    assert np.array_equal(encoder.counter_[0], [1, 2, 0, 0])
+    assert np.array_equal(encoder.Eyx_[0], [1.0, 3.0, 0.0, 0.0])
+    assert encoder.k_[0] == 3
+    assert np.allclose(encoder.transform([[2]]), encoder.Ey_)
+
+
 @pytest.mark.parametrize("input_type", ["list", "numpy", "pandas"])
 @pytest.mark.parametrize("missing", ["", "aaa", "error"])
 def test_missing_values(input_type, missing) -> None:
@@ -186,10 +222,10 @@ def test_missing_values(input_type, missing) -> None:
         assert set(encoder.categories_[0]) == set(color_cat)
         assert set(encoder.categories_[1]) == set(gender_cat)
         assert Ey_ == encoder.Ey_
-        assert encoder.Eyx_[0] == Eyx_["color"]
-        assert encoder.Eyx_[1] == Eyx_["gender"]
-        assert dict(encoder.counter_[0]) == count_["color"]
-        assert dict(encoder.counter_[1]) == count_["gender"]
+        assert _as_dict(encoder, encoder.Eyx_[0], 0) == Eyx_["color"]
+        assert _as_dict(encoder, encoder.Eyx_[1], 1) == Eyx_["gender"]
+        assert _as_dict(encoder, encoder.counter_[0], 0) == count_["color"]
+        assert _as_dict(encoder, encoder.counter_[1], 1) == count_["gender"]
     else:
         with pytest.raises(ValueError, match=r"expected any of"):
             encoder.fit_transform(X, y)
@@ -285,3 +321,109 @@ def test_check_fitted_target_encoder() -> None:
 
     enc.fit(X, y)
     enc.transform(X)
+
+
+def test_transform_unknown_multiclass() -> None:
+    X = np.array([["a"], ["b"], ["b"], ["c"]])
+    y = np.array([0, 1, 2, 1])
+    encoder = _target_encoder.TargetEncoder(
+        clf_type="multiclass-clf", handle_unknown="ignore"
+    ).fit(X, y)
+    out = encoder.transform([["b"], ["unknown"], ["a"]])
+    assert out.shape == (3, 3)
+    # Unknown categories are encoded with the frequency of each class
+    assert np.array_equal(out[1], [encoder.Ey_[c] for c in encoder.classes_])
+    assert np.array_equal(out[[0, 2]], encoder.transform([["b"], ["a"]]))
+
+
+def test_transform_unknown_mixed_types() -> None:
+    X = np.array([["a"], ["b"], ["b"]], dtype=object)
+    y = np.array([1.0, 2.0, 4.0])
+    encoder = _target_encoder.TargetEncoder(handle_unknown="ignore").fit(X, y)
+    # Values that cannot be compared with the categories are unknown
+    out = encoder.transform(np.array([["b"], [1], [2.5]], dtype=object))
+    assert np.array_equal(out[1:], [[encoder.Ey_]] * 2)
+    assert np.array_equal(out[:1], encoder.transform([["b"]]))
+
+
+@pytest.mark.parametrize("clf_type", ["regression", "binary-clf", "multiclass-clf"])
+def test_cross_fitting(clf_type) -> None:
+    rng = np.random.RandomState(0)
+    X = rng.randint(0, 30, size=(300, 2)).astype(str)
+    y = rng.randint(0, 3 if clf_type == "multiclass-clf" else 2, size=300)
+    cv = KFold(n_splits=4, shuffle=True, random_state=0)
+
+    encoder = _target_encoder.TargetEncoder(clf_type=clf_type, cv=cv, n_jobs=2)
+    out = encoder.fit_transform(X, y)
+    # Each fold is encoded by an encoder fitted on the other folds
+    expected = np.empty_like(out)
+    for train, test in cv.split(X, y):
+        fold_encoder = _target_encoder.TargetEncoder(
+            clf_type=clf_type, handle_unknown="ignore"
+        )
+        expected[test] = fold_encoder.fit(X[train], y[train]).transform(X[test])
+    assert np.allclose(out, expected)
+    # The fitted statistics are those of the whole data
+    full = _target_encoder.TargetEncoder(clf_type=clf_type).fit(X, y)
+    assert np.array_equal(encoder.transform(X), full.transform(X))
+    assert not np.allclose(out, encoder.transform(X))
+
+    # Without cv, fit_transform is fit followed by transform
+    encoder = _target_encoder.TargetEncoder(clf_type=clf_type)
+    assert np.array_equal(encoder.fit_transform(X, y), full.transform(X))
+
+    encoder = _target_encoder.TargetEncoder(
+        clf_type=clf_type, cv=ShuffleSplit(n_splits=2, random_state=0)
+    )
+    with pytest.raises(ValueError, match="test sets of cv"):
+        encoder.fit_transform(X, y)
+
+
+@pytest.mark.parametrize("clf_type", ["regression", "multiclass-clf"])
+def test_partial_fit_and_merge(clf_type) -> None:
+    rng = np.random.RandomState(0)
+    X = rng.randint(0, 30, size=(600, 2)).astype(str)
+    if clf_type == "regression":
+        y = rng.rand(600)
+    else:
+        # The first batches do not contain all the classes
+        y = np.concatenate([rng.randint(0, 2, 300), rng.randint(0, 3, 300)])
+    X_test = np.vstack([X, [["unknown", "0"]]])
+    params = dict(clf_type=clf_type, handle_unknown="ignore")
+    expected = _target_encoder.TargetEncoder(**params).fit(X, y)
+
+    encoder = _target_encoder.TargetEncoder(**params)
+    for start in range(0, len(X), 100):
+        encoder.partial_fit(X[start : start + 100], y[start : start + 100])
+
+    shards = [
+        _target_encoder.TargetEncoder(**params).fit(
+            X[start : start + 200], y[start : start + 200]
+        )
+        for start in range(0, len(X), 200)
+    ]
+    merged = _target_encoder.TargetEncoder.merge(shards)
+    assert merged is not shards[0]
+    assert shards[0].n_ == 200
+
+    for encoder in [encoder, merged]:
+        assert encoder.n_ == expected.n_
+        assert np.array_equal(encoder.k_, expected.k_)
+        for j in range(X.shape[1]):
+            assert np.array_equal(encoder.categories_[j], expected.categories_[j])
+            assert np.array_equal(encoder.counter_[j], expected.counter_[j])
+        assert np.allclose(encoder.transform(X_test), expected.transform(X_test))
+
+
+def test_merge_errors() -> None:
+    X, y = [["a"], ["b"]], np.array([0, 1])
+    with pytest.raises(ValueError, match="at least one"):
+        _target_encoder.TargetEncoder.merge([])
+    with pytest.raises(NotFittedError):
+        _target_encoder.TargetEncoder.merge([_target_encoder.TargetEncoder()])
+    encoder = _target_encoder.TargetEncoder().fit(X, y)
+    other = _target_encoder.TargetEncoder(clf_type="regression").fit(X, y)
+    with pytest.raises(ValueError, match="clf_type"):
+        _target_encoder.TargetEncoder.merge([encoder, other])
+    with pytest.raises(ValueError, match="features"):
+        encoder.partial_fit([["a", "b"], ["b", "c"]], y)
@@ -1,3 +1,4 @@
+import pickle
 from inspect import ismodule
 
 import pytest
@@ -33,3 +34,24 @@ def test_import_optional_dependency():
     # smoke test for an available dependency
     sklearn_module = import_optional_dependency("sklearn")
     assert ismodule(sklearn_module)
+
+
+def test_lrudict_bulk_operations():
+    dict_ = LRUDict(3)
+    dict_.set_many((x, f"filled {x}") for x in range(4))
+    assert len(dict_) == 3
+    assert 0 not in dict_
+
+    values, missing = dict_.get_many([1, 5, 3])
+    assert values == ["filled 1", None, "filled 3"]
+    assert missing == [1]
+
+    # get_many refreshes the accessed keys: 2 is now the least recently used
+    dict_[4] = "filled 4"
+    assert 2 not in dict_
+    assert 1 in dict_ and 3 in dict_
+
+    # The lock is not pickled, but recreated
+    dict_ = pickle.loads(pickle.dumps(dict_))
+    dict_[5] = "filled 5"
+    assert dict_[5] == "filled 5"